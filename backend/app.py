@@ -1,11 +1,39 @@
 import os
-from flask import Flask, send_from_directory, jsonify
+from flask import Flask, jsonify
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
-from extensions import db
-
-
-def create_app():
+from extensions import db, migrate
+from catalog_cache import catalog_cache
+from invoices import invoice_cache, invoice_exporter, invoice_prerenderer
+from sqlite_profile import configure_sqlite, install_sqlite_pragmas
+from password_hasher import password_hasher
+from authz import token_versions
+from image_pipeline import image_pipeline, send_upload
+from compression import compressor
+from offer_cache import offer_cache
+from metrics import metrics
+from query_audit import query_audit
+from seed_data import seed_data_command
+from order_stats import rebuild_order_stats_command
+from forecast import stock_forecaster, forecast_stock_command
+
+
+# ✅ Every file the app writes besides the database and uploads lives under
+#    backend/instance/. Benchmarks and tests pass these into create_app so
+#    a run stays inside its own temp folder.
+def state_paths(folder):
+    return {
+        "UPLOAD_FOLDER": os.path.join(folder, "uploads"),
+        "CATALOG_GENERATION_FILE": os.path.join(folder, "catalog_generation"),
+        "OFFER_GENERATION_FILE": os.path.join(folder, "offer_generation"),
+        "TOKEN_VERSIONS_FILE": os.path.join(folder, "token_versions.json"),
+        "INVOICE_CACHE_DIR": os.path.join(folder, "invoice_cache"),
+        "METRICS_DIR": os.path.join(folder, "metrics"),
+        "QUERY_AUDIT_LOG": os.path.join(folder, "query_audit.jsonl"),
+    }
+
+
+def create_app(test_config=None):
     app = Flask(__name__, static_folder="static", static_url_path="/static")
 
     # ==========================
@@ -23,6 +51,13 @@ def create_app():
     app.config["JWT_SECRET_KEY"] = os.environ.get("JWT_SECRET_KEY", "dev-secret")
     app.config["UPLOAD_FOLDER"] = upload_folder
 
+    # ✅ Overrides (benchmarks / scripts point this at a temp database)
+    if test_config:
+        app.config.update(test_config)
+
+    # ✅ WAL + pragmas + pool sizing, see sqlite_profile.py
+    configure_sqlite(app)
+
     @app.route("/")
     def home():
         return jsonify({"status": "Desi Farms Backend Running 🚀"})
@@ -40,7 +75,26 @@ def create_app():
     # INIT EXTENSIONS
     # ==========================
     db.init_app(app)
+    migrate.init_app(app, db, render_as_batch=True)
+    with app.app_context():
+        install_sqlite_pragmas(db.engine, app.config["SQLITE_PRAGMAS"])
     jwt = JWTManager(app)
+    # ✅ Before compressor: its after_request must run after the compressor's
+    metrics.init_app(app)
+    query_audit.init_app(app)  # no-op unless QUERY_AUDIT is set
+    catalog_cache.init_app(app)
+    invoice_cache.init_app(app)
+    invoice_prerenderer.init_app(app)
+    invoice_exporter.init_app(app)
+    password_hasher.init_app(app)
+    token_versions.init_app(app)
+    image_pipeline.init_app(app)
+    compressor.init_app(app)
+    offer_cache.init_app(app)
+    stock_forecaster.init_app(app)
+    app.cli.add_command(seed_data_command)
+    app.cli.add_command(rebuild_order_stats_command)
+    app.cli.add_command(forecast_stock_command)
 
     # 🔥 Prevent JWT redirect issues
     @jwt.unauthorized_loader
@@ -54,8 +108,8 @@ def create_app():
     # ==========================
     # CREATE UPLOAD FOLDER
     # ==========================
-    if not os.path.exists(upload_folder):
-        os.makedirs(upload_folder)
+    if not os.path.exists(app.config["UPLOAD_FOLDER"]):
+        os.makedirs(app.config["UPLOAD_FOLDER"])
 
     # ==========================
     # REGISTER BLUEPRINTS
@@ -66,6 +120,7 @@ def create_app():
     from routes.orders import order_bp
     from routes.offer_routes import offer_bp
     from routes.wishlist import wishlist_bp
+    from routes.admin import admin_bp
 
     app.register_blueprint(auth_bp, url_prefix="/api")
     app.register_blueprint(product_bp, url_prefix="/api")
@@ -73,13 +128,14 @@ def create_app():
     app.register_blueprint(order_bp, url_prefix="/api")
     app.register_blueprint(offer_bp, url_prefix="/api")
     app.register_blueprint(wishlist_bp, url_prefix="/api/wishlist")
+    app.register_blueprint(admin_bp, url_prefix="/api")
 
     # ==========================
     # SERVE UPLOADED IMAGES
     # ==========================
     @app.route("/uploads/<filename>")
     def uploaded_file(filename):
-        return send_from_directory(app.config["UPLOAD_FOLDER"], filename)
+        return send_upload(filename)
 
     # ==========================
     # CREATE DATABASE TABLES
@@ -87,7 +143,7 @@ def create_app():
     with app.app_context():
         db.create_all()
         print("✅ Database tables created")
-        print("📁 Database location:", db_path)
+        print("📁 Database location:", app.config["SQLALCHEMY_DATABASE_URI"])
 
     return app
 
@@ -95,7 +151,7 @@ def create_app():
 # ==========================
 # RUN APP
 # ==========================
-app = create_app()
-
+# The WSGI app lives in wsgi.py, so importing this module (benchmarks,
+# tests, `flask --app app`) never opens backend/desi_farms.db.
 if __name__ == "__main__":
-    app.run(debug=True)
\ No newline at end of file
+    create_app().run(debug=True)
\ No newline at end of file
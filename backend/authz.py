@@ -0,0 +1,124 @@
+import json
+import os
+import tempfile
+import threading
+from functools import wraps
+
+from flask import jsonify
+from flask_jwt_extended import get_jwt, get_jwt_identity, verify_jwt_in_request
+
+from extensions import db
+from query_audit import allow_queries
+
+try:
+    import fcntl
+except ImportError:  # Windows dev boxes: single process, no file locks needed
+    fcntl = None
+
+
+# ==========================
+# TOKEN VERSIONS
+# ==========================
+# users.token_version is the source of truth; it is bumped whenever a
+# user's role changes. Non-zero versions are mirrored into a small JSON file
+# next to the database so every worker can reject old tokens with an
+# os.stat() instead of a query. The file is rebuilt from the DB if missing.
+class TokenVersions:
+    def __init__(self):
+        self.path = None
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._versions = {}
+
+    def init_app(self, app):
+        self.path = app.config.setdefault(
+            "TOKEN_VERSIONS_FILE",
+            os.path.join(app.instance_path, "token_versions.json")
+        )
+
+        folder = os.path.dirname(self.path)
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+
+    def current(self, user_id):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            self.rebuild()
+            mtime = os.stat(self.path).st_mtime_ns
+
+        with self._lock:
+            if mtime != self._mtime:
+                with open(self.path) as fh:
+                    self._versions = json.load(fh)
+                self._mtime = mtime
+            return self._versions.get(str(user_id), 0)
+
+    def rebuild(self):
+        from models import User
+
+        rows = (
+            db.session.query(User.id, User.token_version)
+            .filter(User.token_version > 0)
+            .all()
+        )
+        self._write(lambda versions: {str(uid): tv for uid, tv in rows})
+
+    def set(self, user_id, version):
+        def update(versions):
+            versions[str(user_id)] = version
+            return versions
+        self._write(update)
+
+    def _write(self, update):
+        lock_path = self.path + ".lock"
+        with open(lock_path, "a") as lock_fh:
+            if fcntl:
+                fcntl.flock(lock_fh, fcntl.LOCK_EX)
+
+            try:
+                with open(self.path) as fh:
+                    versions = json.load(fh)
+            except FileNotFoundError:
+                versions = {}
+
+            versions = update(versions)
+
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix=".tmp")
+            with os.fdopen(fd, "w") as fh:
+                json.dump(versions, fh)
+            os.replace(tmp_path, self.path)
+
+
+token_versions = TokenVersions()
+
+
+# ==========================
+# ADMIN GUARD
+# ==========================
+# Authorizes from the JWT claims set at login ("role", "tv"), so admin
+# routes run zero queries for the check. Tokens issued before roles were
+# put in the claims fall back to one user lookup, which the query audit adds
+# to that request's @query_budget.
+def admin_required(fn):
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        verify_jwt_in_request()
+        claims = get_jwt()
+        user_id = int(get_jwt_identity())
+
+        role = claims.get("role")
+        if role is None:
+            from models import User
+            allow_queries(1)
+            user = db.session.get(User, user_id)
+            role = user.role if user else None
+        elif claims.get("tv", 0) < token_versions.current(user_id):
+            return jsonify({"message": "Session expired, please log in again"}), 401
+
+        if role != "admin":
+            return jsonify({"message": "Admin access required"}), 403
+
+        return fn(*args, **kwargs)
+
+    return wrapper
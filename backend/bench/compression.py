@@ -0,0 +1,156 @@
+"""CPU cost vs bytes saved for response compression on the big JSON endpoints.
+
+Seeds a temp database, captures the uncompressed bodies of the catalog,
+admin order list, cart and wishlist, then times each encoder setting on
+them. Also times a full catalog request end to end: identity, gzip with
+the compressed-body cache warm, and gzip with the cache disabled.
+
+    cd backend
+    python bench/compression.py --products 2000 --orders 500 --repeat 50
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CATEGORIES = ("Dairy", "Dal", "Oil", "Spices")
+
+
+def build_app(db_path, cache_size=256):
+    with contextlib.redirect_stdout(io.StringIO()):
+        from app import create_app, state_paths
+        return create_app({
+            "SQLALCHEMY_DATABASE_URI": "sqlite:///" + db_path,
+            "COMPRESS_CACHE_SIZE": cache_size,
+            **state_paths(os.path.dirname(db_path)),
+        })
+
+
+def seed(app, products, orders):
+    from extensions import db
+    from models import Cart, Order, OrderItem, Product, User, Wishlist
+
+    with app.app_context():
+        db.session.add(User(name="Bench Admin", email="admin@example.com", password="x", role="admin"))
+        db.session.add_all([
+            Product(name=f"Wood-pressed product {i}", price=40 + i % 500, original_price=60 + i % 500,
+                    discount_percent=10, unit="500 gm", stock=100,
+                    image=f"/uploads/{i:024x}.jpg", category=CATEGORIES[i % 4])
+            for i in range(products)
+        ])
+        db.session.flush()
+        db.session.add_all([Cart(user_id=1, product_id=i, quantity=2) for i in range(1, 31)])
+        db.session.add_all([Wishlist(user_id=1, product_id=i) for i in range(1, 31)])
+        db.session.add_all([
+            Order(user_id=1, total_amount=450, status="Pending", customer_name="Bench Admin",
+                  phone="9876543210", address="12 Mandi Road", city="Nashik", pincode="422001",
+                  invoice_no=f"INV-{i:06d}",
+                  items=[OrderItem(product_id=1 + i % products, quantity=3, price=150)])
+            for i in range(orders)
+        ])
+        db.session.commit()
+
+
+def time_requests(client, path, headers, repeat):
+    started = time.process_time()
+    for _ in range(repeat):
+        body = client.get(path, headers=headers).get_data()
+    return (time.process_time() - started) * 1000 / repeat, len(body)
+
+
+def run(products, orders, repeat):
+    from compression import brotli, compressor
+    from flask_jwt_extended import create_access_token
+
+    workdir = tempfile.mkdtemp()
+    try:
+        app = build_app(os.path.join(workdir, "bench.db"))
+        seed(app, products, orders)
+        with app.app_context():
+            token = create_access_token(identity="1", additional_claims={"role": "admin", "tv": 0})
+        auth = {"Authorization": f"Bearer {token}"}
+        client = app.test_client()
+
+        endpoints = {
+            "catalog": "/api/products",
+            "catalog_page": "/api/products?limit=24",
+            "admin_orders": "/api/orders",
+            "cart": "/api/cart",
+            "wishlist": "/api/wishlist/",
+        }
+        bodies = {name: client.get(path, headers=auth).get_data() for name, path in endpoints.items()}
+
+        settings = [("gzip", level) for level in (1, 6, 9)]
+        if brotli is not None:
+            settings += [("br", quality) for quality in (1, 4, 11)]
+
+        results = []
+        for name, body in bodies.items():
+            for encoding, level in settings:
+                compressor.gzip_level = compressor.brotli_quality = level
+                started = time.process_time()
+                for _ in range(repeat):
+                    compressed = compressor.encode(body, encoding)
+                cpu_ms = (time.process_time() - started) * 1000 / repeat
+                results.append({
+                    "endpoint": name,
+                    "encoding": f"{encoding}-{level}",
+                    "raw_bytes": len(body),
+                    "compressed_bytes": len(compressed),
+                    "saved_pct": round(100 - len(compressed) * 100 / len(body), 1),
+                    "cpu_ms": round(cpu_ms, 3),
+                })
+        compressor.gzip_level = app.config["COMPRESS_GZIP_LEVEL"]
+        compressor.brotli_quality = app.config["COMPRESS_BROTLI_QUALITY"]
+
+        gzip_headers = {"Accept-Encoding": "gzip"}
+        for label, headers, cache_size in (
+            ("identity", {}, 256),
+            ("gzip_cached", gzip_headers, 256),
+            ("gzip_uncached", gzip_headers, 0),
+        ):
+            compressor.cache_size = cache_size
+            compressor._cache.clear()
+            client.get("/api/products", headers=headers)  # warm catalog + compression cache
+            ms, size = time_requests(client, "/api/products", headers, repeat)
+            results.append({
+                "endpoint": "catalog_request",
+                "encoding": label,
+                "wire_bytes": size,
+                "cpu_ms": round(ms, 3),
+            })
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--orders", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--json", action="store_true", help="one JSON object per line")
+    args = parser.parse_args()
+
+    for result in run(args.products, args.orders, args.repeat):
+        if args.json:
+            print(json.dumps(result))
+        elif "raw_bytes" in result:
+            print(f"{result['endpoint']:<14} {result['encoding']:<8} {result['raw_bytes']:>9} ->"
+                  f" {result['compressed_bytes']:>8} bytes ({result['saved_pct']:>5}% saved)"
+                  f"  {result['cpu_ms']:>8} ms cpu")
+        else:
+            print(f"{result['endpoint']:<14} {result['encoding']:<14} {result['wire_bytes']:>9} bytes"
+                  f"  {result['cpu_ms']:>8} ms cpu/request")
+
+
+if __name__ == "__main__":
+    main()
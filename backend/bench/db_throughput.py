@@ -0,0 +1,140 @@
+"""SQLite read / write throughput, default settings vs the production profile.
+
+Each worker process builds its own app against one shared temp database,
+the way gunicorn workers do, and hammers it for a fixed time.
+
+    cd backend
+    python bench/db_throughput.py --workers 4 --seconds 5
+"""
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.exc import OperationalError  # noqa: E402
+
+PRODUCTS = 2000
+
+
+def build_app(db_path, profile):
+    with contextlib.redirect_stdout(io.StringIO()):
+        from app import create_app, state_paths
+        return create_app({
+            "SQLALCHEMY_DATABASE_URI": "sqlite:///" + db_path,
+            "SQLITE_PROFILE": profile,
+            **state_paths(os.path.dirname(db_path)),
+        })
+
+
+def seed(db_path, profile):
+    from extensions import db
+    from models import Product, User
+
+    app = build_app(db_path, profile)
+    with app.app_context():
+        db.session.add(User(name="bench", email="bench@example.com", password="x"))
+        db.session.add_all([
+            Product(name=f"Product {i}", price=10 + i % 500, stock=10 ** 9,
+                    category=("Dairy", "Dal", "Oil", "Spices")[i % 4])
+            for i in range(PRODUCTS)
+        ])
+        db.session.commit()
+
+
+def worker(db_path, profile, mode, seconds, queue):
+    from sqlalchemy import update
+    from extensions import db
+    from models import Order, Product
+
+    app = build_app(db_path, profile)
+    ops = errors = 0
+
+    with app.app_context():
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            write = mode == "write" or (mode == "mixed" and random.random() < 0.1)
+            try:
+                if write:
+                    product_id = random.randint(1, PRODUCTS)
+                    db.session.execute(
+                        update(Product)
+                        .where(Product.id == product_id, Product.stock >= 1)
+                        .values(stock=Product.stock - 1)
+                    )
+                    db.session.add(Order(user_id=1, total_amount=10, status="Pending"))
+                    db.session.commit()
+                else:
+                    category = random.choice(("Dairy", "Dal", "Oil", "Spices"))
+                    Product.query.filter_by(category=category) \
+                        .order_by(Product.id).limit(24).all()
+                    db.session.rollback()
+                ops += 1
+            except OperationalError:  # "database is locked"
+                db.session.rollback()
+                errors += 1
+
+    queue.put((ops, errors))
+
+
+def run(profile, mode, workers, seconds):
+    workdir = tempfile.mkdtemp()
+    db_path = os.path.join(workdir, "bench.db")
+
+    try:
+        seed(db_path, profile)
+
+        queue = multiprocessing.Queue()
+        procs = [
+            multiprocessing.Process(target=worker, args=(db_path, profile, mode, seconds, queue))
+            for _ in range(workers)
+        ]
+        for proc in procs:
+            proc.start()
+        results = [queue.get() for _ in procs]
+        for proc in procs:
+            proc.join()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    ops = sum(r[0] for r in results)
+    errors = sum(r[1] for r in results)
+    return {
+        "profile": profile,
+        "mode": mode,
+        "workers": workers,
+        "seconds": seconds,
+        "ops": ops,
+        "ops_per_sec": round(ops / seconds, 1),
+        "lock_errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--modes", default="read,write,mixed")
+    parser.add_argument("--json", action="store_true", help="one JSON object per line")
+    args = parser.parse_args()
+
+    for mode in args.modes.split(","):
+        for profile in ("default", "production"):
+            result = run(profile, mode, args.workers, args.seconds)
+            if args.json:
+                print(json.dumps(result))
+            else:
+                print(f"{mode:<6} {profile:<11} {result['ops_per_sec']:>10} ops/s"
+                      f"   lock errors: {result['lock_errors']}")
+
+
+if __name__ == "__main__":
+    main()
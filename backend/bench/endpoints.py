@@ -0,0 +1,553 @@
+"""Per-endpoint latency, queries per request and peak memory at a given data scale.
+
+Builds the app with create_app() against a temp SQLite file, bulk-loads
+synthetic users / products / orders, then drives every blueprint endpoint
+through the Flask test client. For each endpoint it reports p50 / p95 / p99
+latency, SQL statements per request and the peak Python memory allocated
+while serving one request (tracemalloc, measured in a separate pass so it
+does not skew latency).
+
+    cd backend
+    python bench/endpoints.py --scale small
+    python bench/endpoints.py --scale medium --iterations 100 --json > medium.jsonl
+    python bench/endpoints.py --products 100000 --orders 1000000 --only 'orders\\.'
+    python bench/endpoints.py --audit    # CI: exit 1 if a route breaks its @query_budget
+
+Scales: small = 100 products / 1k orders, medium = 10k / 100k,
+large = 100k / 1M. --products / --orders / --users override a preset.
+Diff two --json runs by the "endpoint" key.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SCALES = {
+    "small": {"products": 100, "users": 50, "orders": 1_000},
+    "medium": {"products": 10_000, "users": 1_000, "orders": 100_000},
+    "large": {"products": 100_000, "users": 10_000, "orders": 1_000_000},
+}
+
+PASSWORD = "Bench@1234"
+CATEGORIES = ("Dairy", "Dal", "Oil", "Spices", "Atta", "Pickle")
+STATUSES = ("Pending", "Confirmed", "Shipped", "Delivered", "Cancelled")
+CITIES = (("Nashik", "422001"), ("Pune", "411001"), ("Indore", "452001"), ("Satara", "415001"))
+CHUNK = 20_000
+
+# Fixed users: 1 admin, 2 shopper (read paths), 3 mutator (write paths),
+# 4 role target; buyers for place_order start after them. Each buyer places
+# at most one order per run because invoice_no is only unique per user per second.
+ADMIN, SHOPPER, MUTATOR, ROLE_TARGET = 1, 2, 3, 4
+FIXED_USERS = 4
+
+# Framework routes that are not ours to benchmark
+EXCLUDED_ENDPOINTS = {"static"}
+
+
+def build_app(workdir, hash_method, audit=False):
+    with contextlib.redirect_stdout(io.StringIO()):
+        from app import create_app, state_paths
+        return create_app({
+            "SQLALCHEMY_DATABASE_URI": "sqlite:///" + os.path.join(workdir, "bench.db"),
+            "PASSWORD_HASH_METHOD": hash_method,
+            "QUERY_AUDIT": audit,
+            **state_paths(workdir),
+        })
+
+
+def audit_summary(path):
+    # One line per (endpoint, finding); returns True if any budget was broken
+    try:
+        with open(path) as fh:
+            reports = [json.loads(line) for line in fh]
+    except FileNotFoundError:
+        return False
+
+    findings = {}
+    for report in reports:
+        if report["over_budget"]:
+            key = (report["endpoint"], f"{report['queries']} queries, budget {report['budget']}")
+            findings[key] = report["statements"]
+        for group in report["repeated"]:
+            key = (report["endpoint"], f"likely N+1: {group['count']}x {group['sql'][:100]}")
+            findings[key] = [group]
+
+    for (endpoint, finding), groups in sorted(findings.items()):
+        print(f"audit: {endpoint}: {finding}", file=sys.stderr)
+        for group in groups:
+            for site in group["sites"]:
+                print(f"audit:     at {site}", file=sys.stderr)
+
+    return any(report["over_budget"] for report in reports)
+
+
+# ==========================
+# SYNTHETIC DATA
+# ==========================
+def chunked(rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == CHUNK:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def seed(app, products, users, orders, buyers):
+    from sqlalchemy import insert
+    from werkzeug.security import generate_password_hash
+    from extensions import db
+    from models import Cart, Offer, Order, OrderItem, Product, User, Wishlist
+
+    rng = random.Random(42)
+    password = generate_password_hash(PASSWORD, app.config["PASSWORD_HASH_METHOD"])
+    total_users = FIXED_USERS + users + buyers
+    now = datetime.utcnow()
+
+    def user_rows():
+        for i in range(1, total_users + 1):
+            yield {"id": i, "name": f"User {i}", "email": f"user{i}@bench.test",
+                   "password": password, "role": "admin" if i == ADMIN else "user"}
+
+    def product_rows():
+        for i in range(1, products + 1):
+            price = 20 + (i * 37) % 900
+            yield {"id": i, "name": f"{CATEGORIES[i % len(CATEGORIES)]} item {i}",
+                   "price": price, "original_price": price * 1.2, "discount_percent": 17,
+                   "unit": "500 gm", "stock": 10 ** 6, "category": CATEGORIES[i % len(CATEGORIES)],
+                   "image": f"/uploads/{i:024x}.jpg"}
+
+    def order_rows():
+        for i in range(1, orders + 1):
+            # every 50th order belongs to the shopper so "my orders" has data
+            user_id = SHOPPER if i % 50 == 0 else FIXED_USERS + 1 + rng.randrange(users)
+            city, pincode = CITIES[i % len(CITIES)]
+            yield {"id": i, "user_id": user_id, "total_amount": 0, "status": STATUSES[i % len(STATUSES)],
+                   "customer_name": f"User {user_id}", "phone": "9876543210",
+                   "address": "12 Mandi Road", "city": city, "pincode": pincode,
+                   "payment_method": "Cash on Delivery", "invoice_no": f"BENCH-{i:08d}",
+                   "created_at": now - timedelta(minutes=(orders - i) * 525_600 // max(orders, 1))}
+
+    def item_rows():
+        for order_id in range(1, orders + 1):
+            for k in range(1 + order_id % 3):
+                yield {"order_id": order_id, "product_id": 1 + (order_id * 7 + k) % products,
+                       "quantity": 1 + k, "price": 100}
+
+    with app.app_context():
+        for model, rows in ((User, user_rows()), (Product, product_rows()),
+                            (Order, order_rows()), (OrderItem, item_rows())):
+            for batch in chunked(rows):
+                db.session.execute(insert(model), batch)
+            db.session.commit()
+
+        fixed = range(1, min(products, 20) + 1)
+        db.session.execute(insert(Cart), [{"user_id": SHOPPER, "product_id": p, "quantity": 2} for p in fixed])
+        db.session.execute(insert(Wishlist), [{"user_id": SHOPPER, "product_id": p} for p in fixed])
+        db.session.add(Offer(title="Bench 10%", code="BENCH10", discount_type="percentage",
+                             discount_value=10, min_amount=0, expiry_date=now + timedelta(days=365)))
+        db.session.commit()
+
+        from order_stats import rebuild_order_stats
+        rebuild_order_stats()
+
+        # ✅ Normally built by the first authenticated request after a deploy
+        from authz import token_versions
+        token_versions.rebuild()
+
+        from forecast import np, stock_forecaster
+        if np is not None:
+            stock_forecaster.run()
+
+    os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
+    with open(os.path.join(app.config["UPLOAD_FOLDER"], f"{1:024x}.jpg"), "wb") as fh:
+        fh.write(os.urandom(150 * 1024))
+
+
+# ==========================
+# ENDPOINT CASES
+# ==========================
+class Case:
+    def __init__(self, name, endpoint, method, path, user=None, headers=None, json=None,
+                 data=None, setup=None, max_iterations=None):
+        self.name = name
+        self.endpoint = endpoint
+        self.method = method
+        self.path = path            # str or fn(ctx, i)
+        self.user = user            # user id to authenticate as
+        self.headers = headers      # fn(ctx, i) -> headers, instead of user
+        self.json = json            # dict or fn(ctx, i)
+        self.data = data            # form dict or fn(ctx, i)
+        self.setup = setup          # fn(ctx, i) -> None, run untimed before each request
+        self.max_iterations = max_iterations
+
+    def request(self, ctx, i):
+        resolve = lambda v: v(ctx, i) if callable(v) else v  # noqa: E731
+        kwargs = {"headers": ctx.headers(self.user) if self.user else {}}
+        if self.headers is not None:
+            kwargs["headers"] = resolve(self.headers)
+        if self.json is not None:
+            kwargs["json"] = resolve(self.json)
+        if self.data is not None:
+            kwargs["data"] = resolve(self.data)
+        return self.method, resolve(self.path), kwargs
+
+
+class Context:
+    def __init__(self, app, scale):
+        from flask_jwt_extended import create_access_token
+
+        self.app = app
+        self.scale = scale
+        self.client = app.test_client()
+        self.state = {}
+        with app.app_context():
+            self._tokens = {
+                uid: create_access_token(identity=str(uid), additional_claims={
+                    "role": "admin" if uid == ADMIN else "user", "tv": 0})
+                for uid in (ADMIN, SHOPPER, MUTATOR)
+            }
+        self.shopper_orders = self.ids("SELECT id FROM orders WHERE user_id = :u ORDER BY id", u=SHOPPER)
+        self.next_buyer = FIXED_USERS + scale["users"] + 1
+
+    def headers(self, user_id):
+        return {"Authorization": f"Bearer {self._tokens[user_id]}"}
+
+    def ids(self, sql, **params):
+        from extensions import db
+        with self.app.app_context():
+            return [row[0] for row in db.session.execute(db.text(sql), params)]
+
+    def execute(self, sql, **params):
+        from extensions import db
+        with self.app.app_context():
+            result = db.session.execute(db.text(sql), params)
+            db.session.commit()
+            return result.lastrowid
+
+
+def month_range(ctx, i):
+    today = datetime.utcnow().date()
+    return f"date_from={today - timedelta(days=30)}&date_to={today}"
+
+
+def ensure_cart_line(user_id):
+    def setup(ctx, i):
+        ctx.execute(
+            "INSERT INTO carts (user_id, product_id, quantity) VALUES (:u, :p, 1) "
+            "ON CONFLICT (user_id, product_id) DO UPDATE SET quantity = 1",
+            u=user_id, p=1 + i % ctx.scale["products"])
+        ctx.state["cart_item"] = ctx.ids(
+            "SELECT id FROM carts WHERE user_id = :u AND product_id = :p",
+            u=user_id, p=1 + i % ctx.scale["products"])[0]
+    return setup
+
+
+def setup_buyer(ctx, i):
+    buyer = ctx.next_buyer
+    ctx.next_buyer += 1
+    ctx.execute("INSERT INTO carts (user_id, product_id, quantity) VALUES (:u, :p, 2)",
+                u=buyer, p=1 + i % ctx.scale["products"])
+    with ctx.app.app_context():
+        from flask_jwt_extended import create_access_token
+        ctx.state["buyer_headers"] = {
+            "Authorization": "Bearer " + create_access_token(identity=str(buyer), additional_claims={
+                "role": "user", "tv": 0})
+        }
+
+
+def setup_pending_order(ctx, i):
+    order_id = ctx.execute(
+        "INSERT INTO orders (user_id, total_amount, status, invoice_no, created_at) "
+        "VALUES (:u, 200, 'Pending', :inv, :now)",
+        u=MUTATOR, inv=f"BENCH-CANCEL-{i}-{time.time_ns()}", now=datetime.utcnow())
+    ctx.execute("INSERT INTO order_items (order_id, product_id, quantity, price) VALUES (:o, 1, 2, 100)",
+                o=order_id)
+    ctx.state["order_id"] = order_id
+
+
+def setup_product(ctx, i):
+    ctx.state["product_id"] = ctx.execute(
+        "INSERT INTO products (name, price, stock, category) VALUES (:n, 10, 5, 'Dairy')",
+        n=f"Delete me {i}")
+
+
+def setup_wishlist_free(ctx, i):
+    ctx.execute("DELETE FROM wishlist WHERE user_id = :u AND product_id = 1", u=MUTATOR)
+
+
+def setup_wishlist_line(ctx, i):
+    ctx.execute("INSERT OR IGNORE INTO wishlist (user_id, product_id, created_at) VALUES (:u, 1, :now)",
+                u=MUTATOR, now=datetime.utcnow())
+    ctx.state["wishlist_id"] = ctx.ids(
+        "SELECT id FROM wishlist WHERE user_id = :u AND product_id = 1", u=MUTATOR)[0]
+
+
+def build_cases():
+    page_ids = ",".join(str(n) for n in range(1, 25))
+    product_form = {"name": "Bench product", "price": "99", "original_price": "120",
+                    "unit": "1 kg", "stock": "50"}
+
+    return [
+        # ---------- public / catalog ----------
+        Case("home", "home", "GET", "/"),
+        Case("products.list_all", "products.get_products", "GET", "/api/products"),
+        Case("products.page", "products.get_products", "GET", "/api/products?limit=24"),
+        Case("products.page_uncached", "products.get_products", "GET",
+             lambda ctx, i: f"/api/products?limit=24&sort=-price&_bust={i}"),
+        Case("products.search", "products.get_products", "GET",
+             lambda ctx, i: f"/api/products?limit=24&q=item {i % 97}&_bust={i}"),
+        Case("products.category", "products.get_products", "GET",
+             lambda ctx, i: f"/api/products?limit=24&category=Dal&min_price=100&_bust={i}"),
+        Case("products.seed_noop", "products.seed_products", "GET", "/api/seed-products"),
+        Case("uploads.image", "uploaded_file", "GET", f"/uploads/{1:024x}.jpg"),
+        Case("metrics.scrape", "metrics", "GET", "/metrics"),
+
+        # ---------- shopper reads ----------
+        Case("cart.get", "cart.get_cart", "GET", "/api/cart", user=SHOPPER),
+        Case("cart.quote", "cart.cart_quote", "GET", "/api/cart/quote?code=BENCH10", user=SHOPPER),
+        Case("wishlist.get", "wishlist.get_wishlist", "GET", "/api/wishlist/", user=SHOPPER),
+        Case("wishlist.contains", "wishlist.wishlist_contains", "GET",
+             f"/api/wishlist/contains?ids={page_ids}", user=SHOPPER),
+        Case("offer.apply", "offer.apply_offer", "POST", "/api/apply-offer",
+             user=SHOPPER, json={"code": "BENCH10"}),
+        Case("orders.history", "orders.order_history", "GET", "/api/orders", user=SHOPPER),
+        Case("orders.detail", "orders.get_invoice", "GET",
+             lambda ctx, i: f"/api/orders/{ctx.shopper_orders[i % len(ctx.shopper_orders)]}",
+             user=SHOPPER),
+        Case("orders.invoice_pdf", "orders.download_invoice", "GET",
+             lambda ctx, i: f"/api/orders/{ctx.shopper_orders[i % len(ctx.shopper_orders)]}/invoice",
+             user=SHOPPER),
+
+        # ---------- admin reads ----------
+        Case("orders.all_page", "orders.get_all_orders", "GET", "/api/orders/all?limit=50", user=ADMIN),
+        Case("orders.all_filtered", "orders.get_all_orders", "GET",
+             "/api/orders/all?limit=50&status=Delivered&city=Pune", user=ADMIN),
+        Case("orders.status_counts", "orders.order_status_counts", "GET",
+             "/api/orders/status-counts", user=ADMIN),
+        Case("admin.stats", "admin.dashboard_stats", "GET", "/api/admin/stats", user=ADMIN),
+        Case("admin.stats_year", "admin.dashboard_stats", "GET",
+             lambda ctx, i: f"/api/admin/stats?date_from={(datetime.utcnow() - timedelta(days=365)):%Y-%m-%d}",
+             user=ADMIN),
+        Case("admin.stock_forecast", "admin.stock_forecast", "GET", "/api/admin/stock-forecast", user=ADMIN),
+        Case("admin.stock_forecast_run", "admin.stock_forecast", "POST", "/api/admin/stock-forecast",
+             user=ADMIN, max_iterations=5),
+        Case("orders.invoice_queue", "orders.invoice_queue_stats", "GET",
+             "/api/orders/invoice-queue", user=ADMIN),
+        Case("orders.export_csv_month", "orders.export_orders", "GET",
+             lambda ctx, i: f"/api/orders/export?format=csv&{month_range(ctx, i)}",
+             user=ADMIN, max_iterations=10),
+        Case("orders.invoices_zip_day", "orders.export_invoices", "GET",
+             lambda ctx, i: f"/api/orders/invoices/export?date_from={datetime.utcnow().date()}"
+                            f"&date_to={datetime.utcnow().date()}&city=Pune",
+             user=ADMIN, max_iterations=3),
+
+        # ---------- auth ----------
+        Case("auth.login", "auth.login", "POST", "/api/login",
+             json={"email": f"user{SHOPPER}@bench.test", "password": PASSWORD}),
+        Case("auth.register", "auth.register", "POST", "/api/register",
+             json=lambda ctx, i: {"name": "New", "email": f"new{i}-{time.time_ns()}@bench.test",
+                                  "password": PASSWORD, "confirm_password": PASSWORD}),
+        Case("auth.update_role", "auth.update_user_role", "PUT", f"/api/users/{ROLE_TARGET}/role",
+             user=ADMIN, json={"role": "user"}),
+
+        # ---------- shopper writes ----------
+        Case("cart.add", "cart.add_to_cart", "POST", "/api/cart/add", user=MUTATOR,
+             json=lambda ctx, i: {"product_id": 1 + i % ctx.scale["products"], "quantity": 1}),
+        Case("cart.update", "cart.update_cart_item", "PUT",
+             lambda ctx, i: f"/api/cart/item/{ctx.state['cart_item']}", user=MUTATOR,
+             json={"quantity": 2}, setup=ensure_cart_line(MUTATOR)),
+        Case("cart.remove", "cart.remove_item", "DELETE",
+             lambda ctx, i: f"/api/cart/remove/{ctx.state['cart_item']}", user=MUTATOR,
+             setup=ensure_cart_line(MUTATOR)),
+        Case("cart.clear", "cart.clear_cart", "DELETE", "/api/cart/clear", user=MUTATOR,
+             setup=ensure_cart_line(MUTATOR)),
+        Case("wishlist.add", "wishlist.add_to_wishlist", "POST", "/api/wishlist/1", user=MUTATOR,
+             setup=setup_wishlist_free),
+        Case("wishlist.remove", "wishlist.remove_from_wishlist", "DELETE",
+             lambda ctx, i: f"/api/wishlist/{ctx.state['wishlist_id']}", user=MUTATOR,
+             setup=setup_wishlist_line),
+        Case("wishlist.batch", "wishlist.batch_update_wishlist", "POST", "/api/wishlist/batch",
+             user=MUTATOR, json=lambda ctx, i: {"add": [2, 3, 4], "remove": [5, 6]} if i % 2
+             else {"add": [5, 6], "remove": [2, 3, 4]}),
+        Case("orders.place", "orders.place_order", "POST", "/api/orders/place",
+             json={"customer_name": "Buyer", "phone": "9876543210", "address": "1 Road",
+                   "city": "Pune", "pincode": "411001"},
+             headers=lambda ctx, i: ctx.state["buyer_headers"], setup=setup_buyer),
+        Case("orders.cancel", "orders.cancel_order", "DELETE",
+             lambda ctx, i: f"/api/orders/{ctx.state['order_id']}/cancel", user=MUTATOR,
+             setup=setup_pending_order),
+
+        # ---------- admin writes ----------
+        Case("offer.create", "offer.create_offer", "POST", "/api/create-offer", user=ADMIN,
+             json=lambda ctx, i: {"title": "Bench", "code": f"B{time.time_ns()}",
+                                  "discount_type": "flat", "discount_value": 5,
+                                  "expiry_date": "2099-01-01"}),
+        Case("orders.update_status", "orders.update_order_status", "PUT",
+             lambda ctx, i: f"/api/orders/{1 + (i * 7919) % ctx.scale['orders']}/status",
+             user=ADMIN, json=lambda ctx, i: {"status": STATUSES[i % len(STATUSES)]}),
+        Case("products.add", "products.add_product", "POST", "/api/products", user=ADMIN,
+             data=product_form),
+        Case("products.update", "products.update_product", "PUT",
+             lambda ctx, i: f"/api/products/{1 + i % ctx.scale['products']}", user=ADMIN,
+             data=product_form),
+        Case("products.update_stock", "products.update_stock", "PUT",
+             lambda ctx, i: f"/api/products/{1 + i % ctx.scale['products']}/stock", user=ADMIN,
+             json={"stock": 10 ** 6}),
+        Case("products.delete", "products.delete_product", "DELETE",
+             lambda ctx, i: f"/api/products/{ctx.state['product_id']}", user=ADMIN,
+             setup=setup_product),
+    ]
+
+
+# ==========================
+# RUNNER
+# ==========================
+def percentile(sorted_values, pct):
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def run_case(ctx, case, iterations, warmup, counter):
+    n = min(iterations, case.max_iterations or iterations)
+    latencies, queries, statuses = [], [], set()
+
+    def call(i):
+        if case.setup:
+            case.setup(ctx, i)
+        method, path, kwargs = case.request(ctx, i)
+
+        counter[0] = 0
+        started = time.perf_counter()
+        response = ctx.client.open(path, method=method, **kwargs)
+        response.get_data()  # drain streamed bodies (exports)
+        elapsed = (time.perf_counter() - started) * 1000
+        response.close()
+        return elapsed, counter[0], response.status_code
+
+    for i in range(min(warmup, n)):
+        call(-1 - i)
+
+    for i in range(n):
+        elapsed, count, status = call(i)
+        latencies.append(elapsed)
+        queries.append(count)
+        statuses.add(status)
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    call(n)
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "endpoint": case.name,
+        "route": case.endpoint,
+        "iterations": n,
+        "status": sorted(statuses),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "queries_per_request": round(sum(queries) / len(queries), 2),
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--products", type=int)
+    parser.add_argument("--orders", type=int)
+    parser.add_argument("--users", type=int)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--only", help="regex on endpoint names, e.g. 'cart\\.|orders\\.all'")
+    parser.add_argument("--hash-method", default="pbkdf2:sha256:1000",
+                        help="password hash for seeded users and login/register (cheap by default)")
+    parser.add_argument("--keep", action="store_true", help="keep the temp directory")
+    parser.add_argument("--json", action="store_true", help="one JSON object per line")
+    parser.add_argument("--audit", action="store_true",
+                        help="run with QUERY_AUDIT on (slower); exit 1 on a broken @query_budget")
+    args = parser.parse_args()
+
+    scale = dict(SCALES[args.scale])
+    for key in ("products", "orders", "users"):
+        if getattr(args, key) is not None:
+            scale[key] = getattr(args, key)
+
+    cases = build_cases()
+    if args.only:
+        cases = [c for c in cases if re.search(args.only, c.name)]
+
+    workdir = tempfile.mkdtemp(prefix="desi-bench-")
+    failed = False
+    try:
+        app = build_app(workdir, args.hash_method, args.audit)
+
+        covered = {c.endpoint for c in build_cases()}
+        missing = sorted(
+            rule.endpoint for rule in app.url_map.iter_rules()
+            if rule.endpoint not in covered | EXCLUDED_ENDPOINTS
+        )
+        if missing:
+            print(f"warning: no benchmark case for {', '.join(missing)}", file=sys.stderr)
+
+        buyers = (args.iterations + args.warmup + 1) if any(c.name == "orders.place" for c in cases) else 0
+        started = time.perf_counter()
+        seed(app, scale["products"], scale["users"], scale["orders"], buyers)
+        seed_seconds = round(time.perf_counter() - started, 1)
+
+        from sqlalchemy import event
+        from extensions import db
+
+        counter = [0]
+        with app.app_context():
+            event.listen(db.engine, "before_cursor_execute",
+                         lambda *a: counter.__setitem__(0, counter[0] + 1))
+
+        ctx = Context(app, scale)
+        meta = {"scale": args.scale, **scale, "seed_seconds": seed_seconds}
+        if not args.json:
+            print(f"# {meta}")
+            print(f"{'endpoint':<26} {'n':>4} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+                  f" {'queries':>8} {'peak KB':>9}  status")
+
+        for case in cases:
+            result = run_case(ctx, case, args.iterations, args.warmup, counter)
+            if args.json:
+                print(json.dumps({**meta, **result}), flush=True)
+            else:
+                print(f"{result['endpoint']:<26} {result['iterations']:>4} {result['p50_ms']:>9}"
+                      f" {result['p95_ms']:>9} {result['p99_ms']:>9}"
+                      f" {result['queries_per_request']:>8} {result['peak_kb']:>9}  {result['status']}",
+                      flush=True)
+
+        if args.audit and audit_summary(app.config["QUERY_AUDIT_LOG"]):
+            failed = True
+    finally:
+        if args.keep:
+            print(f"# kept {workdir}", file=sys.stderr)
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Login throughput of one worker, and catalog latency during a login burst.
+
+Runs a burst of concurrent logins through the Flask test client (one process,
+N request threads, like the gthread worker in the Procfile) while a separate
+thread keeps requesting the catalog, for each hash pool size / hash method
+given. Pool size 0 hashes inline on the request threads, as before the pool.
+
+    cd backend
+    python bench/login_throughput.py --threads 8 --seconds 5 --pool-sizes 0,1,2,4
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PASSWORD = "Bench@1234"
+
+
+def build_app(db_path, pool_size, method):
+    with contextlib.redirect_stdout(io.StringIO()):
+        from app import create_app, state_paths
+        return create_app({
+            "SQLALCHEMY_DATABASE_URI": "sqlite:///" + db_path,
+            **state_paths(os.path.dirname(db_path)),
+            "PASSWORD_HASH_WORKERS": pool_size,
+            "PASSWORD_HASH_METHOD": method,
+        })
+
+
+def run(pool_size, method, threads, seconds):
+    workdir = tempfile.mkdtemp()
+    db_path = os.path.join(workdir, "bench.db")
+
+    app = build_app(db_path, pool_size, method)
+    client = app.test_client()
+    client.post("/api/register", json={
+        "name": "Bench", "email": "bench@example.com",
+        "password": PASSWORD, "confirm_password": PASSWORD,
+    })
+
+    deadline = time.perf_counter() + seconds
+    counts = {"ok": 0, "busy": 0}
+    catalog_latency = []
+    lock = threading.Lock()
+
+    def login_loop():
+        c = app.test_client()
+        while time.perf_counter() < deadline:
+            r = c.post("/api/login", json={"email": "bench@example.com", "password": PASSWORD})
+            with lock:
+                counts["ok" if r.status_code == 200 else "busy"] += 1
+
+    def catalog_loop():
+        c = app.test_client()
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            c.get("/api/products?limit=24")
+            catalog_latency.append((time.perf_counter() - started) * 1000)
+
+    workers = [threading.Thread(target=login_loop) for _ in range(threads)]
+    workers.append(threading.Thread(target=catalog_loop))
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    catalog_latency.sort()
+    return {
+        "method": method,
+        "hash_workers": pool_size,
+        "login_threads": threads,
+        "logins_per_sec": round(counts["ok"] / seconds, 1),
+        "busy_503": counts["busy"],
+        "catalog_p50_ms": round(statistics.median(catalog_latency), 2),
+        "catalog_p95_ms": round(catalog_latency[int(len(catalog_latency) * 0.95) - 1], 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--pool-sizes", default="0,1,2,4")
+    parser.add_argument("--methods", default="scrypt:32768:8:1,pbkdf2:sha256:600000")
+    parser.add_argument("--json", action="store_true", help="one JSON object per line")
+    args = parser.parse_args()
+
+    for method in args.methods.split(","):
+        for pool_size in [int(n) for n in args.pool_sizes.split(",")]:
+            result = run(pool_size, method, args.threads, args.seconds)
+            if args.json:
+                print(json.dumps(result))
+            else:
+                pool = f"pool={pool_size}" if pool_size else "inline"
+                print(f"{method:<22} {pool:<7} {result['logins_per_sec']:>7} logins/s"
+                      f"  503s={result['busy_503']:<4}"
+                      f"  catalog p50={result['catalog_p50_ms']}ms p95={result['catalog_p95_ms']}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Worker occupancy for product images: plain send_from_directory vs /uploads.
+
+Simulates shoppers browsing catalog pages of product images with a simple
+browser cache (honours max-age / immutable, revalidates with If-None-Match)
+and counts how many requests reach the Python worker, how long the worker
+is busy with them and how many body bytes it streams, for:
+
+    baseline     send_from_directory with default headers (old behaviour)
+    hashed       /uploads with content-addressed names (immutable)
+    x-accel      /uploads with UPLOAD_SENDFILE = "x-accel-redirect"
+
+    cd backend
+    python bench/static_serving.py --shoppers 50 --views 10 --images 24
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+IMAGE_BYTES = 150 * 1024
+
+
+def build_app(db_path, upload_folder, sendfile):
+    with contextlib.redirect_stdout(io.StringIO()):
+        from app import create_app, state_paths
+        app = create_app({
+            "SQLALCHEMY_DATABASE_URI": "sqlite:///" + db_path,
+            **state_paths(os.path.dirname(db_path)),
+            "UPLOAD_FOLDER": upload_folder,
+            "UPLOAD_SENDFILE": sendfile,
+        })
+
+    from flask import send_from_directory
+
+    @app.route("/baseline/<filename>")
+    def baseline_file(filename):
+        return send_from_directory(upload_folder, filename)
+
+    return app
+
+
+def write_images(folder, count):
+    names = []
+    for i in range(count):
+        data = os.urandom(IMAGE_BYTES)
+        name = f"{i:024x}.jpg"  # content-addressed shape, see image_pipeline.HASHED_NAME
+        with open(os.path.join(folder, name), "wb") as fh:
+            fh.write(data)
+        names.append(name)
+    return names
+
+
+class Browser:
+    def __init__(self, client):
+        self.client = client
+        self.cache = {}  # url -> (etag, fresh_until)
+
+    def fetch(self, url, now, stats):
+        cached = self.cache.get(url)
+        if cached and cached[1] > now:
+            return  # served from browser cache, worker never sees it
+
+        headers = {"If-None-Match": cached[0]} if cached else {}
+        started = time.perf_counter()
+        response = self.client.get(url, headers=headers)
+        body = response.get_data()
+        stats["worker_ms"] += (time.perf_counter() - started) * 1000
+        stats["requests"] += 1
+        stats["body_bytes"] += len(body)
+        stats["304"] += response.status_code == 304
+
+        cc = response.cache_control
+        fresh_until = now + (cc.max_age or 0) if not cc.no_cache else now
+        self.cache[url] = (response.headers.get("ETag"), fresh_until)
+
+
+def run(mode, shoppers, views, image_count):
+    workdir = tempfile.mkdtemp()
+    try:
+        folder = os.path.join(workdir, "uploads")
+        os.makedirs(folder)
+        names = write_images(folder, image_count)
+
+        app = build_app(
+            os.path.join(workdir, "bench.db"),
+            folder,
+            "x-accel-redirect" if mode == "x-accel" else None,
+        )
+        prefix = "/baseline/" if mode == "baseline" else "/uploads/"
+
+        stats = {"requests": 0, "304": 0, "body_bytes": 0, "worker_ms": 0.0}
+        for _ in range(shoppers):
+            browser = Browser(app.test_client())
+            for view in range(views):
+                now = view * 60  # one catalog page view a minute
+                for name in names:
+                    browser.fetch(prefix + name, now, stats)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    image_views = shoppers * views * image_count
+    return {
+        "mode": mode,
+        "image_views": image_views,
+        "worker_requests": stats["requests"],
+        "not_modified": stats["304"],
+        "body_mb": round(stats["body_bytes"] / 1024 / 1024, 1),
+        "worker_ms": round(stats["worker_ms"], 1),
+        "worker_ms_per_view": round(stats["worker_ms"] / image_views, 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--shoppers", type=int, default=50)
+    parser.add_argument("--views", type=int, default=10)
+    parser.add_argument("--images", type=int, default=24)
+    parser.add_argument("--modes", default="baseline,hashed,x-accel")
+    parser.add_argument("--json", action="store_true", help="one JSON object per line")
+    args = parser.parse_args()
+
+    for mode in args.modes.split(","):
+        result = run(mode, args.shoppers, args.views, args.images)
+        if args.json:
+            print(json.dumps(result))
+        else:
+            print(f"{mode:<9} {result['worker_requests']:>6} worker requests"
+                  f" ({result['not_modified']} x 304)  {result['body_mb']:>7} MB streamed"
+                  f"  {result['worker_ms']:>9} ms busy")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+try:
+    import fcntl
+except ImportError:  # Windows dev boxes: single process, no file locks needed
+    fcntl = None
+
+
+# ==========================
+# GENERATION FILE
+# ==========================
+# A counter in a small file next to the database. Every gunicorn worker
+# sees a bump made by any other worker without asking SQLite.
+class GenerationFile:
+    def __init__(self, path=None):
+        self.path = path
+
+    def read(self):
+        try:
+            with open(self.path) as fh:
+                if fcntl:
+                    fcntl.flock(fh, fcntl.LOCK_SH)
+                return int(fh.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def bump(self):
+        # ✅ Call AFTER db.session.commit() so no reader can cache old rows
+        #    under the new generation
+        with open(self.path, "a+") as fh:
+            if fcntl:
+                fcntl.flock(fh, fcntl.LOCK_EX)
+            fh.seek(0)
+            generation = int(fh.read().strip() or 0) + 1
+            fh.seek(0)
+            fh.truncate()
+            fh.write(str(generation))
+            fh.flush()
+        return generation
+
+
+# ==========================
+# CATALOG RESPONSE CACHE
+# ==========================
+# Pre-serialized catalog bodies are cached per worker under (generation,
+# query string) and dropped as soon as the catalog generation file moves.
+class CatalogCache:
+    def __init__(self):
+        self.counter = GenerationFile()
+        self.max_entries = 256
+        self._lock = threading.Lock()
+        self._generation = None
+        self._bodies = OrderedDict()
+
+    def init_app(self, app):
+        self.counter.path = app.config.setdefault(
+            "CATALOG_GENERATION_FILE",
+            os.path.join(app.instance_path, "catalog_generation")
+        )
+        self.max_entries = app.config.setdefault("CATALOG_CACHE_SIZE", 256)
+
+        # ✅ Bodies belong to the previous app's database and generation file
+        with self._lock:
+            self._generation = None
+            self._bodies.clear()
+
+        folder = os.path.dirname(self.counter.path)
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+
+    # ---------- GENERATION ----------
+    def generation(self):
+        return self.counter.read()
+
+    def bump(self):
+        return self.counter.bump()
+
+    # ---------- BODIES ----------
+    def etag(self, generation, key):
+        digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+        return f"catalog-{generation}-{digest}"
+
+    def get(self, generation, key):
+        with self._lock:
+            if generation != self._generation:
+                return None
+
+            body = self._bodies.get(key)
+            if body is not None:
+                self._bodies.move_to_end(key)
+            return body
+
+    def set(self, generation, key, body):
+        with self._lock:
+            if self._generation is not None and generation < self._generation:
+                return
+
+            if generation != self._generation:
+                self._bodies.clear()
+                self._generation = generation
+
+            self._bodies[key] = body
+            self._bodies.move_to_end(key)
+            while len(self._bodies) > self.max_entries:
+                self._bodies.popitem(last=False)
+
+
+catalog_cache = CatalogCache()
@@ -0,0 +1,129 @@
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+
+COMPRESSIBLE_MIMETYPES = {
+    "application/json",
+    "application/x-ndjson",
+    "text/csv",
+    "text/html",
+    "text/plain",
+}
+
+
+# ==========================
+# RESPONSE COMPRESSION
+# ==========================
+# after_request hook that gzips (or brotli-encodes, if the brotli package is
+# installed and the client prefers it) JSON and text bodies of at least
+# COMPRESS_MIN_SIZE bytes. Streamed responses (CSV / ZIP exports) and
+# send_file responses are left alone.
+#
+# Bodies carrying a strong ETag are the same bytes every time (the catalog
+# ETag covers generation + query), so their compressed form is kept in a
+# small LRU and a catalog hit costs a SHA-1 of the body instead of a gzip
+# run. The key includes that digest, so an ETag reused after a reset
+# generation file (or by another app in the same process) can never serve
+# someone else's bytes. Compressed responses get a weak ETag, as nginx does.
+class Compressor:
+    def __init__(self):
+        self.min_size = 1024
+        self.gzip_level = 6
+        self.brotli_quality = 4
+        self.cache_size = 256
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+
+    def init_app(self, app):
+        self.min_size = app.config.setdefault("COMPRESS_MIN_SIZE", 1024)
+        self.gzip_level = app.config.setdefault("COMPRESS_GZIP_LEVEL", 6)
+        self.brotli_quality = app.config.setdefault("COMPRESS_BROTLI_QUALITY", 4)
+        self.cache_size = app.config.setdefault("COMPRESS_CACHE_SIZE", 256)
+        with self._lock:
+            self._cache.clear()
+        app.after_request(self.after_request)
+
+    def choose_encoding(self, accept_encodings):
+        gzip_q = accept_encodings.quality("gzip")
+        if brotli is not None:
+            br_q = accept_encodings.quality("br")
+            if br_q > 0 and br_q >= gzip_q:
+                return "br"
+        return "gzip" if gzip_q > 0 else None
+
+    def encode(self, body, encoding):
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+    def after_request(self, response):
+        if response.status_code == 304:
+            response.vary.add("Accept-Encoding")
+            etag, weak = response.get_etag()
+            if etag and not weak and self.choose_encoding(request.accept_encodings):
+                response.set_etag(etag, weak=True)
+            return response
+
+        if (
+            response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or response.direct_passthrough
+            or response.is_streamed
+            or "Content-Encoding" in response.headers
+        ):
+            return response
+
+        response.vary.add("Accept-Encoding")
+
+        if response.status_code < 200 or response.status_code in (204, 206):
+            return response
+
+        encoding = self.choose_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+
+        body = response.get_data()
+        if len(body) < self.min_size:
+            return response
+
+        etag, weak = response.get_etag()
+        key = (etag, encoding, hashlib.sha1(body).digest()) if etag and not weak else None
+
+        compressed = self._cached(key)
+        if compressed is None:
+            compressed = self.encode(body, encoding)
+            if key:
+                self._store(key, compressed)
+
+        response.set_data(compressed)
+        response.headers["Content-Encoding"] = encoding
+        if etag:
+            response.set_etag(etag, weak=True)
+        return response
+
+    def _cached(self, key):
+        if key is None:
+            return None
+        with self._lock:
+            compressed = self._cache.get(key)
+            if compressed is not None:
+                self._cache.move_to_end(key)
+            return compressed
+
+    def _store(self, key, compressed):
+        with self._lock:
+            self._cache[key] = compressed
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+
+compressor = Compressor()
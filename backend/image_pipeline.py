@@ -0,0 +1,263 @@
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app, request
+from werkzeug.security import safe_join
+from werkzeug.utils import secure_filename, send_from_directory
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow missing: originals are still stored, no variants
+    Image = None
+
+
+ALLOWED_EXTENSIONS = {"jpg", "jpeg", "png", "webp", "gif"}
+
+# name -> longest edge in px
+VARIANTS = {
+    "thumb": 160,
+    "card": 480,
+    "full": 1200,
+}
+
+VARIANT_FORMATS = {
+    "jpeg": ("jpg", {"format": "JPEG", "quality": 82, "optimize": True, "progressive": True}),
+    "webp": ("webp", {"format": "WEBP", "quality": 80, "method": 4}),
+}
+
+# <24 hex digest>.<ext> for originals, <digest>_<variant>.<ext> for variants
+HASHED_NAME = re.compile(r"^(?P<digest>[0-9a-f]{24})(?:_(?P<variant>[a-z]+))?\.(?P<ext>[a-z]+)$")
+
+CHUNK_SIZE = 64 * 1024
+
+ONE_YEAR = 365 * 24 * 3600
+
+SENDFILE_MODES = (None, "x-sendfile", "x-accel-redirect")
+
+
+class UploadError(Exception):
+    pass
+
+
+# ==========================
+# URLS
+# ==========================
+def variant_name(digest, variant, ext):
+    return f"{digest}_{variant}.{ext}"
+
+
+def image_variants(image_url):
+    if not image_url:
+        return None
+
+    match = HASHED_NAME.match(os.path.basename(image_url))
+    if not match or match.group("variant"):
+        return None  # legacy upload, only the original exists
+
+    digest = match.group("digest")
+    return {
+        variant: {
+            fmt: f"/uploads/{variant_name(digest, variant, ext)}"
+            for fmt, (ext, _) in VARIANT_FORMATS.items()
+        }
+        for variant in VARIANTS
+    }
+
+
+def original_for_variant(folder, filename):
+    # Variant requested before the background job wrote it -> serve the original
+    match = HASHED_NAME.match(filename)
+    if not match or not match.group("variant"):
+        return None
+
+    for ext in ALLOWED_EXTENSIONS:
+        name = f"{match.group('digest')}.{ext}"
+        if os.path.exists(os.path.join(folder, name)):
+            return name
+    return None
+
+
+# ==========================
+# UPLOAD PIPELINE
+# ==========================
+# The upload is streamed to a temp file in 64 KB chunks while being hashed,
+# then renamed to its content hash. Re-uploading the same bytes under any
+# filename reuses the stored file. Resized JPEG + WebP variants are built on
+# a small background pool so the admin request returns right away.
+class ImagePipeline:
+    def __init__(self):
+        self.folder = None
+        self.workers = 2
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+
+    def init_app(self, app):
+        self.folder = app.config["UPLOAD_FOLDER"]
+        self.workers = app.config.setdefault("IMAGE_VARIANT_WORKERS", 2)
+        app.config.setdefault("UPLOAD_MAX_AGE", 3600)
+        app.config.setdefault("UPLOAD_SENDFILE", None)
+        app.config.setdefault("UPLOAD_ACCEL_PREFIX", "/_uploads/")
+
+        if app.config["UPLOAD_SENDFILE"] not in SENDFILE_MODES:
+            raise ValueError(f"UPLOAD_SENDFILE must be one of {SENDFILE_MODES}")
+
+    def save(self, file_storage):
+        ext = secure_filename(file_storage.filename or "").rsplit(".", 1)[-1].lower()
+        if ext not in ALLOWED_EXTENSIONS:
+            raise UploadError(f"Image must be one of: {', '.join(sorted(ALLOWED_EXTENSIONS))}")
+        if ext == "jpeg":
+            ext = "jpg"
+
+        if not os.path.exists(self.folder):
+            os.makedirs(self.folder)
+
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=self.folder, suffix=".upload")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                while True:
+                    chunk = file_storage.stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    fh.write(chunk)
+
+            if Image is not None:
+                try:
+                    with Image.open(tmp_path) as probe:
+                        probe.verify()
+                except Exception:
+                    raise UploadError("Uploaded file is not a valid image")
+
+            name = f"{digest.hexdigest()[:24]}.{ext}"
+            path = os.path.join(self.folder, name)
+
+            if os.path.exists(path):
+                os.remove(tmp_path)  # ✅ same bytes already stored
+            else:
+                os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        self.submit_variants(path)
+        return f"/uploads/{name}"
+
+    def submit_variants(self, path):
+        if Image is None:
+            return
+
+        with self._lock:
+            # ✅ Created lazily per process so gunicorn --preload forks stay safe
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix="image-variants"
+                )
+                self._pid = os.getpid()
+            future = self._executor.submit(build_variants, path)
+
+        # ✅ The job runs outside the request: log its failure with the app's logger
+        logger = current_app.logger
+        future.add_done_callback(lambda done: log_variant_failure(done, path, logger))
+
+
+def log_variant_failure(future, path, logger):
+    exc = future.exception()
+    if exc is not None:
+        logger.error("Building image variants for %s failed", path, exc_info=exc)
+
+
+def build_variants(path):
+    folder, filename = os.path.split(path)
+    digest = HASHED_NAME.match(filename).group("digest")
+
+    with Image.open(path) as source:
+        source = ImageOps.exif_transpose(source)
+        if source.mode not in ("RGB", "L"):
+            source = source.convert("RGB")
+
+        for variant, edge in VARIANTS.items():
+            resized = source.copy()
+            resized.thumbnail((edge, edge), Image.LANCZOS)
+
+            for ext, options in VARIANT_FORMATS.values():
+                target = os.path.join(folder, variant_name(digest, variant, ext))
+                if os.path.exists(target):
+                    continue
+
+                fd, tmp_path = tempfile.mkstemp(dir=folder, suffix=".variant")
+                try:
+                    with os.fdopen(fd, "wb") as fh:
+                        resized.save(fh, **options)
+                    os.replace(tmp_path, target)
+                except BaseException:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+                    raise
+
+
+image_pipeline = ImagePipeline()
+
+
+# ==========================
+# SERVING
+# ==========================
+# Content-addressed files never change, so they get their name as a strong
+# ETag and a one-year immutable Cache-Control; browsers stop revalidating
+# them at all. Legacy names keep werkzeug's mtime ETag with a short max-age.
+# Range requests are answered by werkzeug's make_conditional.
+#
+# UPLOAD_SENDFILE = "x-sendfile" (Apache / lighttpd) or "x-accel-redirect"
+# (nginx, internal location at UPLOAD_ACCEL_PREFIX) hands the body to the
+# front proxy, which then also answers Range requests; the worker only
+# computes headers and 304s.
+def send_upload(filename):
+    config = current_app.config
+    folder = config["UPLOAD_FOLDER"]
+    mode = config["UPLOAD_SENDFILE"]
+
+    etag, max_age = True, config["UPLOAD_MAX_AGE"]
+    immutable = HASHED_NAME.match(filename) is not None
+    path = safe_join(folder, filename)
+
+    if path and not os.path.exists(path):
+        original = original_for_variant(folder, filename)
+        if original:
+            # ✅ Never pin a variant URL to the original's bytes
+            filename, immutable, max_age = original, False, None
+
+    if immutable:
+        etag, max_age = filename.rsplit(".", 1)[0], ONE_YEAR
+
+    response = send_from_directory(
+        folder,
+        filename,
+        request.environ,
+        etag=etag,
+        max_age=max_age,
+        use_x_sendfile=mode is not None,
+        conditional=mode is None,
+        response_class=current_app.response_class,
+    )
+
+    if immutable:
+        response.cache_control.immutable = True
+
+    if mode is not None:
+        # ✅ 304s stay in Python; byte ranges are left to the proxy
+        response = response.make_conditional(request.environ)
+        sendfile_path = response.headers.pop("X-Sendfile")
+        if response.status_code == 200:
+            if mode == "x-accel-redirect":
+                response.headers["X-Accel-Redirect"] = config["UPLOAD_ACCEL_PREFIX"] + filename
+            else:
+                response.headers["X-Sendfile"] = sendfile_path
+
+    return response
@@ -0,0 +1,578 @@
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+from reportlab.lib import colors
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+
+from metrics import metrics
+
+
+# Bump when the PDF layout changes so cached files are not reused
+LAYOUT_VERSION = 1
+
+# ==========================
+# STYLES (built once at import)
+# ==========================
+STYLES = getSampleStyleSheet()
+
+TITLE_STYLE = ParagraphStyle(
+    "title_style",
+    parent=STYLES["Title"],
+    fontSize=18,
+    spaceAfter=6
+)
+
+SMALL_STYLE = ParagraphStyle(
+    "small",
+    parent=STYLES["Normal"],
+    fontSize=10,
+    leading=13
+)
+
+META_TABLE_STYLE = TableStyle([
+    ("VALIGN", (0, 0), (-1, -1), "TOP"),
+    ("BOX", (0, 0), (-1, -1), 0.5, colors.lightgrey),
+    ("INNERGRID", (0, 0), (-1, -1), 0.25, colors.whitesmoke),
+    ("BACKGROUND", (0, 0), (-1, -1), colors.whitesmoke),
+    ("LEFTPADDING", (0, 0), (-1, -1), 8),
+    ("RIGHTPADDING", (0, 0), (-1, -1), 8),
+    ("TOPPADDING", (0, 0), (-1, -1), 8),
+    ("BOTTOMPADDING", (0, 0), (-1, -1), 8),
+])
+
+ITEMS_TABLE_STYLE = TableStyle([
+    ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
+    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+    ("FONTSIZE", (0, 0), (-1, 0), 10),
+
+    ("GRID", (0, 0), (-1, -2), 0.3, colors.grey),
+    ("ALIGN", (0, 0), (0, -1), "CENTER"),
+    ("ALIGN", (2, 1), (-1, -1), "CENTER"),
+    ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+    ("FONTSIZE", (0, 1), (-1, -1), 10),
+
+    # Total row styling
+    ("FONTNAME", (0, -1), (-1, -1), "Helvetica-Bold"),
+    ("BACKGROUND", (0, -1), (-1, -1), colors.whitesmoke),
+    ("LINEABOVE", (0, -1), (-1, -1), 1, colors.black),
+    ("SPAN", (0, -1), (3, -1)),
+    ("ALIGN", (3, -1), (3, -1), "RIGHT"),
+    ("ALIGN", (4, -1), (4, -1), "RIGHT"),
+])
+
+# ==========================
+# TEMPLATE (built once at import)
+# ==========================
+DOC_OPTIONS = {
+    "pagesize": A4,
+    "rightMargin": 18 * mm,
+    "leftMargin": 18 * mm,
+    "topMargin": 16 * mm,
+    "bottomMargin": 16 * mm,
+}
+
+META_COL_WIDTHS = [55 * mm, 65 * mm]
+META_OUTER_COL_WIDTHS = [90 * mm, 90 * mm]
+ITEMS_COL_WIDTHS = [10 * mm, 80 * mm, 15 * mm, 30 * mm, 30 * mm]
+ITEMS_HEADER = ["#", "Item", "Qty", "Unit Price (₹)", "Subtotal (₹)"]
+
+FOOTER_LINES = [
+    "Thank you for shopping with Desi Farms!",
+    "For support: vaishnavidivekar3012@gmail.com",
+]
+
+
+# ==========================
+# SNAPSHOT
+# ==========================
+# Plain dict with everything the PDF shows. Rendering only ever reads the
+# snapshot, so it can run outside the request (threads, process pools)
+# and its hash doubles as the cache key.
+def invoice_snapshot(order):
+    return {
+        "id": order.id,
+        "invoice_no": order.invoice_no or f"DF-{order.id}",
+        "date": order.created_at.strftime("%d-%m-%Y %H:%M"),
+        "status": order.status,
+        "payment_method": order.payment_method or "Cash on Delivery",
+        "customer_name": order.customer_name or "Customer",
+        "phone": order.phone or "-",
+        "address": order.address or "-",
+        "city": order.city or "-",
+        "pincode": order.pincode or "-",
+        "items": [
+            {
+                "name": item.product.name if item.product else "Deleted Product",
+                "price": float(item.price),
+                "quantity": int(item.quantity),
+            }
+            for item in order.items
+        ],
+    }
+
+
+def snapshot_key(snapshot):
+    raw = json.dumps([LAYOUT_VERSION, snapshot], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def download_name(snapshot):
+    return f"DesiFarms_Invoice_{snapshot['id']}.pdf"
+
+
+# ==========================
+# RENDER
+# ==========================
+def render_invoice_pdf(snapshot):
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(
+        buffer,
+        title=f"Invoice {snapshot['invoice_no']}",
+        **DOC_OPTIONS
+    )
+
+    elements = []
+
+    # ---------- HEADER ----------
+    elements.append(Paragraph("Desi Farms", TITLE_STYLE))
+    elements.append(Paragraph("Fresh & Organic Products", SMALL_STYLE))
+    elements.append(Spacer(1, 10))
+
+    # ---------- INVOICE META + CUSTOMER ----------
+    meta_left = [
+        ["Invoice No:", snapshot["invoice_no"]],
+        ["Order ID:", f"#{snapshot['id']}"],
+        ["Date:", snapshot["date"]],
+        ["Status:", snapshot["status"]],
+        ["Payment:", snapshot["payment_method"]],
+    ]
+
+    customer_right = [
+        ["Bill To:", snapshot["customer_name"]],
+        ["Phone:", snapshot["phone"]],
+        ["Address:", snapshot["address"]],
+        ["City / PIN:", f"{snapshot['city']} / {snapshot['pincode']}"],
+    ]
+
+    meta_table = Table(
+        [[Table(meta_left, colWidths=META_COL_WIDTHS),
+          Table(customer_right, colWidths=META_COL_WIDTHS)]],
+        colWidths=META_OUTER_COL_WIDTHS
+    )
+    meta_table.setStyle(META_TABLE_STYLE)
+
+    elements.append(meta_table)
+    elements.append(Spacer(1, 14))
+
+    # ---------- ITEMS TABLE ----------
+    data = [ITEMS_HEADER]
+
+    grand_total = 0.0
+    for idx, item in enumerate(snapshot["items"], start=1):
+        subtotal = item["price"] * item["quantity"]
+        grand_total += subtotal
+
+        data.append([
+            str(idx),
+            item["name"],
+            str(item["quantity"]),
+            f"{item['price']:.2f}",
+            f"{subtotal:.2f}"
+        ])
+
+    data.append(["", "", "", "Grand Total", f"₹ {grand_total:.2f}"])
+
+    table = Table(data, colWidths=ITEMS_COL_WIDTHS, hAlign="LEFT")
+    table.setStyle(ITEMS_TABLE_STYLE)
+
+    elements.append(table)
+    elements.append(Spacer(1, 18))
+
+    for line in FOOTER_LINES:
+        elements.append(Paragraph(line, SMALL_STYLE))
+
+    doc.build(elements)
+    return buffer.getvalue()
+
+
+def render_with_timing(snapshot):
+    started = time.perf_counter()
+    pdf_bytes = render_invoice_pdf(snapshot)
+    return pdf_bytes, time.perf_counter() - started
+
+
+def timed_render(snapshot, source="download"):
+    pdf_bytes, seconds = render_with_timing(snapshot)
+    invoice_prerenderer.record_render(seconds)
+    metrics.observe("desi_invoice_render_seconds", seconds, (("source", source),))
+    return pdf_bytes
+
+
+# ==========================
+# DISK CACHE (LRU by mtime)
+# ==========================
+# Files are named by snapshot hash, so a status change or edited order
+# simply misses and renders a new file; stale ones age out by LRU.
+#
+# Each process keeps a running byte count instead of scanning the folder on
+# every store. It scans only when its count goes over INVOICE_CACHE_MAX_BYTES,
+# or when INVOICE_CACHE_SCAN_SECONDS have passed, which picks up files
+# written by other workers. A scan evicts down to 90% of the limit, so a
+# full cache does not rescan on the very next store.
+class InvoiceCache:
+    def __init__(self):
+        self.folder = None
+        self.max_bytes = 256 * 1024 * 1024
+        self.scan_seconds = 300
+        self._lock = threading.Lock()
+        self._bytes = None  # unknown until the first scan
+        self._scanned_at = 0.0
+
+    def init_app(self, app):
+        self.folder = app.config.setdefault(
+            "INVOICE_CACHE_DIR",
+            os.path.join(app.instance_path, "invoice_cache")
+        )
+        self.max_bytes = app.config.setdefault(
+            "INVOICE_CACHE_MAX_BYTES", 256 * 1024 * 1024
+        )
+        self.scan_seconds = app.config.setdefault("INVOICE_CACHE_SCAN_SECONDS", 300)
+        self._bytes = None
+
+        if not os.path.exists(self.folder):
+            os.makedirs(self.folder)
+
+    def path_for(self, key):
+        return os.path.join(self.folder, f"{key}.pdf")
+
+    def lookup(self, key):
+        path = self.path_for(key)
+        try:
+            os.utime(path)  # ✅ mark as recently used
+        except FileNotFoundError:
+            return None
+        return path
+
+    def store(self, key, pdf_bytes):
+        fd, tmp_path = tempfile.mkstemp(dir=self.folder, suffix=".tmp")
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(pdf_bytes)
+        path = self.path_for(key)
+        try:
+            replaced = os.stat(path).st_size
+        except FileNotFoundError:
+            replaced = 0
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._bytes is not None:
+                self._bytes += len(pdf_bytes) - replaced
+            due = (
+                self._bytes is None
+                or self._bytes > self.max_bytes
+                or time.monotonic() - self._scanned_at >= self.scan_seconds
+            )
+        if due:
+            self.evict(keep=path)
+        return path
+
+    def get_or_render(self, snapshot):
+        key = snapshot_key(snapshot)
+        path = self.lookup(key)
+        if path:
+            return path
+
+        # ✅ A background job for this exact invoice may be about to finish
+        path = invoice_prerenderer.wait_for(key)
+        if path:
+            return path
+
+        return self.store(key, timed_render(snapshot))
+
+    def evict(self, keep=None):
+        with self._lock:
+            entries = []
+            total = 0
+            for entry in os.scandir(self.folder):
+                if not entry.name.endswith(".pdf"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                total += stat.st_size
+                if entry.path != keep:
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+            if total > self.max_bytes:
+                entries.sort()
+                for _, size, path in entries:
+                    if total <= self.max_bytes * 0.9:
+                        break
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                    total -= size
+
+            self._bytes = total
+            self._scanned_at = time.monotonic()
+
+
+invoice_cache = InvoiceCache()
+
+
+# ==========================
+# BACKGROUND PRE-RENDERING
+# ==========================
+# place_order / update_order_status hand a snapshot to a small thread pool
+# so the PDF is usually on disk before the customer clicks download. The
+# backlog is bounded: when it is full new jobs are dropped and the download
+# route renders synchronously as before.
+#
+# The backlog and job outcomes are also kept as metrics, so stats() (and
+# /api/orders/invoice-queue) report them for every worker, as of each
+# worker's last metrics flush; "this_process" holds the answering worker's
+# own live numbers, including render times.
+class InvoicePrerenderer:
+    def __init__(self):
+        self.max_workers = 2
+        self.max_queue = 64
+        self.wait_seconds = 2.0
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self._pending = {}
+        self._stats = {
+            "submitted": 0,
+            "dropped": 0,
+            "completed": 0,
+            "failed": 0,
+            "renders": 0,
+            "render_seconds_total": 0.0,
+            "render_seconds_max": 0.0,
+        }
+
+    def init_app(self, app):
+        self.max_workers = app.config.setdefault("INVOICE_RENDER_WORKERS", 2)
+        self.max_queue = app.config.setdefault("INVOICE_RENDER_QUEUE", 64)
+        self.wait_seconds = app.config.setdefault("INVOICE_RENDER_WAIT_SECONDS", 2.0)
+
+    def _get_executor(self):
+        # ✅ Created lazily per process so gunicorn --preload forks stay safe
+        if self._executor is None or self._pid != os.getpid():
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="invoice-render"
+            )
+            self._pid = os.getpid()
+            self._pending = {}
+        return self._executor
+
+    def submit(self, snapshot):
+        key = snapshot_key(snapshot)
+
+        with self._lock:
+            if key in self._pending:
+                return
+            if len(self._pending) >= self.max_queue:
+                self._count("dropped")
+                return
+
+            future = self._get_executor().submit(self._run, key, snapshot)
+            self._pending[key] = future
+            self._count("submitted")
+            metrics.add_gauge("desi_invoice_prerender_queue_depth")
+
+    # Callers hold self._lock
+    def _count(self, outcome):
+        self._stats[outcome] += 1
+        metrics.inc("desi_invoice_prerender_jobs_total", (("outcome", outcome),))
+
+    def _run(self, key, snapshot):
+        try:
+            path = invoice_cache.lookup(key)
+            if not path:
+                path = invoice_cache.store(key, timed_render(snapshot, "prerender"))
+        except Exception:
+            with self._lock:
+                self._count("failed")
+            raise
+        finally:
+            with self._lock:
+                if self._pending.pop(key, None) is not None:
+                    metrics.add_gauge("desi_invoice_prerender_queue_depth", value=-1)
+
+        with self._lock:
+            self._count("completed")
+        return path
+
+    def wait_for(self, key):
+        with self._lock:
+            future = self._pending.get(key)
+
+        if future is None:
+            return None
+
+        try:
+            return future.result(timeout=self.wait_seconds)
+        except Exception:
+            return None
+
+    def record_render(self, seconds):
+        with self._lock:
+            self._stats["renders"] += 1
+            self._stats["render_seconds_total"] += seconds
+            self._stats["render_seconds_max"] = max(
+                self._stats["render_seconds_max"], seconds
+            )
+
+    def stats(self):
+        with self._lock:
+            local = dict(self._stats)
+            local["queue_depth"] = len(self._pending)
+
+        local["pid"] = os.getpid()
+        local["render_seconds_avg"] = (
+            local["render_seconds_total"] / local["renders"]
+            if local["renders"] else 0.0
+        )
+
+        counters, gauges, _ = metrics.collect()
+        stats = {"queue_depth": sum(
+            value for (name, _), value in gauges.items()
+            if name == "desi_invoice_prerender_queue_depth"
+        )}
+        for outcome in ("submitted", "dropped", "completed", "failed"):
+            stats[outcome] = counters.get(
+                ("desi_invoice_prerender_jobs_total", (("outcome", outcome),)), 0
+            )
+
+        stats["workers"] = self.max_workers  # per process
+        stats["max_queue"] = self.max_queue  # per process
+        stats["this_process"] = local
+        return stats
+
+
+invoice_prerenderer = InvoicePrerenderer()
+
+
+# ==========================
+# BULK ZIP EXPORT
+# ==========================
+# Zip bytes are flushed to the client after every entry, and at most
+# `window` PDFs per export are in flight, so memory stays flat however many
+# invoices the date range covers.
+#
+# All exports of a worker share one process pool, created on first use and
+# started with forkserver (spawn where forkserver is missing): forking a
+# threaded gunicorn worker mid-request can copy held locks into the child.
+# At most INVOICE_EXPORT_CONCURRENCY exports run at once per worker; the
+# route answers 503 beyond that.
+class _ZipStream(io.RawIOBase):
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class InvoiceExporter:
+    def __init__(self):
+        self.processes = os.cpu_count() or 1
+        self.max_exports = 2
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pid = None
+        self._slots = threading.BoundedSemaphore(self.max_exports)
+
+    def init_app(self, app):
+        self.processes = app.config.setdefault("INVOICE_EXPORT_PROCESSES", None) or os.cpu_count() or 1
+        self.max_exports = app.config.setdefault("INVOICE_EXPORT_CONCURRENCY", 2)
+        self._slots = threading.BoundedSemaphore(self.max_exports)
+
+    def _get_pool(self):
+        with self._lock:
+            # ✅ Created lazily per process so gunicorn --preload forks stay safe
+            if self._pool is None or self._pid != os.getpid():
+                method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context(method)
+                )
+                self._pid = os.getpid()
+            return self._pool
+
+    def acquire(self):
+        return self._slots.acquire(blocking=False)
+
+    def release(self):
+        self._slots.release()
+
+    def export_zip(self, snapshots):
+        stream = _ZipStream()
+        archive = zipfile.ZipFile(stream, mode="w", compression=zipfile.ZIP_STORED)
+
+        def add(snapshot, pdf_bytes):
+            archive.writestr(f"{snapshot['invoice_no']}.pdf", pdf_bytes)
+            return stream.drain()
+
+        def add_rendered(snapshot, future):
+            # ✅ Timed inside the worker process, recorded here in ours
+            pdf_bytes, seconds = future.result()
+            metrics.observe("desi_invoice_render_seconds", seconds, (("source", "export"),))
+            return add(snapshot, pdf_bytes)
+
+        window = self.processes * 2
+        in_flight = {}
+
+        try:
+            for snapshot in snapshots:
+                # ✅ Already rendered (download or pre-render) -> no process hop
+                path = invoice_cache.lookup(snapshot_key(snapshot))
+                if path:
+                    with open(path, "rb") as fh:
+                        yield add(snapshot, fh.read())
+                    continue
+
+                in_flight[self._get_pool().submit(render_with_timing, snapshot)] = snapshot
+
+                if len(in_flight) >= window:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield add_rendered(in_flight.pop(future), future)
+
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield add_rendered(in_flight.pop(future), future)
+        finally:
+            # Client went away: drop what has not started, the pool is shared
+            for future in in_flight:
+                future.cancel()
+
+        archive.close()
+        yield stream.drain()
+
+
+invoice_exporter = InvoiceExporter()
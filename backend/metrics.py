@@ -0,0 +1,362 @@
+import atexit
+import glob
+import hmac
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+
+from flask import Response, abort, g, has_request_context, request
+from sqlalchemy import event
+
+try:
+    import fcntl
+except ImportError:  # Windows dev boxes: single process, no file locks needed
+    fcntl = None
+
+
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+RENDER_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+HELP = {
+    "desi_http_request_duration_seconds": ("histogram", "Request latency by endpoint, method and status"),
+    "desi_http_requests_in_flight": ("gauge", "Requests currently being handled"),
+    "desi_db_statements_total": ("counter", "SQL statements executed, by endpoint and status"),
+    "desi_db_statement_seconds_total": ("counter", "Time spent in SQL statements, by endpoint and status"),
+    "desi_invoice_render_seconds": ("histogram", "ReportLab invoice render time, by source"),
+    "desi_invoice_prerender_queue_depth": ("gauge", "Invoice pre-render jobs queued or running"),
+    "desi_invoice_prerender_jobs_total": ("counter", "Invoice pre-render jobs, by outcome"),
+}
+
+ARCHIVE = "archive.json"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+# ==========================
+# METRICS REGISTRY
+# ==========================
+# Each process keeps its own counters, gauges and histograms in memory; a
+# daemon thread writes them to METRICS_DIR/<pid>-<start>.json every
+# METRICS_FLUSH_SECONDS when something changed (and at exit), so requests
+# never touch the disk. GET /metrics merges every file in the directory,
+# so any gunicorn worker can answer a scrape for all of them. Files of dead
+# workers are folded into archive.json, which keeps counters monotonic
+# across restarts; their gauges are dropped.
+class Metrics:
+    def __init__(self):
+        self.directory = None
+        self.flush_seconds = 1.0
+        self.token = None
+        self.buckets = {
+            "desi_http_request_duration_seconds": HTTP_BUCKETS,
+            "desi_invoice_render_seconds": RENDER_BUCKETS,
+        }
+        self._lock = threading.Lock()
+        self._counters = {}    # (name, labels) -> value
+        self._gauges = {}      # (name, labels) -> value
+        self._histograms = {}  # (name, labels) -> [bucket counts..., +Inf, sum]
+        self._dirty = False
+        self._pid = None
+        self._filename = None
+        atexit.register(self.flush)
+
+    def init_app(self, app):
+        from extensions import db
+
+        self.directory = app.config.setdefault(
+            "METRICS_DIR", os.path.join(app.instance_path, "metrics")
+        )
+        self.flush_seconds = app.config.setdefault("METRICS_FLUSH_SECONDS", 1.0)
+        self.buckets["desi_http_request_duration_seconds"] = tuple(
+            app.config.setdefault("METRICS_HTTP_BUCKETS", HTTP_BUCKETS)
+        )
+        # ✅ When set, scrapes must send "Authorization: Bearer <token>"
+        self.token = app.config.setdefault("METRICS_TOKEN", os.environ.get("METRICS_TOKEN"))
+
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        app.add_url_rule("/metrics", "metrics", self.render_endpoint)
+
+        with app.app_context():
+            self.instrument_engine(db.engine)
+
+    # ---------- RECORDING ----------
+    # Callers hold self._lock
+    def _own_process(self):
+        # ✅ Checked on every write: a gunicorn --preload fork must not report
+        #    the master's numbers or rely on its (not inherited) flush thread
+        pid = os.getpid()
+        if pid == self._pid:
+            return
+        self._pid = pid
+        self._filename = os.path.join(self.directory, f"{pid}-{int(time.time() * 1000)}.json")
+        self._counters, self._gauges, self._histograms = {}, {}, {}
+        threading.Thread(target=self._flush_loop, args=(pid,), name="metrics-flush", daemon=True).start()
+
+    def inc(self, name, labels=(), value=1):
+        key = (name, tuple(labels))
+        with self._lock:
+            self._own_process()
+            self._counters[key] = self._counters.get(key, 0) + value
+            self._dirty = True
+
+    def add_gauge(self, name, labels=(), value=1):
+        key = (name, tuple(labels))
+        with self._lock:
+            self._own_process()
+            self._gauges[key] = self._gauges.get(key, 0) + value
+            self._dirty = True
+
+    def observe(self, name, value, labels=()):
+        bounds = self.buckets[name]
+        key = (name, tuple(labels))
+        with self._lock:
+            self._own_process()
+            self._dirty = True
+            counts = self._histograms.get(key)
+            if counts is None:
+                counts = self._histograms[key] = [0] * (len(bounds) + 1) + [0.0]
+            counts[bisect_left(bounds, value)] += 1
+            counts[-1] += value
+
+    # ---------- HTTP ----------
+    def _endpoint_labels(self):
+        return (("endpoint", request.endpoint or "unmatched"), ("method", request.method))
+
+    def _before_request(self):
+        g._metrics_started = time.perf_counter()
+        g._metrics_sql = [0, 0.0]
+        g._metrics_endpoint = self._endpoint_labels()
+        self.add_gauge("desi_http_requests_in_flight", g._metrics_endpoint)
+
+    def _after_request(self, response):
+        g._metrics_status = response.status_code
+        return response
+
+    def _teardown_request(self, exc):
+        started = g.pop("_metrics_started", None)
+        if started is None:
+            return
+
+        endpoint = g.pop("_metrics_endpoint")
+        status = 500 if exc is not None else g.pop("_metrics_status", 500)
+        labels = endpoint + (("status", str(status)),)
+        statements, sql_seconds = g.pop("_metrics_sql")
+
+        self.add_gauge("desi_http_requests_in_flight", endpoint, -1)
+        self.observe("desi_http_request_duration_seconds", time.perf_counter() - started, labels)
+        if statements:
+            self.inc("desi_db_statements_total", labels, statements)
+            self.inc("desi_db_statement_seconds_total", labels, sql_seconds)
+
+    # ---------- SQL ----------
+    # Statements are totalled on flask.g and recorded once at teardown under
+    # the request's labels; anything outside a request (background render
+    # threads, CLI commands) is recorded under endpoint="none".
+    def instrument_engine(self, engine):
+        @event.listens_for(engine, "before_cursor_execute")
+        def _start_statement(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("_metrics_started", []).append(time.perf_counter())
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def _end_statement(conn, cursor, statement, parameters, context, executemany):
+            elapsed = time.perf_counter() - conn.info["_metrics_started"].pop()
+
+            totals = g.get("_metrics_sql") if has_request_context() else None
+            if totals is not None:
+                totals[0] += 1
+                totals[1] += elapsed
+            else:
+                labels = (("endpoint", "none"), ("method", ""), ("status", ""))
+                self.inc("desi_db_statements_total", labels)
+                self.inc("desi_db_statement_seconds_total", labels, elapsed)
+
+        @event.listens_for(engine, "handle_error")
+        def _failed_statement(exception_context):
+            conn = exception_context.connection
+            stack = conn.info.get("_metrics_started") if conn is not None else None
+            if stack:
+                stack.pop()
+
+    # ---------- MULTI-PROCESS STORE ----------
+    def _flush_loop(self, pid):
+        while self._pid == pid:
+            time.sleep(self.flush_seconds)
+            if self._dirty:
+                self.flush()
+
+    def _snapshot(self):
+        with self._lock:
+            self._dirty = False
+            return {
+                "counters": [[n, l, v] for (n, l), v in self._counters.items()],
+                "gauges": [[n, l, v] for (n, l), v in self._gauges.items()],
+                "histograms": [[n, l, list(self.buckets[n]), c] for (n, l), c in self._histograms.items()],
+            }
+
+    def flush(self):
+        # ✅ Start time in the file name: a recycled pid never overwrites a
+        #    dead worker's file before it is archived
+        if self._pid != os.getpid():
+            return
+        path = self._filename
+        snapshot = self._snapshot()
+
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "w") as fh:
+                json.dump(snapshot, fh)
+            os.replace(tmp_path, path)
+        except OSError:
+            self._dirty = True  # ✅ keep the flush thread alive, retry next tick
+
+    def collect(self):
+        self.flush()
+
+        counters, gauges, histograms = {}, {}, {}
+
+        def merge(data, with_gauges):
+            for name, labels, value in data.get("counters", ()):
+                key = (name, tuple(map(tuple, labels)))
+                counters[key] = counters.get(key, 0) + value
+            if with_gauges:
+                for name, labels, value in data.get("gauges", ()):
+                    key = (name, tuple(map(tuple, labels)))
+                    gauges[key] = gauges.get(key, 0) + value
+            for name, labels, bounds, counts in data.get("histograms", ()):
+                merged = histograms.setdefault((name, tuple(map(tuple, labels))), {"buckets": {}, "sum": 0.0})
+                for bound, count in zip(bounds + [float("inf")], counts[:-1]):
+                    merged["buckets"][bound] = merged["buckets"].get(bound, 0) + count
+                merged["sum"] += counts[-1]
+
+        for data in self._read_files():
+            merge(data, with_gauges=True)
+
+        return counters, gauges, histograms
+
+    def _read_files(self):
+        archive_path = os.path.join(self.directory, ARCHIVE)
+        lock = open(os.path.join(self.directory, ".lock"), "a+")
+        try:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+
+            archive = self._load(archive_path) or {}
+            live, dead = [], []
+            for path in glob.glob(os.path.join(self.directory, "*-*.json")):
+                pid = int(os.path.basename(path).split("-", 1)[0])
+                data = self._load(path)
+                if data is None:
+                    continue
+                if fcntl and pid != os.getpid() and not _pid_alive(pid):
+                    dead.append((path, data))
+                else:
+                    live.append(data)
+
+            if dead:
+                for _, data in dead:
+                    data.pop("gauges", None)
+                archive = self._fold([archive] + [data for _, data in dead])
+                fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+                with os.fdopen(fd, "w") as fh:
+                    json.dump(archive, fh)
+                os.replace(tmp_path, archive_path)
+                for path, _ in dead:
+                    os.remove(path)
+        finally:
+            lock.close()
+
+        return [archive] + live
+
+    @staticmethod
+    def _load(path):
+        try:
+            with open(path) as fh:
+                return json.load(fh)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    @staticmethod
+    def _fold(files):
+        # Sums counters and histograms of several snapshot files into one
+        counters, histograms = {}, {}
+        for data in files:
+            for name, labels, value in data.get("counters", ()):
+                key = json.dumps([name, labels])
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, bounds, counts in data.get("histograms", ()):
+                key = json.dumps([name, labels, bounds])
+                if key in histograms:
+                    histograms[key] = [a + b for a, b in zip(histograms[key], counts)]
+                else:
+                    histograms[key] = list(counts)
+        return {
+            "counters": [json.loads(k) + [v] for k, v in counters.items()],
+            "histograms": [json.loads(k) + [c] for k, c in histograms.items()],
+        }
+
+    # ---------- EXPOSITION ----------
+    def render(self):
+        counters, gauges, histograms = self.collect()
+        series = {}
+
+        for (name, labels), value in sorted(counters.items()):
+            series.setdefault(name, []).append(f"{name}{_format_labels(labels)} {value}")
+
+        for (name, labels), value in sorted(gauges.items()):
+            series.setdefault(name, []).append(f"{name}{_format_labels(labels)} {value}")
+
+        for (name, labels), merged in sorted(histograms.items(), key=lambda item: item[0]):
+            lines = series.setdefault(name, [])
+            cumulative = 0
+            for bound in sorted(merged["buckets"]):
+                cumulative += merged["buckets"][bound]
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', le)])} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {merged['sum']}")
+            lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+
+        output = []
+        for name in sorted(series):
+            kind, help_text = HELP.get(name, ("untyped", name))
+            output.append(f"# HELP {name} {help_text}")
+            output.append(f"# TYPE {name} {kind}")
+            output.extend(series[name])
+        return "\n".join(output) + "\n"
+
+    def render_endpoint(self):
+        if self.token:
+            supplied = request.headers.get("Authorization", "").removeprefix("Bearer ")
+            if not hmac.compare_digest(supplied, self.token):
+                abort(401)
+
+        return Response(self.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+metrics = Metrics()
@@ -0,0 +1,57 @@
+"""add lookup indexes and unique cart / wishlist pairs
+
+Revision ID: 3f1c2a9b7d10
+Revises:
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a9b7d10'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+# (name, table, columns, unique)
+INDEXES = [
+    ('uq_carts_user_id_product_id', 'carts', ['user_id', 'product_id'], True),
+    ('uq_wishlist_user_id_product_id', 'wishlist', ['user_id', 'product_id'], True),
+    ('ix_order_items_order_id', 'order_items', ['order_id'], False),
+    ('ix_orders_user_id_id', 'orders', ['user_id', 'id'], False),
+    ('ix_orders_status_id', 'orders', ['status', 'id'], False),
+    ('ix_orders_created_at_id', 'orders', ['created_at', 'id'], False),
+    ('ix_orders_city_id', 'orders', ['city', 'id'], False),
+    ('ix_orders_pincode_id', 'orders', ['pincode', 'id'], False),
+    ('ix_products_category', 'products', ['category'], False),
+]
+
+
+def upgrade():
+    # Fold duplicate cart lines into the oldest row before making the pair unique
+    op.execute("""
+        UPDATE carts SET quantity = (
+            SELECT SUM(c2.quantity) FROM carts c2
+            WHERE c2.user_id = carts.user_id AND c2.product_id = carts.product_id
+        )
+        WHERE id IN (SELECT MIN(id) FROM carts GROUP BY user_id, product_id HAVING COUNT(*) > 1)
+    """)
+    op.execute("""
+        DELETE FROM carts
+        WHERE id NOT IN (SELECT MIN(id) FROM carts GROUP BY user_id, product_id)
+    """)
+    op.execute("""
+        DELETE FROM wishlist
+        WHERE id NOT IN (SELECT MIN(id) FROM wishlist GROUP BY user_id, product_id)
+    """)
+
+    # db.create_all() already builds these on fresh databases
+    for name, table, columns, unique in INDEXES:
+        op.create_index(name, table, columns, unique=unique, if_not_exists=True)
+
+
+def downgrade():
+    for name, table, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
@@ -0,0 +1,43 @@
+"""add stock_forecasts for the sales-velocity forecast job
+
+Revision ID: a9d4f6b2e817
+Revises: c5e8a3f1d926
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9d4f6b2e817'
+down_revision = 'c5e8a3f1d926'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # db.create_all() already creates the (empty) table when the app starts.
+    # No backfill: rows appear on the first `flask forecast-stock` run.
+    if not sa.inspect(op.get_bind()).has_table('stock_forecasts'):
+        op.create_table(
+            'stock_forecasts',
+            sa.Column('product_id', sa.Integer(), nullable=False),
+            sa.Column('stock', sa.Integer(), nullable=False),
+            sa.Column('velocity', sa.Float(), nullable=False),
+            sa.Column('velocity_7d', sa.Float(), nullable=False),
+            sa.Column('velocity_28d', sa.Float(), nullable=False),
+            sa.Column('trend', sa.Float(), nullable=False),
+            sa.Column('days_until_stockout', sa.Float(), nullable=True),
+            sa.Column('stockout_date', sa.Date(), nullable=True),
+            sa.Column('reorder_qty', sa.Integer(), nullable=False),
+            sa.Column('computed_at', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('product_id')
+        )
+    op.create_index('ix_stock_forecasts_days_until_stockout', 'stock_forecasts',
+                    ['days_until_stockout'], unique=False, if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_stock_forecasts_days_until_stockout', table_name='stock_forecasts')
+    op.drop_table('stock_forecasts')
@@ -0,0 +1,48 @@
+"""add order_daily_stats rollup for the admin dashboard
+
+Revision ID: c5e8a3f1d926
+Revises: 8b4e6d2c1a57
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5e8a3f1d926'
+down_revision = '8b4e6d2c1a57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # db.create_all() already creates the (empty) table when the app starts
+    if not sa.inspect(op.get_bind()).has_table('order_daily_stats'):
+        op.create_table(
+            'order_daily_stats',
+            sa.Column('day', sa.Date(), nullable=False),
+            sa.Column('status', sa.String(length=50), nullable=False),
+            sa.Column('orders', sa.Integer(), nullable=False),
+            sa.Column('revenue', sa.Float(), nullable=False),
+            sa.Column('items', sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint('day', 'status')
+        )
+
+    # Backfill; same query as `flask rebuild-order-stats`
+    op.execute("DELETE FROM order_daily_stats")
+    op.execute("""
+        INSERT INTO order_daily_stats (day, status, orders, revenue, items)
+        SELECT date(o.created_at), COALESCE(o.status, 'Pending'), COUNT(o.id),
+               COALESCE(SUM(o.total_amount), 0), COALESCE(SUM(q.quantity), 0)
+        FROM orders o
+        LEFT OUTER JOIN (
+            SELECT order_id, SUM(quantity) AS quantity FROM order_items GROUP BY order_id
+        ) q ON q.order_id = o.id
+        WHERE o.created_at IS NOT NULL
+        GROUP BY date(o.created_at), COALESCE(o.status, 'Pending')
+    """)
+
+
+def downgrade():
+    op.drop_table('order_daily_stats')
@@ -5,6 +5,15 @@ from datetime import datetime
 class Order(db.Model):
     __tablename__ = "orders"
 
+    # ✅ Admin listing filters + keyset pagination on id
+    __table_args__ = (
+        db.Index("ix_orders_user_id_id", "user_id", "id"),
+        db.Index("ix_orders_status_id", "status", "id"),
+        db.Index("ix_orders_created_at_id", "created_at", "id"),
+        db.Index("ix_orders_city_id", "city", "id"),
+        db.Index("ix_orders_pincode_id", "pincode", "id"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
 
     user_id = db.Column(
@@ -51,7 +60,8 @@ class OrderItem(db.Model):
     order_id = db.Column(
         db.Integer,
         db.ForeignKey("orders.id"),
-        nullable=False
+        nullable=False,
+        index=True
     )
 
     product_id = db.Column(
@@ -67,6 +77,47 @@ class OrderItem(db.Model):
     product = db.relationship("Product", lazy=True)
 
 
+# ---------------- DAILY ORDER STATS ----------------
+# Rollup of orders per (UTC day of created_at, status), kept in step with
+# the orders table by order_stats.py in the same transaction.
+class OrderDailyStat(db.Model):
+    __tablename__ = "order_daily_stats"
+
+    day = db.Column(db.Date, primary_key=True)
+    status = db.Column(db.String(50), primary_key=True)
+
+    orders = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+    items = db.Column(db.Integer, nullable=False, default=0)
+
+
+# ---------------- STOCK FORECAST ----------------
+# Output of forecast.py, replaced wholesale on every run. No foreign key:
+# rows for deleted products are dropped by the join when read.
+class StockForecast(db.Model):
+    __tablename__ = "stock_forecasts"
+
+    # ✅ At-risk listing: ORDER BY days_until_stockout
+    __table_args__ = (
+        db.Index("ix_stock_forecasts_days_until_stockout", "days_until_stockout"),
+    )
+
+    product_id = db.Column(db.Integer, primary_key=True)
+    stock = db.Column(db.Integer, nullable=False)
+
+    # units per day
+    velocity = db.Column(db.Float, nullable=False)
+    velocity_7d = db.Column(db.Float, nullable=False)
+    velocity_28d = db.Column(db.Float, nullable=False)
+    trend = db.Column(db.Float, nullable=False)
+
+    days_until_stockout = db.Column(db.Float)  # NULL when nothing sells
+    stockout_date = db.Column(db.Date)
+    reorder_qty = db.Column(db.Integer, nullable=False, default=0)
+
+    computed_at = db.Column(db.DateTime, nullable=False)
+
+
 # ---------------- USER ----------------
 class User(db.Model):
     __tablename__ = "users"
@@ -77,6 +128,9 @@ class User(db.Model):
     password = db.Column(db.String(200), nullable=False)
     role = db.Column(db.String(20), default="user")
 
+    # ✅ Bumped on role change; tokens carrying an older "tv" claim are rejected
+    token_version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
     carts = db.relationship("Cart", backref="user", lazy=True)
     orders = db.relationship("Order", backref="user", lazy=True)
 
@@ -95,7 +149,7 @@ class Product(db.Model):
     image = db.Column(db.String(200))
 
     # ✅ Category for filtering
-    category = db.Column(db.String(60), default="Dairy")
+    category = db.Column(db.String(60), default="Dairy", index=True)
 
     carts = db.relationship("Cart", backref="product", lazy=True)
 
@@ -104,6 +158,11 @@ class Product(db.Model):
 class Wishlist(db.Model):
     __tablename__ = "wishlist"
 
+    # ✅ One row per (user, product), also the lookup index
+    __table_args__ = (
+        db.Index("uq_wishlist_user_id_product_id", "user_id", "product_id", unique=True),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
 
     user_id = db.Column(
@@ -130,6 +189,11 @@ class Wishlist(db.Model):
 class Cart(db.Model):
     __tablename__ = "carts"
 
+    # ✅ One row per (user, product), also the lookup index
+    __table_args__ = (
+        db.Index("uq_carts_user_id_product_id", "user_id", "product_id", unique=True),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(
         db.Integer,
@@ -0,0 +1,118 @@
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from catalog_cache import GenerationFile
+
+
+def offer_snapshot(offer):
+    return {
+        "id": offer.id,
+        "title": offer.title,
+        "code": offer.code,
+        "discount_type": offer.discount_type,
+        "discount_value": offer.discount_value,
+        "min_amount": offer.min_amount or 0,
+        "expiry_date": offer.expiry_date,
+    }
+
+
+# ==========================
+# OFFER CACHE
+# ==========================
+# apply-offer runs on every coupon attempt, so active offers are cached per
+# worker by code as plain dicts. An entry lives until the offer's
+# expiry_date; then it is reloaded, and from then on it reports the offer as
+# expired. Unknown and inactive codes are cached as None. Anything that
+# writes offers must call invalidate() after commit. That bumps a
+# generation file so every worker drops its entries.
+class OfferCache:
+    def __init__(self):
+        self.counter = GenerationFile()
+        self.max_entries = 512
+        self._lock = threading.Lock()
+        self._generation = None
+        self._entries = OrderedDict()  # code -> (snapshot | None, valid_until | None)
+
+    def init_app(self, app):
+        self.counter.path = app.config.setdefault(
+            "OFFER_GENERATION_FILE",
+            os.path.join(app.instance_path, "offer_generation")
+        )
+        self.max_entries = app.config.setdefault("OFFER_CACHE_SIZE", 512)
+
+        # ✅ Entries belong to the previous app's database and generation file
+        with self._lock:
+            self._generation = None
+            self._entries.clear()
+
+        folder = os.path.dirname(self.counter.path)
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+
+    def get(self, code):
+        from models import Offer
+
+        generation = self.counter.read()
+        now = datetime.utcnow()
+
+        with self._lock:
+            if generation != self._generation:
+                self._entries.clear()
+                self._generation = generation
+
+            entry = self._entries.get(code)
+            if entry is not None:
+                snapshot, valid_until = entry
+                if valid_until is None or now < valid_until:
+                    self._entries.move_to_end(code)
+                    return snapshot
+                del self._entries[code]  # ✅ reached expiry_date
+
+        offer = Offer.query.filter_by(code=code, active=True).first()
+        snapshot = offer_snapshot(offer) if offer else None
+
+        valid_until = None
+        if snapshot and snapshot["expiry_date"] > now:
+            valid_until = snapshot["expiry_date"]
+
+        with self._lock:
+            if generation == self._generation:
+                self._entries[code] = (snapshot, valid_until)
+                self._entries.move_to_end(code)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+        return snapshot
+
+    def invalidate(self):
+        self.counter.bump()
+
+
+offer_cache = OfferCache()
+
+
+def evaluate_offer(code, cart_total):
+    offer = offer_cache.get(code.upper())
+
+    if not offer:
+        return None, "Invalid offer code"
+
+    if offer["expiry_date"] < datetime.utcnow():
+        return None, "Offer expired"
+
+    if cart_total < offer["min_amount"]:
+        return None, "Minimum amount not reached"
+
+    if offer["discount_type"] == "percentage":
+        discount = (offer["discount_value"] / 100) * cart_total
+    else:
+        discount = offer["discount_value"]
+
+    return {
+        "code": offer["code"],
+        "title": offer["title"],
+        "discount": round(discount, 2),
+        "final_amount": round(cart_total - discount, 2)
+    }, None
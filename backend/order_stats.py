@@ -0,0 +1,114 @@
+import time
+from datetime import datetime
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import bindparam, delete, func, insert, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from extensions import db
+
+
+def _stats_table():
+    from models import OrderDailyStat
+    return OrderDailyStat.__table__
+
+
+# INSERT ... ON CONFLICT (day, status) DO UPDATE SET orders = orders + excluded.orders, ...
+def _upsert():
+    table = _stats_table()
+    stmt = sqlite_insert(table).values(
+        day=bindparam("b_day"),
+        status=bindparam("b_status"),
+        orders=bindparam("b_orders"),
+        revenue=bindparam("b_revenue"),
+        items=bindparam("b_items"),
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.day, table.c.status],
+        set_={
+            name: table.c[name] + stmt.excluded[name]  # c.items is a method
+            for name in ("orders", "revenue", "items")
+        }
+    )
+
+
+def _delta(order, status, sign, items):
+    return {
+        "b_day": (order.created_at or datetime.utcnow()).date(),
+        "b_status": status or "Pending",
+        "b_orders": sign,
+        "b_revenue": sign * float(order.total_amount),
+        "b_items": sign * items,
+    }
+
+
+# ==========================
+# INCREMENTAL UPDATES
+# ==========================
+# Called before db.session.commit(), so the rollup changes in the same
+# transaction as the order. SQLite serializes writers and the upsert adds
+# to the stored values, so concurrent workers never lose an update.
+# record_status_change trusts old_status: call it only after a conditional
+# UPDATE ... WHERE status = :old matched the order (see routes/orders.py).
+def record_new_order(order, items):
+    db.session.execute(_upsert(), [_delta(order, order.status, 1, items)])
+
+
+def record_status_change(order, old_status):
+    if (old_status or "Pending") == (order.status or "Pending"):
+        return
+
+    items = sum(int(item.quantity) for item in order.items)
+    db.session.execute(_upsert(), [
+        _delta(order, old_status, -1, items),
+        _delta(order, order.status, 1, items),
+    ])
+
+
+# ==========================
+# FULL REBUILD
+# ==========================
+# One INSERT ... SELECT over orders + per-order item quantities. Used for
+# backfill, after bulk loads that bypass the routes, and to repair drift.
+def rebuild_order_stats():
+    from models import Order, OrderItem
+
+    table = _stats_table()
+    quantities = (
+        select(OrderItem.order_id, func.sum(OrderItem.quantity).label("quantity"))
+        .group_by(OrderItem.order_id)
+        .subquery()
+    )
+    day = func.date(Order.created_at)
+    status = func.coalesce(Order.status, "Pending")
+
+    rollup = (
+        select(
+            day,
+            status,
+            func.count(Order.id),
+            func.coalesce(func.sum(Order.total_amount), 0),
+            func.coalesce(func.sum(quantities.c.quantity), 0),
+        )
+        .select_from(Order)
+        .outerjoin(quantities, quantities.c.order_id == Order.id)
+        .where(Order.created_at.isnot(None))
+        .group_by(day, status)
+    )
+
+    db.session.execute(delete(table))
+    result = db.session.execute(
+        insert(table).from_select(["day", "status", "orders", "revenue", "items"], rollup)
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+@click.command("rebuild-order-stats")
+@with_appcontext
+def rebuild_order_stats_command():
+    """Recompute order_daily_stats from the orders table."""
+    started = time.perf_counter()
+    rows = rebuild_order_stats()
+    click.echo(f"✅ Rebuilt {rows:,} day/status rows in {time.perf_counter() - started:.1f}s")
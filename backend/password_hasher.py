@@ -0,0 +1,95 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class HasherBusy(Exception):
+    pass
+
+
+# ==========================
+# PASSWORD HASHING POOL
+# ==========================
+# Hashing runs on a small bounded pool instead of on every request thread.
+# At most PASSWORD_HASH_WORKERS hashes burn CPU at once and at most
+# PASSWORD_HASH_QUEUE wait behind them; a login burst beyond that gets a
+# fast 503 instead of starving catalog requests in the same worker.
+#
+# This needs a threaded worker (Procfile: gunicorn --worker-class gthread):
+# while a login waits for the pool, the worker's other threads keep
+# serving. Under the sync worker class the waiting request would still pin
+# the whole worker, so the pool would only add a thread hop.
+#
+# PASSWORD_HASH_METHOD is a werkzeug method string, e.g. "scrypt",
+# "scrypt:32768:8:1" or "pbkdf2:sha256:600000". Stored hashes that use any
+# other method/cost are upgraded the next time the user logs in.
+class PasswordHasher:
+    def __init__(self):
+        self.method = "scrypt:32768:8:1"
+        self.workers = 2
+        self.max_queue = 32
+        self.timeout = 10.0
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self._pending = 0
+        self._stored_method = None
+
+    def init_app(self, app):
+        self.method = app.config.setdefault("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+        self.workers = app.config.setdefault("PASSWORD_HASH_WORKERS", 2)
+        self.max_queue = app.config.setdefault("PASSWORD_HASH_QUEUE", 32)
+        self.timeout = app.config.setdefault("PASSWORD_HASH_TIMEOUT_SECONDS", 10.0)
+        self._stored_method = None
+
+    def _submit(self, fn, *args):
+        if not self.workers:
+            return fn(*args)  # PASSWORD_HASH_WORKERS = 0: inline, no pool (baseline)
+
+        with self._lock:
+            # ✅ Created lazily per process so gunicorn --preload forks stay safe
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix="password-hash"
+                )
+                self._pid = os.getpid()
+                self._pending = 0
+
+            if self._pending >= self.workers + self.max_queue:
+                raise HasherBusy()
+            self._pending += 1
+            future = self._executor.submit(fn, *args)
+
+        # ✅ Slot frees when the hash finishes, even if the caller gave up
+        future.add_done_callback(self._release)
+
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            raise HasherBusy()
+
+    def _release(self, future):
+        with self._lock:
+            self._pending -= 1
+
+    def hash(self, password):
+        return self._submit(generate_password_hash, password, self.method)
+
+    def verify(self, stored_hash, password):
+        return self._submit(check_password_hash, stored_hash, password)
+
+    def stored_method(self):
+        # ✅ Werkzeug writes the expanded method ("scrypt" -> "scrypt:32768:8:1"),
+        #    so compare against what it actually writes; one hash per process
+        if self._stored_method is None:
+            self._stored_method = self.hash("").split("$", 1)[0]
+        return self._stored_method
+
+    def needs_rehash(self, stored_hash):
+        return stored_hash.split("$", 1)[0] != self.stored_method()
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,207 @@
+import json
+import os
+import re
+import sys
+import time
+from collections import OrderedDict
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def normalize_sql(statement):
+    sql = _STRING.sub("?", statement)
+    sql = _NUMBER.sub("?", sql)
+    sql = _IN_LIST.sub("(?...)", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+_app_files = {}  # co_filename -> path relative to backend/, or None
+
+
+def _app_file(filename):
+    if filename not in _app_files:
+        path = os.path.abspath(filename)
+        own = (not filename.startswith("<")  # generated code, e.g. <string>
+               and path.startswith(BACKEND_DIR + os.sep) and "site-packages" not in path
+               and path != os.path.abspath(__file__))
+        _app_files[filename] = os.path.relpath(path, BACKEND_DIR) if own else None
+    return _app_files[filename]
+
+
+def call_site():
+    # ✅ Innermost frame of our own code that is not this module: the line
+    #    in routes/*.py (or a helper) that triggered the statement
+    frame = sys._getframe(2)
+    while frame is not None:
+        relative = _app_file(frame.f_code.co_filename)
+        if relative:
+            return f"{relative}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return "<outside app code>"
+
+
+# ==========================
+# QUERY BUDGET DECORATOR
+# ==========================
+# Goes right under @route, so the attribute sits on the registered view:
+#
+#   @cart_bp.route("/cart", methods=["GET"])
+#   @query_budget(1)
+#   @jwt_required()
+#   def get_cart(): ...
+#
+# Only read when QUERY_AUDIT is on; otherwise it costs nothing.
+def query_budget(max_queries):
+    def decorator(fn):
+        fn.query_budget = max_queries
+        return fn
+    return decorator
+
+
+# For a lookup only some requests need (admin_required's user lookup for
+# tokens without a role claim): raises this request's budget by `count`, so
+# the fallback is counted where it happens instead of padding every budget.
+def allow_queries(count):
+    if has_request_context():
+        g._audit_allowance = g.get("_audit_allowance", 0) + count
+
+
+# ==========================
+# QUERY AUDIT (opt-in)
+# ==========================
+#   QUERY_AUDIT=1 flask --app app run
+#
+# Every statement of a request is grouped by normalized SQL together with
+# the app-code line that issued it. A request is reported when the same
+# statement ran QUERY_AUDIT_REPEAT_THRESHOLD+ times (likely N+1) or when it
+# went over its @query_budget. Reports go to the app log and, one JSON
+# object per line, to QUERY_AUDIT_LOG. With QUERY_AUDIT_STRICT an exceeded
+# budget raises QueryBudgetExceeded, which fails the request (and the test
+# that made it). Responses carry X-Query-Count while auditing.
+class QueryAudit:
+    def __init__(self):
+        self.enabled = False
+        self.strict = False
+        self.repeat_threshold = 3
+        self.log_path = None
+
+    def init_app(self, app):
+        from extensions import db
+
+        self.enabled = app.config.setdefault(
+            "QUERY_AUDIT", os.environ.get("QUERY_AUDIT", "").lower() in ("1", "true", "yes")
+        )
+        self.strict = app.config.setdefault(
+            "QUERY_AUDIT_STRICT", os.environ.get("QUERY_AUDIT_STRICT", "").lower() in ("1", "true", "yes")
+        )
+        self.repeat_threshold = app.config.setdefault("QUERY_AUDIT_REPEAT_THRESHOLD", 3)
+        self.log_path = app.config.setdefault(
+            "QUERY_AUDIT_LOG", os.path.join(app.instance_path, "query_audit.jsonl")
+        )
+
+        if not self.enabled:
+            return
+
+        folder = os.path.dirname(self.log_path)
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+
+        with app.app_context():
+            self.instrument_engine(db.engine)
+
+    def instrument_engine(self, engine):
+        @event.listens_for(engine, "before_cursor_execute")
+        def _record_statement(conn, cursor, statement, parameters, context, executemany):
+            statements = g.get("_audit_statements") if has_request_context() else None
+            if statements is None:
+                return
+
+            key = normalize_sql(statement)
+            group = statements.get(key)
+            if group is None:
+                group = statements[key] = {"count": 0, "sites": OrderedDict()}
+            group["count"] += 1
+            site = call_site()
+            group["sites"][site] = group["sites"].get(site, 0) + 1
+
+    def _before_request(self):
+        g._audit_statements = OrderedDict()
+        g._audit_started = time.perf_counter()
+
+    def _after_request(self, response):
+        statements = g.pop("_audit_statements", None)
+        if statements is None:
+            return response
+
+        total = sum(group["count"] for group in statements.values())
+        response.headers["X-Query-Count"] = str(total)
+
+        view = current_app.view_functions.get(request.endpoint)
+        budget = getattr(view, "query_budget", None)
+        if budget is not None:
+            budget += g.pop("_audit_allowance", 0)
+        over_budget = budget is not None and total > budget
+
+        repeated = [
+            {"sql": sql, "count": group["count"], "sites": dict(group["sites"])}
+            for sql, group in statements.items()
+            if group["count"] >= self.repeat_threshold
+        ]
+
+        if not (over_budget or repeated):
+            return response
+
+        report = {
+            "method": request.method,
+            "path": request.full_path.rstrip("?"),
+            "endpoint": request.endpoint,
+            "status": response.status_code,
+            "queries": total,
+            "budget": budget,
+            "over_budget": over_budget,
+            "elapsed_ms": round((time.perf_counter() - g.pop("_audit_started")) * 1000, 2),
+            "repeated": repeated,
+            "statements": [
+                {"sql": sql, "count": group["count"], "sites": dict(group["sites"])}
+                for sql, group in statements.items()
+            ],
+        }
+        self.write_report(report)
+
+        if over_budget and self.strict:
+            raise QueryBudgetExceeded(
+                f"{request.endpoint} ran {total} queries (budget {budget}); see {self.log_path}"
+            )
+        return response
+
+    def write_report(self, report):
+        lines = [f"{report['method']} {report['path']} ({report['endpoint']}): "
+                 f"{report['queries']} queries, budget {report['budget']}"]
+        label = "likely N+1" if report["repeated"] else "statement"
+        for group in report["repeated"] or report["statements"]:
+            lines.append(f"  {label}: {group['count']}x {group['sql'][:160]}")
+            for site, count in group["sites"].items():
+                lines.append(f"    {count}x at {site}")
+        current_app.logger.warning("\n".join(lines))
+
+        with open(self.log_path, "a") as fh:
+            fh.write(json.dumps(report) + "\n")
+
+
+query_audit = QueryAudit()
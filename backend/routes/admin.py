@@ -0,0 +1,135 @@
+from flask import Blueprint, jsonify, request
+from sqlalchemy import func
+from extensions import db
+from models import OrderDailyStat, Product, StockForecast
+from authz import admin_required
+from query_audit import query_budget
+from forecast import ForecastUnavailable, stock_forecaster
+from datetime import datetime, timedelta
+
+admin_bp = Blueprint("admin", __name__)
+
+DEFAULT_DAILY_WINDOW = 30
+MAX_DAILY_WINDOW = 366
+DEFAULT_FORECAST_LIMIT = 50
+MAX_FORECAST_LIMIT = 500
+
+
+def parse_day(value):
+    return datetime.strptime(value, "%Y-%m-%d").date() if value else None
+
+
+# ---------------- ADMIN DASHBOARD STATS ----------------
+# GET /api/admin/stats?date_from=YYYY-MM-DD&date_to=YYYY-MM-DD
+# Read from the order_daily_stats rollup, so the cost grows with the number
+# of days, not orders. Totals cover the given range (default: all time);
+# "daily" covers the range or, without one, the last 30 days. Days are UTC.
+@admin_bp.route("/admin/stats", methods=["GET"])
+@query_budget(2)
+@admin_required
+def dashboard_stats():
+    try:
+        date_from = parse_day(request.args.get("date_from"))
+        date_to = parse_day(request.args.get("date_to"))
+    except ValueError:
+        return jsonify({"message": "Dates must be YYYY-MM-DD"}), 400
+
+    totals = db.session.query(
+        OrderDailyStat.status,
+        func.sum(OrderDailyStat.orders),
+        func.sum(OrderDailyStat.revenue),
+        func.sum(OrderDailyStat.items)
+    )
+    if date_from:
+        totals = totals.filter(OrderDailyStat.day >= date_from)
+    if date_to:
+        totals = totals.filter(OrderDailyStat.day <= date_to)
+    rows = [row for row in totals.group_by(OrderDailyStat.status).all() if row[1]]
+
+    daily_to = date_to or datetime.utcnow().date()
+    daily_from = date_from or daily_to - timedelta(days=DEFAULT_DAILY_WINDOW - 1)
+    if (daily_to - daily_from).days >= MAX_DAILY_WINDOW:
+        daily_from = daily_to - timedelta(days=MAX_DAILY_WINDOW - 1)
+
+    days = (
+        db.session.query(
+            OrderDailyStat.day,
+            func.sum(OrderDailyStat.orders),
+            func.sum(OrderDailyStat.revenue),
+            func.sum(OrderDailyStat.items)
+        )
+        .filter(OrderDailyStat.day >= daily_from, OrderDailyStat.day <= daily_to)
+        .group_by(OrderDailyStat.day)
+        .order_by(OrderDailyStat.day)
+        .all()
+    )
+
+    return jsonify({
+        "counts": {status: orders for status, orders, _, _ in rows},
+        "revenue": {status: round(revenue, 2) for status, _, revenue, _ in rows},
+        "items": {status: items for status, _, _, items in rows},
+        "total": sum(orders for _, orders, _, _ in rows),
+        "daily": [
+            {"day": day.isoformat(), "orders": orders, "revenue": round(revenue, 2), "items": items}
+            for day, orders, revenue, items in days
+            if orders
+        ]
+    }), 200
+
+
+# ---------------- STOCK FORECAST ----------------
+# GET  /api/admin/stock-forecast?category=Dairy&limit=50
+#      Products that are selling, soonest stockout first, from the
+#      stock_forecasts table (written by `flask forecast-stock`).
+# POST /api/admin/stock-forecast
+#      Recompute now, then answer as GET.
+@admin_bp.route("/admin/stock-forecast", methods=["GET", "POST"])
+@query_budget(6)
+@admin_required
+def stock_forecast():
+    if request.method == "POST":
+        try:
+            stock_forecaster.run()
+        except ForecastUnavailable as exc:
+            return jsonify({"message": str(exc)}), 503
+
+    limit = min(request.args.get("limit", DEFAULT_FORECAST_LIMIT, type=int), MAX_FORECAST_LIMIT)
+    category = request.args.get("category")
+
+    computed_at, at_risk = db.session.query(
+        func.max(StockForecast.computed_at),
+        func.count(StockForecast.product_id).filter(
+            StockForecast.days_until_stockout <= stock_forecaster.alert_days
+        )
+    ).one()
+
+    rows = (
+        db.session.query(StockForecast, Product.name, Product.category)
+        .join(Product, Product.id == StockForecast.product_id)
+        .filter(StockForecast.days_until_stockout.isnot(None))
+    )
+    if category:
+        rows = rows.filter(Product.category == category)
+    rows = rows.order_by(StockForecast.days_until_stockout).limit(max(limit, 1)).all()
+
+    return jsonify({
+        "computed_at": computed_at.isoformat() if computed_at else None,
+        "alert_days": stock_forecaster.alert_days,
+        "at_risk": at_risk,
+        "products": [
+            {
+                "product_id": forecast.product_id,
+                "name": name,
+                "category": product_category,
+                "stock": forecast.stock,
+                "velocity": round(forecast.velocity, 2),
+                "velocity_7d": round(forecast.velocity_7d, 2),
+                "velocity_28d": round(forecast.velocity_28d, 2),
+                "trend": round(forecast.trend, 3),
+                "days_until_stockout": forecast.days_until_stockout,
+                "stockout_date": forecast.stockout_date.isoformat() if forecast.stockout_date else None,
+                "reorder_qty": forecast.reorder_qty,
+            }
+            for forecast, name, product_category in rows
+        ]
+    }), 200
@@ -1,8 +1,10 @@
 from flask import Blueprint, request, jsonify
-from werkzeug.security import generate_password_hash, check_password_hash
 from flask_jwt_extended import create_access_token
 from extensions import db
 from models import User
+from password_hasher import password_hasher, HasherBusy
+from authz import admin_required, token_versions
+from query_audit import query_budget
 import re
 
 auth_bp = Blueprint("auth", __name__)
@@ -11,6 +13,7 @@ auth_bp = Blueprint("auth", __name__)
 # 🔐 REGISTER
 # ==================================================
 @auth_bp.route("/register", methods=["POST"])
+@query_budget(2)
 def register():
     data = request.get_json()
 
@@ -48,11 +51,16 @@ def register():
     if User.query.filter_by(email=email).first():
         return jsonify({"message": "User already exists"}), 400
 
-    # ✅ Create user
+    # ✅ Create user (hash runs on the bounded hashing pool)
+    try:
+        password_hash = password_hasher.hash(password)
+    except HasherBusy:
+        return jsonify({"message": "Server busy, please try again"}), 503
+
     new_user = User(
         name=name.strip(),
         email=email,
-        password=generate_password_hash(password),
+        password=password_hash,
         role=role
     )
 
@@ -68,6 +76,7 @@ def register():
 # 🔐 LOGIN
 # ==================================================
 @auth_bp.route("/login", methods=["POST"])
+@query_budget(2)
 def login():
     data = request.get_json()
 
@@ -84,18 +93,61 @@ def login():
 
     user = User.query.filter_by(email=email).first()
 
-    if not user or not check_password_hash(user.password, password):
-        return jsonify({"message": "Invalid email or password"}), 401
-
-    # 🔥 JWT identity MUST be string
-    access_token = create_access_token(identity=str(user.id))
-
-    return jsonify({
-        "access_token": access_token,
-        "user": {
+    try:
+        if not user or not password_hasher.verify(user.password, password):
+            return jsonify({"message": "Invalid email or password"}), 401
+
+        # 🔥 JWT identity MUST be string
+        # ✅ role + token version in the claims let admin routes skip the user lookup
+        access_token = create_access_token(
+            identity=str(user.id),
+            additional_claims={"role": user.role, "tv": user.token_version}
+        )
+        profile = {
             "id": user.id,
             "name": user.name,
             "email": user.email,
             "role": user.role
         }
+
+        # ✅ Upgrade hashes made with an older method / cost
+        #    (after reading the user: the commit expires it)
+        if password_hasher.needs_rehash(user.password):
+            user.password = password_hasher.hash(password)
+            db.session.commit()
+    except HasherBusy:
+        return jsonify({"message": "Server busy, please try again"}), 503
+
+    return jsonify({
+        "access_token": access_token,
+        "user": profile
+    }), 200
+
+
+# ==================================================
+# 🔐 ADMIN CHANGE USER ROLE
+# PUT /api/users/<user_id>/role
+# ==================================================
+@auth_bp.route("/users/<int:user_id>/role", methods=["PUT"])
+@query_budget(3)
+@admin_required
+def update_user_role(user_id):
+    data = request.get_json() or {}
+    role = data.get("role")
+
+    if role not in ("admin", "user"):
+        return jsonify({"message": "Role must be admin or user"}), 400
+
+    user = User.query.get_or_404(user_id)
+
+    user.role = role
+    user.token_version = (user.token_version or 0) + 1
+    db.session.commit()
+
+    # ✅ Existing tokens for this user stop working on every worker
+    token_versions.set(user.id, user.token_version)
+
+    return jsonify({
+        "message": "Role updated, user must log in again",
+        "user": {"id": user.id, "role": user.role}
     }), 200
@@ -1,13 +1,32 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
 from extensions import db
 from models import Cart, Product
+from offer_cache import evaluate_offer
+from query_audit import query_budget
 
 cart_bp = Blueprint("cart", __name__)
 
+
+def cart_subtotal(user_id):
+    # ✅ Same math as GET /api/cart, done by SQLite in one query
+    total = (
+        db.session.query(func.coalesce(func.sum(Product.price * Cart.quantity), 0))
+        .select_from(Cart)
+        .join(Product, Cart.product_id == Product.id)
+        .filter(Cart.user_id == user_id)
+        .scalar()
+    )
+    return float(total)
+
+
 # ---------------- ADD TO CART ----------------
 # POST /api/cart/add
 @cart_bp.route("/cart/add", methods=["POST"])
+@query_budget(4)
 @jwt_required()
 def add_to_cart():
     user_id = int(get_jwt_identity())
@@ -26,39 +45,51 @@ def add_to_cart():
     if not product:
         return jsonify({"error": "Product not found"}), 404
 
-    existing_item = Cart.query.filter_by(user_id=user_id, product_id=product_id).first()
-
-    if existing_item:
-        new_quantity = existing_item.quantity + quantity
-        if new_quantity > product.stock:
-            return jsonify({"error": f"Only {product.stock} items available in stock"}), 400
-        existing_item.quantity = new_quantity
-    else:
-        if quantity > product.stock:
-            return jsonify({"error": f"Only {product.stock} items available in stock"}), 400
-
-        cart_item = Cart(user_id=user_id, product_id=product_id, quantity=quantity)
-        db.session.add(cart_item)
-
-    db.session.commit()
-    return jsonify({"message": "Added to cart"}), 201
-
-
-# ---------------- GET CART ----------------
-# GET /api/cart
-@cart_bp.route("/cart", methods=["GET"])
-@jwt_required()
-def get_cart():
-    user_id = int(get_jwt_identity())
-    cart_items = Cart.query.filter_by(user_id=user_id).all()
+    # ✅ (user_id, product_id) is unique: if a parallel request inserted the
+    #    line first, retry once and add to that row instead
+    for attempt in range(2):
+        existing_item = Cart.query.filter_by(user_id=user_id, product_id=product_id).first()
+
+        if existing_item:
+            new_quantity = existing_item.quantity + quantity
+            if new_quantity > product.stock:
+                return jsonify({"error": f"Only {product.stock} items available in stock"}), 400
+            existing_item.quantity = new_quantity
+        else:
+            if quantity > product.stock:
+                return jsonify({"error": f"Only {product.stock} items available in stock"}), 400
+
+            cart_item = Cart(user_id=user_id, product_id=product_id, quantity=quantity)
+            db.session.add(cart_item)
+
+        try:
+            db.session.commit()
+            break
+        except IntegrityError:
+            db.session.rollback()
+            if attempt:
+                raise
+
+    return jsonify({"message": "Added to cart", "cart": cart_snapshot(user_id)}), 201
+
+
+# ---------------- CART SNAPSHOT ----------------
+# Lines + total, as returned by GET /api/cart and by every cart mutation
+# so the client never needs a follow-up GET.
+def cart_snapshot(user_id):
+    # ✅ One joined query for all lines (rows whose product is gone drop out)
+    cart_items = (
+        Cart.query
+        .options(joinedload(Cart.product, innerjoin=True))
+        .filter_by(user_id=user_id)
+        .all()
+    )
 
     items = []
     total = 0.0
 
     for item in cart_items:
-        product = Product.query.get(item.product_id)
-        if not product:
-            continue
+        product = item.product
 
         subtotal = float(product.price) * int(item.quantity)
         total += subtotal
@@ -74,12 +105,66 @@ def get_cart():
             "image": product.image
         })
 
-    return jsonify({"items": items, "total": float(total)}), 200
+    return {"items": items, "total": float(total)}
+
+
+# ---------------- GET CART ----------------
+# GET /api/cart
+@cart_bp.route("/cart", methods=["GET"])
+@query_budget(1)
+@jwt_required()
+def get_cart():
+    user_id = int(get_jwt_identity())
+    return jsonify(cart_snapshot(user_id)), 200
+
+
+# ---------------- CART QUOTE ----------------
+# GET /api/cart/quote?code=SAVE10
+# Lines, totals, stock warnings and the offer (if a code is given) in one
+# response; same single cart query as GET /api/cart.
+@cart_bp.route("/cart/quote", methods=["GET"])
+@query_budget(2)
+@jwt_required()
+def cart_quote():
+    user_id = int(get_jwt_identity())
+    quote = cart_snapshot(user_id)
+
+    quote["item_count"] = sum(item["quantity"] for item in quote["items"])
+    quote["warnings"] = [
+        {
+            "item_id": item["id"],
+            "product_id": item["product_id"],
+            "message": (
+                f"{item['name']} is out of stock" if item["stock"] == 0
+                else f"Only {item['stock']} {item['name']} available in stock"
+            )
+        }
+        for item in quote["items"]
+        if item["quantity"] > item["stock"]
+    ]
+
+    quote["offer"] = None
+    quote["offer_error"] = None
+    quote["discount"] = 0.0
+    quote["payable"] = quote["total"]
+
+    code = request.args.get("code", "").strip()
+    if code:
+        offer, error = evaluate_offer(code, quote["total"])
+        if error:
+            quote["offer_error"] = error
+        else:
+            quote["offer"] = offer
+            quote["discount"] = offer["discount"]
+            quote["payable"] = offer["final_amount"]
+
+    return jsonify(quote), 200
 
 
 # ---------------- UPDATE QUANTITY ----------------
 # PUT /api/cart/item/<item_id>
 @cart_bp.route("/cart/item/<int:item_id>", methods=["PUT"])
+@query_budget(4)
 @jwt_required()
 def update_cart_item(item_id):
     user_id = int(get_jwt_identity())
@@ -96,11 +181,16 @@ def update_cart_item(item_id):
     if new_qty < 1:
         return jsonify({"error": "Quantity must be at least 1"}), 400
 
-    item = Cart.query.filter_by(id=item_id, user_id=user_id).first()
+    item = (
+        Cart.query
+        .options(joinedload(Cart.product))
+        .filter_by(id=item_id, user_id=user_id)
+        .first()
+    )
     if not item:
         return jsonify({"error": "Cart item not found"}), 404
 
-    product = Product.query.get(item.product_id)
+    product = item.product
     if not product:
         return jsonify({"error": "Product not found"}), 404
 
@@ -110,12 +200,18 @@ def update_cart_item(item_id):
     item.quantity = new_qty
     db.session.commit()
 
-    return jsonify({"message": "Quantity updated", "item_id": item.id, "quantity": item.quantity}), 200
+    return jsonify({
+        "message": "Quantity updated",
+        "item_id": item.id,
+        "quantity": item.quantity,
+        "cart": cart_snapshot(user_id)
+    }), 200
 
 
 # ---------------- REMOVE ITEM ----------------
 # DELETE /api/cart/remove/<item_id>
 @cart_bp.route("/cart/remove/<int:item_id>", methods=["DELETE"])
+@query_budget(3)
 @jwt_required()
 def remove_item(item_id):
     user_id = int(get_jwt_identity())
@@ -127,12 +223,13 @@ def remove_item(item_id):
     db.session.delete(item)
     db.session.commit()
 
-    return jsonify({"message": "Item removed"}), 200
+    return jsonify({"message": "Item removed", "cart": cart_snapshot(user_id)}), 200
 
 
 # ---------------- CLEAR CART ----------------
 # DELETE /api/cart/clear
 @cart_bp.route("/cart/clear", methods=["DELETE"])
+@query_budget(1)
 @jwt_required()
 def clear_cart():
     user_id = int(get_jwt_identity())
@@ -140,4 +237,4 @@ def clear_cart():
     Cart.query.filter_by(user_id=user_id).delete()
     db.session.commit()
 
-    return jsonify({"message": "Cart cleared"}), 200
\ No newline at end of file
+    return jsonify({"message": "Cart cleared", "cart": {"items": [], "total": 0.0}}), 200
\ No newline at end of file
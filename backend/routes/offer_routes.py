@@ -1,12 +1,17 @@
 from flask import Blueprint, request, jsonify
+from flask_jwt_extended import get_jwt_identity, jwt_required
 from models import Offer
 from extensions import db
+from offer_cache import evaluate_offer, offer_cache
+from routes.cart import cart_subtotal
+from query_audit import query_budget
 from datetime import datetime
 
 offer_bp = Blueprint("offer", __name__)
 
 # Create Offer
 @offer_bp.route("/create-offer", methods=["POST"])
+@query_budget(1)
 def create_offer():
     data = request.json
 
@@ -21,36 +26,30 @@ def create_offer():
 
     db.session.add(offer)
     db.session.commit()
+    offer_cache.invalidate()
 
     return jsonify({"message": "Offer created successfully"})
 
 
 # Apply Offer
+# The total always comes from the logged-in user's saved cart; a
+# "cart_total" in the body is ignored. (The cart page uses GET
+# /api/cart/quote?code=..., which returns the same numbers with the cart.)
 @offer_bp.route("/apply-offer", methods=["POST"])
+@query_budget(2)
+@jwt_required()
 def apply_offer():
     data = request.json
     code = data.get("code").upper()
-    cart_total = float(data.get("cart_total"))
 
-    offer = Offer.query.filter_by(code=code, active=True).first()
+    cart_total = cart_subtotal(int(get_jwt_identity()))
 
-    if not offer:
-        return jsonify({"error": "Invalid offer code"}), 400
-
-    if offer.expiry_date < datetime.utcnow():
-        return jsonify({"error": "Offer expired"}), 400
-
-    if cart_total < offer.min_amount:
-        return jsonify({"error": "Minimum amount not reached"}), 400
-
-    if offer.discount_type == "percentage":
-        discount = (offer.discount_value / 100) * cart_total
-    else:
-        discount = offer.discount_value
-
-    final_amount = cart_total - discount
+    quote, error = evaluate_offer(code, cart_total)
+    if error:
+        return jsonify({"error": error}), 400
 
     return jsonify({
-        "discount": round(discount, 2),
-        "final_amount": round(final_amount, 2)
+        "cart_total": round(cart_total, 2),
+        "discount": quote["discount"],
+        "final_amount": quote["final_amount"]
     })
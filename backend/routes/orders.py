@@ -1,26 +1,78 @@
-from flask import Blueprint, jsonify, request, send_file
+from flask import Blueprint, Response, jsonify, request, send_file, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity, verify_jwt_in_request
+from sqlalchemy import bindparam, func, insert, select, update
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 from extensions import db
-from models import Cart, Product, Order, User, OrderItem
-from datetime import datetime
+from models import Cart, Product, Order, OrderItem
+from catalog_cache import catalog_cache
+from authz import admin_required
+from query_audit import query_budget
+from order_stats import record_new_order, record_status_change
+from datetime import datetime, timedelta
+import csv
 import io
-
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.units import mm
+import json
+from invoices import (
+    invoice_cache, invoice_exporter, invoice_prerenderer, invoice_snapshot, download_name
+)
 
 order_bp = Blueprint("orders", __name__)
 
+# UPDATE products SET stock = stock - :q WHERE id = :id AND stock >= :q
+RESERVE_STOCK = (
+    update(Product.__table__)
+    .where(
+        Product.__table__.c.id == bindparam("b_id"),
+        Product.__table__.c.stock >= bindparam("b_qty")
+    )
+    .values(stock=Product.__table__.c.stock - bindparam("b_qty"))
+)
+
+# UPDATE products SET stock = stock + :q WHERE id = :id
+RESTOCK = (
+    update(Product.__table__)
+    .where(Product.__table__.c.id == bindparam("b_id"))
+    .values(stock=Product.__table__.c.stock + bindparam("b_qty"))
+)
+
+# UPDATE orders SET status = :new WHERE id = :id AND status = :old
+# rowcount 0 means another request changed the status since we read it
+CHANGE_STATUS = (
+    update(Order.__table__)
+    .where(
+        Order.__table__.c.id == bindparam("b_id"),
+        func.coalesce(Order.__table__.c.status, "Pending") == bindparam("b_old")
+    )
+    .values(status=bindparam("b_new"))
+)
+
+
+# ✅ Order + items + products in two queries instead of 1 + N
+def load_order_with_items(order_id, user_id=None):
+    query = (
+        Order.query
+        .options(selectinload(Order.items).joinedload(OrderItem.product))
+        .filter_by(id=order_id)
+    )
+    if user_id is not None:
+        query = query.filter_by(user_id=user_id)
+    return query.first()
+
 
 # ---------------- PLACE ORDER ----------------
 # POST /api/orders/place
 @order_bp.route("/orders/place", methods=["POST"])
+@query_budget(6)
 @jwt_required()
 def place_order():
     user_id = int(get_jwt_identity())
-    cart_items = Cart.query.filter_by(user_id=user_id).all()
+    cart_items = (
+        Cart.query
+        .options(joinedload(Cart.product))
+        .filter_by(user_id=user_id)
+        .all()
+    )
 
     if not cart_items:
         return jsonify({"error": "Cart is empty"}), 400
@@ -35,10 +87,11 @@ def place_order():
     pincode = data.get("pincode")
     payment_method = data.get("payment_method", "Cash on Delivery")
 
-    # ✅ calculate total + check stock
+    # ✅ calculate total + early stock check (the UPDATE below is authoritative)
     total = 0.0
+    quantities = {}
     for item in cart_items:
-        product = Product.query.get(item.product_id)
+        product = item.product
         if not product:
             return jsonify({"error": "Some product is missing"}), 400
 
@@ -46,6 +99,30 @@ def place_order():
             return jsonify({"error": f"Only {product.stock} left for {product.name}"}), 400
 
         total += float(product.price) * int(item.quantity)
+        quantities[product.id] = quantities.get(product.id, 0) + int(item.quantity)
+
+    # ✅ Reserve stock atomically: one conditional UPDATE per line, sent as a
+    #    single executemany. A row only matches while enough stock is left, so
+    #    concurrent checkouts in other workers can never oversell.
+    reserved = db.session.execute(
+        RESERVE_STOCK,
+        [{"b_id": pid, "b_qty": qty} for pid, qty in quantities.items()]
+    )
+
+    if reserved.rowcount != len(quantities):
+        db.session.rollback()
+
+        short = (
+            Product.query
+            .filter(Product.id.in_(quantities))
+            .populate_existing()
+            .all()
+        )
+        for product in short:
+            if product.stock < quantities[product.id]:
+                return jsonify({"error": f"Only {product.stock} left for {product.name}"}), 400
+
+        return jsonify({"error": "Stock changed, please try again"}), 400
 
     # ✅ Create order
     # invoice_no example: DF-20260220-000123
@@ -61,40 +138,51 @@ def place_order():
         city=city,
         pincode=pincode,
         payment_method=payment_method,
-        invoice_no=invoice_no
+        invoice_no=invoice_no,
+        created_at=datetime.utcnow()  # ✅ needed before flush for the stats day
     )
 
     db.session.add(new_order)
-    db.session.flush()  # ✅ get new_order.id without full commit yet
-
-    # ✅ Create order items + reduce stock
-    for item in cart_items:
-        product = Product.query.get(item.product_id)
-
-        order_item = OrderItem(
-            order_id=new_order.id,
-            product_id=product.id,
+    db.session.flush()
+    order_id = new_order.id
+
+    # ✅ Items in one executemany. Cascading them from the order made the ORM
+    #    send one INSERT ... RETURNING per cart line.
+    items = [
+        OrderItem(
+            order_id=order_id,
+            product=item.product,
             quantity=item.quantity,
-            price=float(product.price)
+            price=float(item.product.price)
         )
-        db.session.add(order_item)
-
-        product.stock -= int(item.quantity)
+        for item in cart_items
+    ]
+    db.session.execute(insert(OrderItem), [
+        {"order_id": order_id, "product_id": item.product.id,
+         "quantity": item.quantity, "price": item.price}
+        for item in items
+    ])
+    set_committed_value(new_order, "items", items)  # snapshot reads these, no reload
 
     # ✅ Clear Cart
     Cart.query.filter_by(user_id=user_id).delete()
+    record_new_order(new_order, sum(quantities.values()))
+    snapshot = invoice_snapshot(new_order)
 
     db.session.commit()
+    catalog_cache.bump()  # stock changed
+    invoice_prerenderer.submit(snapshot)
 
     return jsonify({
         "message": "Order placed successfully",
-        "order_id": new_order.id
+        "order_id": order_id
     }), 201
 
 
 # ---------------- USER ORDER HISTORY ----------------
 # GET /api/orders
 @order_bp.route("/orders", methods=["GET"])
+@query_budget(1)
 @jwt_required()
 def order_history():
     user_id = int(get_jwt_identity())
@@ -115,16 +203,11 @@ def order_history():
 # ---------------- ADMIN UPDATE ORDER STATUS ----------------
 # PUT /api/orders/<id>/status
 @order_bp.route("/orders/<int:id>/status", methods=["PUT"])
-@jwt_required()
+@query_budget(4)
+@admin_required
 def update_order_status(id):
-    user_id = int(get_jwt_identity())
-    user = User.query.get(user_id)
-
-    if not user or user.role != "admin":
-        return jsonify({"message": "Unauthorized"}), 403
-
     data = request.get_json() or {}
-    order = Order.query.get(id)
+    order = load_order_with_items(id)
 
     if not order:
         return jsonify({"message": "Order not found"}), 404
@@ -133,53 +216,160 @@ def update_order_status(id):
     if not new_status:
         return jsonify({"message": "Status is required"}), 400
 
-    order.status = new_status
+    # ✅ Only if nobody changed the status since we read it; otherwise the
+    #    rollup would move the order out of a bucket it already left
+    old_status = order.status or "Pending"
+    changed = db.session.execute(CHANGE_STATUS, {"b_id": id, "b_old": old_status, "b_new": new_status})
+    if changed.rowcount != 1:
+        db.session.rollback()
+        return jsonify({"message": "Order status changed, please reload"}), 409
+
+    set_committed_value(order, "status", new_status)
+    record_status_change(order, old_status)
+    snapshot = invoice_snapshot(order)
     db.session.commit()
 
+    # ✅ Invoice shows the status, so re-render it in the background
+    invoice_prerenderer.submit(snapshot)
+
     return jsonify({"message": "Order status updated"}), 200
 
 
+# ---------------- ADMIN ORDER FILTERS ----------------
+# Shared by the admin listing, status counts and invoice export:
+#   status, date_from / date_to (YYYY-MM-DD, inclusive), user_id, city, pincode
+def apply_order_filters(query, args, with_status=True):
+    status = args.get("status")
+    if status and with_status:
+        query = query.where(Order.status == status)
+
+    try:
+        if args.get("date_from"):
+            date_from = datetime.strptime(args["date_from"], "%Y-%m-%d")
+            query = query.where(Order.created_at >= date_from)
+
+        if args.get("date_to"):
+            date_to = datetime.strptime(args["date_to"], "%Y-%m-%d")
+            query = query.where(Order.created_at < date_to + timedelta(days=1))
+    except ValueError:
+        return None, "Dates must be YYYY-MM-DD"
+
+    if args.get("user_id"):
+        user_id = args.get("user_id", type=int)
+        if user_id is None:
+            return None, "Invalid user_id"
+        query = query.where(Order.user_id == user_id)
+
+    for field in ("city", "pincode"):
+        value = (args.get(field) or "").strip()
+        if value:
+            query = query.where(getattr(Order, field) == value)
+
+    return query, None
+
+
+def serialize_admin_order(order):
+    return {
+        "id": order.id,
+        "invoice_no": order.invoice_no,
+        "user_id": order.user_id,
+        "customer_name": order.customer_name,
+        "city": order.city,
+        "pincode": order.pincode,
+        "total": float(order.total_amount),
+        "status": order.status,
+        "created_at": order.created_at.strftime("%Y-%m-%d %H:%M:%S")
+    }
+
+
+ORDER_PAGE_PARAMS = ("limit", "cursor", "status", "date_from", "date_to", "user_id", "city", "pincode")
+DEFAULT_ORDER_PAGE_SIZE = 50
+MAX_ORDER_PAGE_SIZE = 200
+
+
 # ---------------- ADMIN GET ALL ORDERS ----------------
 # GET /api/orders/all
+# Without query params this still returns every order as a plain list.
+# Any filter / limit / cursor returns one page, newest first:
+#   GET /api/orders/all?limit=50&status=Pending&cursor=<next_cursor>
 @order_bp.route("/orders/all", methods=["GET"])
-@jwt_required()
+@query_budget(1)
+@admin_required
 def get_all_orders():
-    user_id = int(get_jwt_identity())
-    user = User.query.get(user_id)
-
-    if not user or user.role != "admin":
-        return jsonify({"message": "Unauthorized"}), 403
-
-    orders = Order.query.order_by(Order.id.desc()).all()
-
-    result = []
-    for order in orders:
-        result.append({
-            "id": order.id,
-            "invoice_no": order.invoice_no,
-            "user_id": order.user_id,
-            "total": float(order.total_amount),
-            "status": order.status,
-            "created_at": order.created_at.strftime("%Y-%m-%d %H:%M:%S")
-        })
+    args = request.args
 
-    return jsonify(result), 200
+    if not any(key in args for key in ORDER_PAGE_PARAMS):
+        orders = Order.query.order_by(Order.id.desc()).all()
+        return jsonify([serialize_admin_order(order) for order in orders]), 200
+
+    limit = args.get("limit", DEFAULT_ORDER_PAGE_SIZE, type=int)
+    if limit < 1:
+        return jsonify({"message": "Invalid limit"}), 400
+    limit = min(limit, MAX_ORDER_PAGE_SIZE)
+
+    query, error = apply_order_filters(Order.query, args)
+    if error:
+        return jsonify({"message": error}), 400
+
+    # ✅ Keyset pagination on id (newest first): cursor = last id seen
+    if args.get("cursor"):
+        cursor = args.get("cursor", type=int)
+        if cursor is None:
+            return jsonify({"message": "Invalid cursor"}), 400
+        query = query.where(Order.id < cursor)
+
+    orders = query.order_by(Order.id.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(orders) > limit:
+        orders = orders[:limit]
+        next_cursor = str(orders[-1].id)
+
+    return jsonify({
+        "orders": [serialize_admin_order(order) for order in orders],
+        "next_cursor": next_cursor
+    }), 200
+
+
+# ---------------- ADMIN ORDER STATUS COUNTS ----------------
+# GET /api/orders/status-counts  (same filters as /orders/all, minus status)
+@order_bp.route("/orders/status-counts", methods=["GET"])
+@query_budget(1)
+@admin_required
+def order_status_counts():
+    query = db.session.query(
+        Order.status,
+        func.count(Order.id),
+        func.coalesce(func.sum(Order.total_amount), 0)
+    )
+    query, error = apply_order_filters(query, request.args, with_status=False)
+    if error:
+        return jsonify({"message": error}), 400
+
+    rows = query.group_by(Order.status).all()
+
+    return jsonify({
+        "counts": {status: count for status, count, _ in rows},
+        "revenue": {status: float(revenue) for status, _, revenue in rows},
+        "total": sum(count for _, count, _ in rows)
+    }), 200
 
 
 # ---------------- GET SINGLE ORDER (JSON INVOICE DATA) ----------------
 # GET /api/orders/<order_id>
 @order_bp.route("/orders/<int:order_id>", methods=["GET"])
+@query_budget(2)
 @jwt_required()
 def get_invoice(order_id):
     user_id = int(get_jwt_identity())
 
-    order = Order.query.filter_by(id=order_id, user_id=user_id).first()
+    order = load_order_with_items(order_id, user_id)
     if not order:
         return jsonify({"error": "Order not found"}), 404
 
     invoice_items = []
     for item in order.items:
-        product = Product.query.get(item.product_id)
+        product = item.product
         invoice_items.append({
             "name": product.name if product else "Deleted Product",
             "price": float(item.price),
@@ -208,156 +398,169 @@ def get_invoice(order_id):
 # ---------------- DOWNLOAD INVOICE PDF ----------------
 # GET /api/orders/<order_id>/invoice
 @order_bp.route("/orders/<int:order_id>/invoice", methods=["GET"])
+@query_budget(2)
 def download_invoice(order_id):
     # ✅ Verify JWT manually (works for file download)
     verify_jwt_in_request()
     user_id = int(get_jwt_identity())
 
-    order = Order.query.filter_by(id=order_id, user_id=user_id).first()
+    order = load_order_with_items(order_id, user_id)
     if not order:
         return jsonify({"error": "Order not found"}), 404
 
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(
-        buffer,
-        pagesize=A4,
-        rightMargin=18 * mm,
-        leftMargin=18 * mm,
-        topMargin=16 * mm,
-        bottomMargin=16 * mm,
-        title=f"Invoice {order.invoice_no or order.id}"
-    )
+    # ✅ Repeat downloads of an unchanged invoice are a plain file send
+    snapshot = invoice_snapshot(order)
+    path = invoice_cache.get_or_render(snapshot)
 
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        "title_style",
-        parent=styles["Title"],
-        fontSize=18,
-        spaceAfter=6
+    return send_file(
+        path,
+        as_attachment=True,
+        download_name=download_name(snapshot),
+        mimetype="application/pdf"
     )
 
-    small = ParagraphStyle(
-        "small",
-        parent=styles["Normal"],
-        fontSize=10,
-        leading=13
+# ---------------- ADMIN INVOICE RENDER QUEUE ----------------
+# GET /api/orders/invoice-queue
+# Queue depth and job counts are totals over every worker (from the metrics
+# files); "this_process" is the worker that answered.
+@order_bp.route("/orders/invoice-queue", methods=["GET"])
+@query_budget(0)
+@admin_required
+def invoice_queue_stats():
+    return jsonify(invoice_prerenderer.stats()), 200
+
+
+# ---------------- ADMIN BULK INVOICE EXPORT (ZIP) ----------------
+# GET /api/orders/invoices/export?date_from=2026-01-01&date_to=2026-01-31&status=Delivered
+@order_bp.route("/orders/invoices/export", methods=["GET"])
+@admin_required
+def export_invoices():
+    if not request.args.get("date_from") or not request.args.get("date_to"):
+        return jsonify({"message": "date_from and date_to are required"}), 400
+
+    query = (
+        select(Order)
+        .options(selectinload(Order.items).joinedload(OrderItem.product))
+        .order_by(Order.id)
     )
-
-    elements = []
-
-    # ---------- HEADER ----------
-    elements.append(Paragraph("Desi Farms", title_style))
-    elements.append(Paragraph("Fresh & Organic Products", small))
-    elements.append(Spacer(1, 10))
-
-    # ---------- INVOICE META + CUSTOMER ----------
-    invoice_no = order.invoice_no or f"DF-{order.id}"
-    meta_left = [
-        ["Invoice No:", invoice_no],
-        ["Order ID:", f"#{order.id}"],
-        ["Date:", order.created_at.strftime("%d-%m-%Y %H:%M")],
-        ["Status:", order.status],
-        ["Payment:", order.payment_method or "Cash on Delivery"],
-    ]
-
-    customer_right = [
-        ["Bill To:", order.customer_name or "Customer"],
-        ["Phone:", order.phone or "-"],
-        ["Address:", (order.address or "-")],
-        ["City / PIN:", f"{order.city or '-'} / {order.pincode or '-'}"],
-    ]
-
-    meta_table = Table(
-        [[Table(meta_left, colWidths=[55*mm, 65*mm]),
-          Table(customer_right, colWidths=[55*mm, 65*mm])]],
-        colWidths=[90*mm, 90*mm]
+    query, error = apply_order_filters(query, request.args)
+    if error:
+        return jsonify({"message": error}), 400
+
+    # ✅ Runs inside the streamed response, 200 orders per fetch
+    def snapshots():
+        for order in db.session.scalars(query.execution_options(yield_per=200)):
+            yield invoice_snapshot(order)
+
+    if not invoice_exporter.acquire():
+        return jsonify({"message": "Too many invoice exports running, please try again"}), 503
+
+    response = Response(
+        stream_with_context(invoice_exporter.export_zip(snapshots())),
+        mimetype="application/zip",
+        headers={
+            "Content-Disposition": (
+                f"attachment; filename=DesiFarms_Invoices_"
+                f"{request.args['date_from']}_{request.args['date_to']}.zip"
+            )
+        }
     )
-
-    meta_table.setStyle(TableStyle([
-        ("VALIGN", (0, 0), (-1, -1), "TOP"),
-        ("BOX", (0, 0), (-1, -1), 0.5, colors.lightgrey),
-        ("INNERGRID", (0, 0), (-1, -1), 0.25, colors.whitesmoke),
-        ("BACKGROUND", (0, 0), (-1, -1), colors.whitesmoke),
-        ("LEFTPADDING", (0, 0), (-1, -1), 8),
-        ("RIGHTPADDING", (0, 0), (-1, -1), 8),
-        ("TOPPADDING", (0, 0), (-1, -1), 8),
-        ("BOTTOMPADDING", (0, 0), (-1, -1), 8),
-    ]))
-
-    elements.append(meta_table)
-    elements.append(Spacer(1, 14))
-
-    # ---------- ITEMS TABLE ----------
-    data = [["#", "Item", "Qty", "Unit Price (₹)", "Subtotal (₹)"]]
-
-    grand_total = 0.0
-    for idx, item in enumerate(order.items, start=1):
-        product = Product.query.get(item.product_id)
-        name = product.name if product else "Deleted Product"
-
-        subtotal = float(item.price) * int(item.quantity)
-        grand_total += subtotal
-
-        data.append([
-            str(idx),
-            name,
-            str(int(item.quantity)),
-            f"{float(item.price):.2f}",
-            f"{subtotal:.2f}"
-        ])
-
-    data.append(["", "", "", "Grand Total", f"₹ {grand_total:.2f}"])
-
-    table = Table(
-        data,
-        colWidths=[10*mm, 80*mm, 15*mm, 30*mm, 30*mm],
-        hAlign="LEFT"
+    # ✅ Frees the export slot once the response is finished or abandoned
+    response.call_on_close(invoice_exporter.release)
+    return response
+
+
+# ---------------- ADMIN ORDER EXPORT (CSV / NDJSON) ----------------
+# GET /api/orders/export?format=csv|ndjson&date_from=&date_to=&status=
+# One row per order line. Rows are fetched 1000 at a time and written
+# straight to the response, so memory does not grow with the result size.
+EXPORT_COLUMNS = [
+    ("order_id", Order.id),
+    ("invoice_no", Order.invoice_no),
+    ("created_at", Order.created_at),
+    ("status", Order.status),
+    ("user_id", Order.user_id),
+    ("customer_name", Order.customer_name),
+    ("phone", Order.phone),
+    ("city", Order.city),
+    ("pincode", Order.pincode),
+    ("payment_method", Order.payment_method),
+    ("order_total", Order.total_amount),
+    ("item_id", OrderItem.id),
+    ("product_id", OrderItem.product_id),
+    ("product_name", Product.name),
+    ("quantity", OrderItem.quantity),
+    ("price", OrderItem.price),
+]
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+@order_bp.route("/orders/export", methods=["GET"])
+@admin_required
+def export_orders():
+    export_format = request.args.get("format", "csv")
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"message": "format must be csv or ndjson"}), 400
+
+    names = [name for name, _ in EXPORT_COLUMNS]
+    query = (
+        select(*[column for _, column in EXPORT_COLUMNS])
+        .join(OrderItem, OrderItem.order_id == Order.id)
+        .outerjoin(Product, Product.id == OrderItem.product_id)
+        .order_by(Order.id, OrderItem.id)
     )
-
-    table.setStyle(TableStyle([
-        ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
-        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-        ("FONTSIZE", (0, 0), (-1, 0), 10),
-
-        ("GRID", (0, 0), (-1, -2), 0.3, colors.grey),
-        ("ALIGN", (0, 0), (0, -1), "CENTER"),
-        ("ALIGN", (2, 1), (-1, -1), "CENTER"),
-        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-        ("FONTSIZE", (0, 1), (-1, -1), 10),
-
-        # Total row styling
-        ("FONTNAME", (0, -1), (-1, -1), "Helvetica-Bold"),
-        ("BACKGROUND", (0, -1), (-1, -1), colors.whitesmoke),
-        ("LINEABOVE", (0, -1), (-1, -1), 1, colors.black),
-        ("SPAN", (0, -1), (3, -1)),
-        ("ALIGN", (3, -1), (3, -1), "RIGHT"),
-        ("ALIGN", (4, -1), (4, -1), "RIGHT"),
-    ]))
-
-    elements.append(table)
-    elements.append(Spacer(1, 18))
-
-    elements.append(Paragraph("Thank you for shopping with Desi Farms!", small))
-    elements.append(Paragraph("For support: vaishnavidivekar3012@gmail.com", small))
-
-    doc.build(elements)
-    buffer.seek(0)
-
-    return send_file(
-        buffer,
-        as_attachment=True,
-        download_name=f"DesiFarms_Invoice_{order.id}.pdf",
-        mimetype="application/pdf"
+    query, error = apply_order_filters(query, request.args)
+    if error:
+        return jsonify({"message": error}), 400
+
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        if export_format == "csv":
+            writer.writerow(names)
+
+        result = db.session.execute(query.execution_options(yield_per=1000))
+        for rows in result.partitions():
+            for row in rows:
+                values = [
+                    value.strftime("%Y-%m-%d %H:%M:%S") if isinstance(value, datetime) else value
+                    for value in row
+                ]
+                if export_format == "csv":
+                    writer.writerow(values)
+                else:
+                    buffer.write(json.dumps(dict(zip(names, values))))
+                    buffer.write("\n")
+
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+        yield buffer.getvalue()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype=EXPORT_FORMATS[export_format],
+        headers={
+            "Content-Disposition": f"attachment; filename=DesiFarms_Orders.{export_format}"
+        }
     )
 
+
 # ---------------- CANCEL ORDER (USER) ----------------
 # DELETE /api/orders/<order_id>/cancel
 @order_bp.route("/orders/<int:order_id>/cancel", methods=["DELETE"])
+@query_budget(5)
 @jwt_required()
 def cancel_order(order_id):
     user_id = int(get_jwt_identity())
 
-    order = Order.query.filter_by(id=order_id, user_id=user_id).first()
+    order = load_order_with_items(order_id, user_id)
     if not order:
         return jsonify({"message": "Order not found"}), 404
 
@@ -365,15 +568,28 @@ def cancel_order(order_id):
     if order.status != "Pending":
         return jsonify({"message": "Only Pending orders can be cancelled"}), 400
 
-    # ✅ Mark cancelled
-    order.status = "Cancelled"
+    # ✅ Mark cancelled only while still Pending: of two concurrent cancels
+    #    only one matches, so the stock is returned once
+    cancelled = db.session.execute(
+        CHANGE_STATUS.where(Order.__table__.c.user_id == user_id),
+        {"b_id": order_id, "b_old": "Pending", "b_new": "Cancelled"}
+    )
+    if cancelled.rowcount != 1:
+        db.session.rollback()
+        return jsonify({"message": "Order status changed, please reload"}), 409
+
+    set_committed_value(order, "status", "Cancelled")
+    record_status_change(order, "Pending")
 
-    # ✅ OPTIONAL: Restock items (recommended)
+    # ✅ Restock relative to the current value (one executemany), so stock
+    #    reserved by other checkouts in the meantime is kept
+    quantities = {}
     for item in order.items:
-        product = Product.query.get(item.product_id)
-        if product:
-            product.stock += int(item.quantity)
+        quantities[item.product_id] = quantities.get(item.product_id, 0) + int(item.quantity)
+    if quantities:
+        db.session.execute(RESTOCK, [{"b_id": pid, "b_qty": qty} for pid, qty in quantities.items()])
 
     db.session.commit()
+    catalog_cache.bump()  # stock changed
 
     return jsonify({"message": "Order cancelled successfully"}), 200  
\ No newline at end of file
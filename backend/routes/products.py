@@ -1,179 +1,15 @@
 from flask import Blueprint, jsonify, request, current_app
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from werkzeug.utils import secure_filename
+from sqlalchemy import and_, func, or_
 from extensions import db
-from models import Product, User
-import os
-
-product_bp = Blueprint("products", __name__)
-
-# ----------------------------------------------------
-# SEED SAMPLE PRODUCTS (ONE TIME)
-# ----------------------------------------------------
-@product_bp.route("/seed-products")
-def seed_products():
-    if Product.query.first():
-        return {"message": "Products already added"}
-
-    products = [
-        Product(
-            name="Fresh Cow Milk",
-            price=60,
-            unit="1 Litre",
-            stock=100,
-            image="/static/uploads/milk.jpg"
-        ),
-        Product(
-            name="Desi Ghee",
-            price=550,
-            unit="500 gm",
-            stock=50,
-            image="/static/uploads/ghee.jpg"
-        ),
-        Product(
-            name="Fresh Curd",
-            price=80,
-            unit="500 gm",
-            stock=80,
-            image="/static/uploads/curd.jpg"
-        )
-    ]
-
-    db.session.bulk_save_objects(products)
-    db.session.commit()
-
-    return {"message": "Products added successfully"}
-
-
-# ----------------------------------------------------
-# GET ALL PRODUCTS (PUBLIC)
-# ----------------------------------------------------
-@product_bp.route("/products", methods=["GET"])
-def get_products():
-    products = Product.query.all()
-
-    return jsonify([
-        {
-            "id": p.id,
-            "name": p.name,
-            "price": p.price,
-            "unit": p.unit,
-            "stock": p.stock,
-            "image": p.image
-        }
-        for p in products
-    ])
-
-
-# ----------------------------------------------------
-# ADMIN ADD PRODUCT (WITH IMAGE UPLOAD)
-# ----------------------------------------------------
-@product_bp.route("/products", methods=["POST"])
-@jwt_required()
-def add_product():
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-
-    if user.role != "admin":
-        return jsonify({"error": "Admin access required"}), 403
-
-    name = request.form.get("name")
-    price = request.form.get("price")
-    unit = request.form.get("unit")
-    stock = request.form.get("stock")
-
-    image_file = request.files.get("image")
-    image_path = None
-
-    if image_file:
-        filename = secure_filename(image_file.filename)
-        upload_folder = current_app.config["UPLOAD_FOLDER"]
-
-        if not os.path.exists(upload_folder):
-            os.makedirs(upload_folder)
-
-        full_path = os.path.join(upload_folder, filename)
-        image_file.save(full_path)
-
-        # ✅ Correct path
-        image_path = f"/static/uploads/{filename}"
-
-    product = Product(
-        name=name,
-        price=price,
-        unit=unit,
-        stock=stock,
-        image=image_path
-    )
-
-    db.session.add(product)
-    db.session.commit()
-
-    return jsonify({"message": "Product added successfully"}), 201
-
-
-# ----------------------------------------------------
-# UPDATE PRODUCT
-# ----------------------------------------------------
-@product_bp.route("/products/<int:id>", methods=["PUT"])
-@jwt_required()
-def update_product(id):
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-
-    if user.role != "admin":
-        return jsonify({"error": "Admin access required"}), 403
-
-    product = Product.query.get_or_404(id)
-
-    product.name = request.form.get("name")
-    product.price = request.form.get("price")
-    product.unit = request.form.get("unit")
-    product.stock = request.form.get("stock")
-
-    image_file = request.files.get("image")
-
-    if image_file:
-        filename = secure_filename(image_file.filename)
-        upload_folder = current_app.config["UPLOAD_FOLDER"]
-
-        full_path = os.path.join(upload_folder, filename)
-        image_file.save(full_path)
-
-        # ✅ Correct path
-        product.image = f"/static/uploads/{filename}"
-
-    db.session.commit()
-
-    return jsonify({"message": "Product updated successfully"})
-
-
-# ----------------------------------------------------
-# DELETE PRODUCT
-# ----------------------------------------------------
-@product_bp.route("/products/<int:id>", methods=["DELETE"])
-@jwt_required()
-def delete_product(id):
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-
-    if user.role != "admin":
-        return jsonify({"error": "Admin access required"}), 403
-
-    product = Product.query.get_or_404(id)
-
-    db.session.delete(product)
-    db.session.commit()
-
-    return jsonify({"message": "Product deleted successfully"})
-
-
-from flask import Blueprint, jsonify, request, current_app
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from werkzeug.utils import secure_filename
-from extensions import db
-from models import Product, User
-import os
+from models import Product
+from catalog_cache import catalog_cache
+from authz import admin_required
+from image_pipeline import UploadError, image_pipeline, image_variants
+from query_audit import query_budget
+from urllib.parse import urlencode
+import base64
+import json
+import math
 
 product_bp = Blueprint("products", __name__)
 
@@ -181,6 +17,7 @@ product_bp = Blueprint("products", __name__)
 # SEED SAMPLE PRODUCTS (ONE TIME)
 # ----------------------------------------------------
 @product_bp.route("/seed-products")
+@query_budget(2)
 def seed_products():
     if Product.query.first():
         return {"message": "Products already added"}
@@ -217,6 +54,7 @@ def seed_products():
 
     db.session.bulk_save_objects(products)
     db.session.commit()
+    catalog_cache.bump()
 
     return {"message": "Products added successfully"}
 
@@ -224,37 +62,196 @@ def seed_products():
 # ----------------------------------------------------
 # GET ALL PRODUCTS (PUBLIC)
 # ----------------------------------------------------
+# Without query params this returns the full catalog as a plain list
+# (kept for Home / AdminDashboard). Any of limit, cursor, sort, category,
+# q, min_price or max_price switches to one keyset-paginated page:
+#   GET /api/products?limit=24&sort=-price&category=Dairy&cursor=<next_cursor>
+PRODUCT_SORTS = {
+    "id": Product.id,
+    "name": Product.name,
+    "price": Product.price,
+}
+
+DEFAULT_PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+
+PAGE_PARAMS = ("limit", "cursor", "sort", "category", "q", "min_price", "max_price")
+
+
+def serialize_product(p):
+    return {
+        "id": p.id,
+        "name": p.name,
+        "price": p.price,
+        "original_price": p.original_price,
+        "discount_percent": p.discount_percent,
+        "unit": p.unit,
+        "stock": p.stock,
+        "image": p.image,
+        "images": image_variants(p.image),
+        "category": p.category
+    }
+
+
+def encode_cursor(value, last_id):
+    raw = json.dumps([value, last_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def is_sql_int(value):
+    return isinstance(value, int) and not isinstance(value, bool) and -2 ** 63 <= value < 2 ** 63
+
+
+def decode_cursor(cursor, sort_column):
+    padded = cursor + "=" * (-len(cursor) % 4)
+    value, last_id = json.loads(base64.urlsafe_b64decode(padded))
+
+    # ✅ Only values the sort column can hold reach the SQL comparison: an
+    #    object would fail in SQLite and null would turn into `> NULL`
+    if sort_column.type.python_type is str:
+        valid = isinstance(value, str)
+    else:
+        valid = is_sql_int(value) or (isinstance(value, float) and math.isfinite(value))
+    if not (valid and is_sql_int(last_id)):
+        raise ValueError("Cursor does not match the sort column")
+    return value, last_id
+
+
+def filtered_products(args, with_category=True):
+    query = Product.query
+
+    q = (args.get("q") or "").strip()
+    if q:
+        query = query.filter(Product.name.ilike(f"%{q}%"))
+
+    category = (args.get("category") or "").strip()
+    if category and with_category:
+        query = query.filter(Product.category == category)
+
+    min_price = args.get("min_price", type=float)
+    if min_price is not None:
+        query = query.filter(Product.price >= min_price)
+
+    max_price = args.get("max_price", type=float)
+    if max_price is not None:
+        query = query.filter(Product.price <= max_price)
+
+    return query
+
+
+def build_catalog(args):
+    if not any(key in args for key in PAGE_PARAMS):
+        return [serialize_product(p) for p in Product.query.all()], None
+
+    for key in ("min_price", "max_price"):
+        if key in args and args.get(key, type=float) is None:
+            return None, f"Invalid {key}"
+
+    limit = args.get("limit", DEFAULT_PAGE_SIZE, type=int)
+    if limit < 1:
+        return None, "Invalid limit"
+    limit = min(limit, MAX_PAGE_SIZE)
+
+    sort = args.get("sort", "id")
+    descending = sort.startswith("-")
+    sort_column = PRODUCT_SORTS.get(sort.lstrip("-"))
+    if sort_column is None:
+        return None, f"Invalid sort, use one of: {', '.join(PRODUCT_SORTS)}"
+
+    query = filtered_products(args)
+
+    # ✅ Keyset pagination: (sort value, id) of the last row seen
+    cursor = args.get("cursor")
+    if cursor:
+        try:
+            last_value, last_id = decode_cursor(cursor, sort_column)
+        except (ValueError, TypeError):
+            return None, "Invalid cursor"
+
+        if sort_column is Product.id:
+            query = query.filter(
+                Product.id < last_id if descending else Product.id > last_id
+            )
+        elif descending:
+            query = query.filter(or_(
+                sort_column < last_value,
+                and_(sort_column == last_value, Product.id < last_id)
+            ))
+        else:
+            query = query.filter(or_(
+                sort_column > last_value,
+                and_(sort_column == last_value, Product.id > last_id)
+            ))
+
+    if descending:
+        order = [sort_column.desc(), Product.id.desc()]
+    else:
+        order = [sort_column.asc(), Product.id.asc()]
+
+    rows = query.order_by(*order).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, sort_column.key), last.id)
+
+    # ✅ Facets ignore the category filter so every category stays clickable
+    facet_rows = (
+        filtered_products(args, with_category=False)
+        .with_entities(Product.category, func.count(Product.id))
+        .group_by(Product.category)
+        .order_by(Product.category)
+        .all()
+    )
+
+    return {
+        "products": [serialize_product(p) for p in rows],
+        "next_cursor": next_cursor,
+        "facets": {
+            "categories": [
+                {"category": category, "count": count}
+                for category, count in facet_rows
+            ]
+        }
+    }, None
+
+
+# ✅ 304 / cache hits answer from the generation file alone, no SQLite
 @product_bp.route("/products", methods=["GET"])
+@query_budget(2)
 def get_products():
-    products = Product.query.all()
-
-    return jsonify([
-        {
-            "id": p.id,
-            "name": p.name,
-            "price": p.price,
-            "original_price": p.original_price,
-            "discount_percent": p.discount_percent,
-            "unit": p.unit,
-            "stock": p.stock,
-            "image": p.image
-        }
-        for p in products
-    ])
+    key = urlencode(sorted(request.args.items(multi=True)))
+    generation = catalog_cache.generation()
+    etag = catalog_cache.etag(generation, key)
+
+    if request.if_none_match.contains_weak(etag):
+        response = current_app.response_class(status=304)
+    else:
+        body = catalog_cache.get(generation, key)
+
+        if body is None:
+            payload, error = build_catalog(request.args)
+            if error:
+                return jsonify({"error": error}), 400
+
+            body = current_app.json.dumps(payload)
+            catalog_cache.set(generation, key, body)
+
+        response = current_app.response_class(body, mimetype="application/json")
+
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
 
 
 # ----------------------------------------------------
 # ADMIN ADD PRODUCT (WITH IMAGE UPLOAD)
 # ----------------------------------------------------
 @product_bp.route("/products", methods=["POST"])
-@jwt_required()
+@query_budget(1)
+@admin_required
 def add_product():
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-
-    if user.role != "admin":
-        return jsonify({"error": "Admin access required"}), 403
-
     name = request.form.get("name")
     price = float(request.form.get("price", 0))
     original_price = float(request.form.get("original_price", price))
@@ -272,16 +269,10 @@ def add_product():
     image_path = None
 
     if image_file:
-        filename = secure_filename(image_file.filename)
-        upload_folder = current_app.config["UPLOAD_FOLDER"]
-
-        if not os.path.exists(upload_folder):
-            os.makedirs(upload_folder)
-
-        full_path = os.path.join(upload_folder, filename)
-        image_file.save(full_path)
-
-        image_path = f"/uploads/{filename}"
+        try:
+            image_path = image_pipeline.save(image_file)
+        except UploadError as e:
+            return jsonify({"message": str(e)}), 400
 
     product = Product(
         name=name,
@@ -295,6 +286,7 @@ def add_product():
 
     db.session.add(product)
     db.session.commit()
+    catalog_cache.bump()
 
     return jsonify({"message": "Product added successfully"}), 201
 
@@ -303,14 +295,9 @@ def add_product():
 # UPDATE PRODUCT
 # ----------------------------------------------------
 @product_bp.route("/products/<int:id>", methods=["PUT"])
-@jwt_required()
+@query_budget(2)
+@admin_required
 def update_product(id):
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-
-    if user.role != "admin":
-        return jsonify({"error": "Admin access required"}), 403
-
     product = Product.query.get_or_404(id)
 
     product.name = request.form.get("name")
@@ -333,15 +320,14 @@ def update_product(id):
     image_file = request.files.get("image")
 
     if image_file:
-        filename = secure_filename(image_file.filename)
-        upload_folder = current_app.config["UPLOAD_FOLDER"]
-
-        full_path = os.path.join(upload_folder, filename)
-        image_file.save(full_path)
-
-        product.image = f"/uploads/{filename}"
+        try:
+            product.image = image_pipeline.save(image_file)
+        except UploadError as e:
+            db.session.rollback()
+            return jsonify({"message": str(e)}), 400
 
     db.session.commit()
+    catalog_cache.bump()
 
     return jsonify({"message": "Product updated successfully"})
 
@@ -350,30 +336,21 @@ def update_product(id):
 # DELETE PRODUCT
 # ----------------------------------------------------
 @product_bp.route("/products/<int:id>", methods=["DELETE"])
-@jwt_required()
+@query_budget(4)
+@admin_required
 def delete_product(id):
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-
-    if user.role != "admin":
-        return jsonify({"error": "Admin access required"}), 403
-
     product = Product.query.get_or_404(id)
 
     db.session.delete(product)
     db.session.commit()
+    catalog_cache.bump()
 
     return jsonify({"message": "Product deleted successfully"})
 
 @product_bp.route("/products/<int:id>/stock", methods=["PUT"])
-@jwt_required()
+@query_budget(3)
+@admin_required
 def update_stock(id):
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-
-    if not user or user.role != "admin":
-        return jsonify({"message": "Admin access required"}), 403
-
     product = Product.query.get_or_404(id)
 
     data = request.get_json()
@@ -389,6 +366,7 @@ def update_stock(id):
 
         product.stock = new_stock
         db.session.commit()
+        catalog_cache.bump()
 
     except (ValueError, TypeError):
         return jsonify({"message": "Invalid stock value"}), 400
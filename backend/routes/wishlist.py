@@ -1,15 +1,32 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
 from extensions import db
 from models import Wishlist, Product
+from query_audit import query_budget
 
 wishlist_bp = Blueprint("wishlist", __name__)
 
+MAX_BATCH = 200
+
+
+def parse_product_ids(values):
+    try:
+        ids = {int(v) for v in values}
+    except (TypeError, ValueError):
+        return None, "Product ids must be integers"
+    if len(ids) > MAX_BATCH:
+        return None, f"At most {MAX_BATCH} product ids per request"
+    return ids, None
+
 # ===========================
 # ADD TO WISHLIST
 # POST /api/wishlist/<product_id>
 # ===========================
 @wishlist_bp.route("/<int:product_id>", methods=["POST"])
+@query_budget(4)
 @jwt_required()
 def add_to_wishlist(product_id):
     user_id = get_jwt_identity()
@@ -26,7 +43,12 @@ def add_to_wishlist(product_id):
 
     item = Wishlist(user_id=user_id, product_id=product_id)
     db.session.add(item)
-    db.session.commit()
+
+    try:
+        db.session.commit()
+    except IntegrityError:  # ✅ a parallel request added it first
+        db.session.rollback()
+        return jsonify({"message": "Already in wishlist"}), 400
 
     return jsonify({
         "message": "Added to wishlist",
@@ -40,18 +62,24 @@ def add_to_wishlist(product_id):
 # GET /api/wishlist/
 # ===========================
 @wishlist_bp.route("/", methods=["GET"])
+@query_budget(1)
 @jwt_required()
 def get_wishlist():
     user_id = get_jwt_identity()
 
-    # ✅ Latest first
-    items = Wishlist.query.filter_by(user_id=user_id).order_by(Wishlist.id.desc()).all()
+    # ✅ Latest first, products joined in the same query
+    #    (rows whose product is gone drop out)
+    items = (
+        Wishlist.query
+        .options(joinedload(Wishlist.product, innerjoin=True))
+        .filter_by(user_id=user_id)
+        .order_by(Wishlist.id.desc())
+        .all()
+    )
 
     result = []
     for item in items:
-        product = item.product  # relationship
-        if not product:
-            continue
+        product = item.product
 
         result.append({
             "wishlist_id": item.id,
@@ -70,6 +98,7 @@ def get_wishlist():
 # DELETE /api/wishlist/<wishlist_id>
 # ===========================
 @wishlist_bp.route("/<int:wishlist_id>", methods=["DELETE"])
+@query_budget(2)
 @jwt_required()
 def remove_from_wishlist(wishlist_id):
     user_id = get_jwt_identity()
@@ -81,4 +110,101 @@ def remove_from_wishlist(wishlist_id):
     db.session.delete(item)
     db.session.commit()
 
-    return jsonify({"message": "Removed from wishlist"}), 200
\ No newline at end of file
+    return jsonify({"message": "Removed from wishlist"}), 200
+
+
+# ===========================
+# MEMBERSHIP FOR PRODUCT GRIDS
+# GET /api/wishlist/contains?ids=1,2,3
+# ===========================
+# One query on the (user_id, product_id) unique index; returns the subset
+# of the given ids that are wishlisted.
+@wishlist_bp.route("/contains", methods=["GET"])
+@query_budget(1)
+@jwt_required()
+def wishlist_contains():
+    user_id = get_jwt_identity()
+
+    raw = [v for v in request.args.get("ids", "").split(",") if v.strip()]
+    ids, error = parse_product_ids(raw)
+    if error:
+        return jsonify({"message": error}), 400
+
+    if not ids:
+        return jsonify({"product_ids": []}), 200
+
+    rows = (
+        db.session.query(Wishlist.product_id)
+        .filter(Wishlist.user_id == user_id, Wishlist.product_id.in_(ids))
+        .all()
+    )
+
+    return jsonify({"product_ids": sorted(pid for (pid,) in rows)}), 200
+
+
+# ===========================
+# BATCH ADD / REMOVE
+# POST /api/wishlist/batch  {"add": [1, 2], "remove": [3]}
+# ===========================
+@wishlist_bp.route("/batch", methods=["POST"])
+@query_budget(7)
+@jwt_required()
+def batch_update_wishlist():
+    user_id = get_jwt_identity()
+    data = request.get_json() or {}
+
+    to_add, error = parse_product_ids(data.get("add") or [])
+    if not error:
+        to_remove, error = parse_product_ids(data.get("remove") or [])
+    if error:
+        return jsonify({"message": error}), 400
+
+    if to_add & to_remove:
+        return jsonify({"message": "A product cannot be added and removed together"}), 400
+
+    known = {
+        pid for (pid,) in
+        db.session.query(Product.id).filter(Product.id.in_(to_add)).all()
+    } if to_add else set()
+
+    # ✅ (user_id, product_id) is unique: if a parallel request inserted some
+    #    of these first, retry once and skip them
+    for attempt in range(2):
+        existing = {
+            pid for (pid,) in
+            db.session.query(Wishlist.product_id)
+            .filter(Wishlist.user_id == user_id, Wishlist.product_id.in_(known))
+            .all()
+        } if known else set()
+
+        added = sorted(known - existing)
+        if added:
+            # ✅ Core insert: one executemany. add_all() falls back to one
+            #    INSERT ... RETURNING per row to fetch ids nobody reads here
+            db.session.execute(
+                insert(Wishlist),
+                [{"user_id": user_id, "product_id": pid} for pid in added]
+            )
+
+        removed = 0
+        if to_remove:
+            removed = (
+                Wishlist.query
+                .filter(Wishlist.user_id == user_id, Wishlist.product_id.in_(to_remove))
+                .delete(synchronize_session=False)
+            )
+
+        try:
+            db.session.commit()
+            break
+        except IntegrityError:
+            db.session.rollback()
+            if attempt:
+                raise
+
+    return jsonify({
+        "message": "Wishlist updated",
+        "added": added,
+        "removed": removed,
+        "not_found": sorted(to_add - known)
+    }), 200
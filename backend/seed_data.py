@@ -0,0 +1,228 @@
+import random
+import time
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import func
+from werkzeug.security import generate_password_hash
+
+from extensions import db
+from catalog_cache import catalog_cache
+from order_stats import rebuild_order_stats
+
+
+CATALOG = {
+    "Dairy": (("Cow Milk", "1 Litre", 60), ("Desi Ghee", "500 gm", 450), ("Fresh Curd", "500 gm", 70),
+              ("Paneer", "200 gm", 90), ("White Butter", "250 gm", 140), ("Buttermilk", "500 ml", 30)),
+    "Dal": (("Moong Dal", "1 kg", 140), ("Masoor Dal", "1 kg", 110), ("Chana Dal", "1 kg", 100),
+            ("Toor Dal", "1 kg", 160), ("Urad Dal", "1 kg", 150)),
+    "Oil": (("Wood-pressed Groundnut Oil", "1 Litre", 320), ("Mustard Oil", "1 Litre", 240),
+            ("Coconut Oil", "500 ml", 210), ("Sesame Oil", "500 ml", 260)),
+    "Spices": (("Turmeric Powder", "200 gm", 60), ("Red Chilli Powder", "200 gm", 70),
+               ("Coriander Powder", "200 gm", 50), ("Garam Masala", "100 gm", 80)),
+    "Atta": (("Chakki Atta", "5 kg", 260), ("Bajra Flour", "1 kg", 70), ("Jowar Flour", "1 kg", 80)),
+    "Sweeteners": (("Jaggery (Gud)", "1 kg", 90), ("Jaggery Powder", "500 gm", 70)),
+    "Pickle": (("Mango Pickle", "500 gm", 180), ("Lemon Pickle", "500 gm", 160)),
+}
+
+# Weighted pool: 5% Pending, 10% Confirmed, 10% Shipped, 70% Delivered, 5% Cancelled
+STATUS_POOL = ("Pending",) * 5 + ("Confirmed",) * 10 + ("Shipped",) * 10 + \
+    ("Delivered",) * 70 + ("Cancelled",) * 5
+CITIES = (("Nashik", "422001"), ("Pune", "411001"), ("Satara", "415001"), ("Indore", "452001"),
+          ("Nagpur", "440001"), ("Kolhapur", "416001"), ("Aurangabad", "431001"))
+
+TIMESTAMP = "%Y-%m-%d %H:%M:%S.%f"
+
+
+# ==========================
+# BULK SEEDING CLI
+# ==========================
+#   flask --app app seed-data --users 10000 --products 5000 --orders 1000000
+#
+# Rows are generated as tuples and written with cursor.executemany in
+# batches of --batch-size. Each table is one transaction; orders and their
+# items share one. Ids are assigned here, after the current max, so orders
+# and items link up without reading anything back. synchronous=OFF is only
+# set on the seeding connection.
+@click.command("seed-data")
+@click.option("--users", default=1000, show_default=True)
+@click.option("--products", default=500, show_default=True)
+@click.option("--orders", default=10000, show_default=True)
+@click.option("--max-items", default=4, show_default=True, help="Order items per order: 1..N")
+@click.option("--cart-users", default=200, show_default=True, help="Users that get cart lines")
+@click.option("--wishlist-users", default=200, show_default=True, help="Users that get wishlist rows")
+@click.option("--days", default=365, show_default=True, help="Spread orders over the last N days")
+@click.option("--password", default="Seed@1234", show_default=True)
+@click.option("--batch-size", default=50000, show_default=True)
+@click.option("--seed", "rng_seed", default=42, show_default=True, help="Random seed")
+@with_appcontext
+def seed_data_command(users, products, orders, max_items, cart_users, wishlist_users,
+                      days, password, batch_size, rng_seed):
+    """Bulk-generate users, products, carts, wishlists, orders and items."""
+    from models import Cart, Order, OrderItem, Product, User, Wishlist
+
+    rng = random.Random(rng_seed)
+    started = time.perf_counter()
+
+    def next_id(model):
+        return (db.session.query(func.max(model.id)).scalar() or 0) + 1
+
+    first_user, first_product, first_order = next_id(User), next_id(Product), next_id(Order)
+    user_ids = range(first_user, first_user + users)
+    product_ids = range(first_product, first_product + products)
+
+    def connection():
+        # ✅ Re-fetched after every commit; the pragma is per connection
+        conn = db.session.connection()
+        conn.exec_driver_sql("PRAGMA synchronous = OFF")
+        conn.exec_driver_sql("PRAGMA cache_size = -262144")  # 256 MB for index pages
+        return conn
+
+    def bulk(table, columns, rows):
+        sql = (f"INSERT INTO {table} ({', '.join(columns)}) "
+               f"VALUES ({', '.join('?' * len(columns))})")
+        conn = connection()
+        count = 0
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                conn.exec_driver_sql(sql, batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            conn.exec_driver_sql(sql, batch)
+            count += len(batch)
+        db.session.commit()
+        click.echo(f"  {table:<12} {count:>10,} rows  ({time.perf_counter() - started:.1f}s)")
+        return count
+
+    # ---------- USERS ----------
+    hashed = generate_password_hash(password, current_app.config.get("PASSWORD_HASH_METHOD", "scrypt"))
+    bulk(User.__tablename__, ("id", "name", "email", "password", "role", "token_version"), (
+        (uid, f"Customer {uid}", f"customer{uid}@seed.desifarms.test", hashed, "user", 0)
+        for uid in user_ids
+    ))
+
+    # ---------- PRODUCTS ----------
+    categories = list(CATALOG)
+    prices = dict(db.session.query(Product.id, Product.price).all())
+
+    def product_rows():
+        for pid in product_ids:
+            category = categories[pid % len(categories)]
+            name, unit, price = CATALOG[category][pid % len(CATALOG[category])]
+            price = max(10, int(price * rng.uniform(0.85, 1.15)))
+            original = round(price * rng.choice((1, 1, 1.1, 1.2, 1.25)), 2)
+            prices[pid] = price
+            yield (pid, f"{name} #{pid}", price, original,
+                   round((original - price) * 100 / original), unit,
+                   rng.randint(0, 500), None, category)
+
+    bulk(Product.__tablename__,
+         ("id", "name", "price", "original_price", "discount_percent", "unit", "stock", "image", "category"),
+         product_rows())
+
+    all_products = list(prices)
+    all_users = list(user_ids) or [uid for (uid,) in db.session.query(User.id).all()]
+
+    # ---------- CARTS / WISHLIST ----------
+    def pair_rows(owner_count, per_user, with_quantity):
+        now = datetime.utcnow().strftime(TIMESTAMP)
+        for uid in all_users[:owner_count]:
+            for pid in rng.sample(all_products, min(per_user, len(all_products))):
+                yield (uid, pid, rng.randint(1, 3)) if with_quantity else (uid, pid, now)
+
+    bulk(Cart.__tablename__, ("user_id", "product_id", "quantity"), pair_rows(cart_users, 5, True))
+    bulk(Wishlist.__tablename__, ("user_id", "product_id", "created_at"),
+         pair_rows(wishlist_users, 8, False))
+
+    # ---------- ORDERS + ITEMS ----------
+    # Each batch of orders is written together with its items, so totals
+    # match and at most one batch of item rows is held in memory.
+    if orders and not (all_products and all_users):
+        raise click.UsageError("Orders need at least one user and one product")
+
+    order_sql = (f"INSERT INTO {Order.__tablename__} (id, user_id, total_amount, status, customer_name, "
+                 "phone, address, city, pincode, payment_method, invoice_no, created_at) "
+                 "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)")
+    item_sql = (f"INSERT INTO {OrderItem.__tablename__} (order_id, product_id, quantity, price) "
+                "VALUES (?, ?, ?, ?)")
+
+    now = datetime.utcnow().replace(microsecond=0)
+    span = days * 86400
+    order_batch, item_batch = [], []
+    item_count = 0
+
+    conn = connection()
+
+    # ✅ When the load at least doubles the orders table, drop its secondary
+    #    indexes and rebuild them at the end: one sort per index instead of
+    #    millions of B-tree inserts. SQLite DDL is transactional, so a failed
+    #    load rolls back with the indexes intact.
+    rebuild = [
+        index
+        for table in (Order.__table__, OrderItem.__table__)
+        for index in table.indexes
+        if not index.unique
+    ] if orders >= first_order - 1 else []
+
+    for index in rebuild:
+        index.drop(conn, checkfirst=True)
+
+    def flush():
+        conn.exec_driver_sql(order_sql, order_batch)
+        conn.exec_driver_sql(item_sql, item_batch)
+        order_batch.clear()
+        item_batch.clear()
+
+    # ✅ rng.random() + indexing: randint/choice cost several Python calls each,
+    #    which dominated a million-order run
+    rand = rng.random
+    n_users, n_products, n_cities = len(all_users), len(all_products), len(CITIES)
+    payments = ("Cash on Delivery", "Online")
+
+    for offset in range(orders):
+        oid = first_order + offset
+        uid = all_users[int(rand() * n_users)]
+        city, pincode = CITIES[int(rand() * n_cities)]
+
+        total = 0
+        for _ in range(1 + int(rand() * max_items)):
+            pid = all_products[int(rand() * n_products)]
+            quantity = 1 + int(rand() * 4)
+            price = prices[pid]
+            total += price * quantity
+            item_batch.append((oid, pid, quantity, price))
+
+        created = now - timedelta(seconds=span * (orders - offset) // orders)
+        order_batch.append((
+            oid, uid, total, STATUS_POOL[int(rand() * 100)],
+            f"Customer {uid}", str(9_000_000_000 + int(rand() * 999_999_999)),
+            f"{1 + int(rand() * 999)} Main Road",
+            city, pincode, payments[int(rand() * 2)],
+            f"SEED-{oid:09d}", f"{created.isoformat(' ')}.000000"
+        ))
+
+        if len(order_batch) >= batch_size:
+            item_count += len(item_batch)
+            flush()
+
+    item_count += len(item_batch)
+    if order_batch:
+        flush()
+    for index in rebuild:
+        index.create(conn)
+    db.session.commit()
+    click.echo(f"  {'orders':<12} {orders:>10,} rows  ({time.perf_counter() - started:.1f}s)")
+    click.echo(f"  {'order_items':<12} {item_count:>10,} rows")
+
+    # ✅ Orders went in behind the routes' back, so recompute the rollup
+    if orders:
+        rebuild_order_stats()
+        click.echo(f"  {'order stats':<12} rebuilt     ({time.perf_counter() - started:.1f}s)")
+
+    catalog_cache.bump()
+    click.echo(f"✅ Seeded in {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,65 @@
+from sqlalchemy import event
+
+
+# ==========================
+# SQLITE PRODUCTION PROFILE
+# ==========================
+# SQLITE_PROFILE = "production" (default) applies the pragmas below on every
+# new connection; "default" leaves SQLite as it ships. Individual pragmas can
+# be overridden through the SQLITE_PRAGMAS config dict.
+#
+# The lock wait has one source: busy_timeout (5000 ms = 5 s by default). The
+# driver's connect_args "timeout" is derived from it, so both agree; the
+# pragma runs after connect and would win anyway.
+PRODUCTION_PRAGMAS = {
+    "journal_mode": "WAL",        # readers no longer block the writer
+    "synchronous": "NORMAL",      # safe with WAL, fsync only at checkpoints
+    "busy_timeout": 5000,         # ms to wait for a lock instead of failing
+    "mmap_size": 268435456,       # 256 MB memory-mapped reads
+    "cache_size": -65536,         # 64 MB page cache per connection
+    "temp_store": "MEMORY",
+}
+
+PRODUCTION_ENGINE_OPTIONS = {
+    "pool_size": 5,
+    "max_overflow": 10,
+    "pool_timeout": 30,
+    "pool_recycle": 3600,
+    "connect_args": {"check_same_thread": False},  # + "timeout" from busy_timeout
+}
+
+
+# Call BEFORE db.init_app(): Flask-SQLAlchemy reads engine options there
+def configure_sqlite(app):
+    app.config.setdefault("SQLITE_PROFILE", "production")
+    uri = app.config["SQLALCHEMY_DATABASE_URI"]
+    on_disk = uri.startswith("sqlite:///") and ":memory:" not in uri
+
+    if app.config["SQLITE_PROFILE"] != "production" or not on_disk:
+        app.config.setdefault("SQLITE_PRAGMAS", {})
+        return
+
+    pragmas = dict(PRODUCTION_PRAGMAS)
+    pragmas.update(app.config.get("SQLITE_PRAGMAS") or {})
+    app.config["SQLITE_PRAGMAS"] = pragmas
+
+    options = dict(PRODUCTION_ENGINE_OPTIONS)
+    options.update(app.config.get("SQLALCHEMY_ENGINE_OPTIONS") or {})
+    options["connect_args"] = {
+        **options.get("connect_args", {}),
+        "timeout": pragmas["busy_timeout"] / 1000,
+    }
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = options
+
+
+# Call AFTER db.init_app(), inside an app context
+def install_sqlite_pragmas(engine, pragmas):
+    if engine.dialect.name != "sqlite" or not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
@@ -0,0 +1,101 @@
+import contextlib
+import io
+import os
+import sqlite3
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, state_paths  # noqa: E402
+
+
+# ==========================
+# APP
+# ==========================
+# Every test app gets its own SQLite file and state folder under tmp_path,
+# so nothing touches backend/desi_farms.db or backend/instance/. The query
+# audit is on, so every response carries X-Query-Count.
+def make_app(folder, **config):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return create_app({
+            "TESTING": True,
+            "JWT_SECRET_KEY": "test-secret-key-that-is-32-bytes!",
+            "SQLALCHEMY_DATABASE_URI": "sqlite:///" + os.path.join(folder, "test.db"),
+            "PASSWORD_HASH_METHOD": "pbkdf2:sha256:1000",
+            "QUERY_AUDIT": True,
+            **state_paths(folder),
+            **config,
+        })
+
+
+def close_app(app):
+    from extensions import db
+
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = make_app(str(tmp_path))
+    yield app
+    close_app(app)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def auth_headers(app, user_id, role="user"):
+    from flask_jwt_extended import create_access_token
+
+    with app.app_context():
+        token = create_access_token(identity=str(user_id), additional_claims={"role": role, "tv": 0})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def query_count(response):
+    assert response.status_code < 400, response.get_data(as_text=True)
+    return int(response.headers["X-Query-Count"])
+
+
+# ==========================
+# CONCURRENCY HELPERS
+# ==========================
+def other_worker(app, sql, *params):
+    # A write committed by another process, outside the request's session
+    path = app.config["SQLALCHEMY_DATABASE_URI"][len("sqlite:///"):]
+    with sqlite3.connect(path, timeout=5) as conn:
+        conn.execute(sql, params)
+
+
+def in_other_thread(fn):
+    # Its own app context and session, like a request in another worker
+    result = []
+    thread = threading.Thread(target=lambda: result.append(fn()))
+    thread.start()
+    thread.join(timeout=10)
+    return result[0]
+
+
+def after_load(monkeypatch, action):
+    # Runs `action` once, right after a route in routes/orders.py has read its
+    # order, i.e. between that request's read and its write. The action may
+    # itself make a request (a competing admin / shopper).
+    import routes.orders
+
+    load = routes.orders.load_order_with_items
+    pending = [action]
+
+    def load_then_act(*args, **kwargs):
+        order = load(*args, **kwargs)
+        if pending:
+            pending.pop()()
+        return order
+
+    monkeypatch.setattr(routes.orders, "load_order_with_items", load_then_act)
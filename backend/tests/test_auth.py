@@ -0,0 +1,69 @@
+from werkzeug.security import generate_password_hash
+
+from conftest import auth_headers
+
+ADMIN, DEMOTED = 1, 2
+PASSWORD = "Secret@123"
+
+
+def seed(app):
+    from extensions import db
+    from models import User
+
+    with app.app_context():
+        db.session.add_all([
+            User(id=user_id, name=f"Admin {user_id}", email=f"admin{user_id}@example.com", role="admin",
+                 password=generate_password_hash(PASSWORD, method="pbkdf2:sha256:1000"))
+            for user_id in (ADMIN, DEMOTED)
+        ])
+        db.session.commit()
+
+
+# ==========================
+# TOKEN VERSIONS: ROLE CHANGE REVOKES TOKENS
+# ==========================
+def test_role_change_revokes_the_users_existing_tokens(app, client):
+    seed(app)
+    old_token = auth_headers(app, DEMOTED, role="admin")
+    assert client.get("/api/orders/status-counts", headers=old_token).status_code == 200
+
+    response = client.put(f"/api/users/{DEMOTED}/role", json={"role": "user"},
+                          headers=auth_headers(app, ADMIN, role="admin"))
+    assert response.status_code == 200
+
+    # The old token still says "admin", but carries token version 0
+    response = client.get("/api/orders/status-counts", headers=old_token)
+    assert response.status_code == 401
+    assert response.get_json()["message"] == "Session expired, please log in again"
+
+    # Other admins are untouched
+    response = client.get("/api/orders/status-counts", headers=auth_headers(app, ADMIN, role="admin"))
+    assert response.status_code == 200
+
+    # A fresh login carries the new role and version
+    login = client.post("/api/login", json={"email": f"admin{DEMOTED}@example.com", "password": PASSWORD})
+    assert login.get_json()["user"]["role"] == "user"
+    response = client.get("/api/orders/status-counts",
+                          headers={"Authorization": f"Bearer {login.get_json()['access_token']}"})
+    assert response.status_code == 403
+
+
+def test_revocation_reaches_a_worker_with_a_warm_version_cache(app, client):
+    from authz import token_versions
+
+    seed(app)
+    old_token = auth_headers(app, DEMOTED, role="admin")
+    with app.app_context():
+        assert token_versions.current(DEMOTED) == 0  # versions file read and cached
+
+    # Another worker demotes the user: this one only sees the shared file change
+    with app.app_context():
+        from extensions import db
+        from models import User
+
+        user = db.session.get(User, DEMOTED)
+        user.role, user.token_version = "user", 1
+        db.session.commit()
+        token_versions.set(DEMOTED, 1)
+
+    assert client.get("/api/orders/status-counts", headers=old_token).status_code == 401
@@ -0,0 +1,32 @@
+from conftest import close_app, make_app
+
+
+def seed_catalog(app, name):
+    from extensions import db
+    from models import Product
+
+    with app.app_context():
+        db.session.add_all([
+            Product(name=f"{name} {i}", price=10 + i, stock=5, category="Dairy") for i in range(40)
+        ])
+        db.session.commit()
+
+
+def test_compressed_bodies_are_not_shared_between_apps(tmp_path):
+    import gzip
+
+    bodies = []
+    for name in ("Ghee", "Curd"):
+        folder = tmp_path / name
+        folder.mkdir()
+        app = make_app(str(folder))
+        try:
+            seed_catalog(app, name)
+            # Same query on a fresh state folder: both apps produce catalog-0-<same hash>
+            response = app.test_client().get("/api/products?limit=40", headers={"Accept-Encoding": "gzip"})
+            assert response.headers["Content-Encoding"] == "gzip"
+            bodies.append(gzip.decompress(response.get_data()).decode())
+        finally:
+            close_app(app)
+
+    assert "Ghee 0" in bodies[0] and "Curd 0" in bodies[1]
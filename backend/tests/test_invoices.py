@@ -0,0 +1,97 @@
+import io
+import json
+import os
+import zipfile
+from datetime import datetime
+
+import pytest
+
+from conftest import auth_headers, close_app, make_app
+
+ADMIN = 1
+
+
+def seed_orders(app, count):
+    from extensions import db
+    from models import Order, OrderItem, Product, User
+
+    with app.app_context():
+        db.session.add(User(id=ADMIN, name="Admin", email="admin@example.com", password="x", role="admin"))
+        db.session.add(Product(id=1, name="Ghee", price=500, stock=100, category="Dairy"))
+        for order_id in range(1, count + 1):
+            order = Order(id=order_id, user_id=ADMIN, total_amount=500, status="Delivered",
+                          invoice_no=f"TEST-{order_id}", created_at=datetime.utcnow())
+            order.items = [OrderItem(product_id=1, quantity=1, price=500)]
+            db.session.add(order)
+        db.session.commit()
+
+
+def export_path():
+    today = datetime.utcnow().date()
+    return f"/api/orders/invoices/export?date_from={today}&date_to={today}"
+
+
+@pytest.fixture
+def export_app(tmp_path):
+    app = make_app(str(tmp_path), INVOICE_EXPORT_PROCESSES=2, INVOICE_EXPORT_CONCURRENCY=1)
+    seed_orders(app, 3)
+    yield app
+    close_app(app)
+
+
+# ==========================
+# BULK ZIP EXPORT
+# ==========================
+def test_export_renders_every_invoice_on_the_shared_pool(export_app):
+    from invoices import invoice_exporter
+
+    client = export_app.test_client()
+    headers = auth_headers(export_app, ADMIN, role="admin")
+
+    for _ in range(2):
+        response = client.get(export_path(), headers=headers)
+        assert response.status_code == 200
+        names = zipfile.ZipFile(io.BytesIO(response.get_data())).namelist()
+        response.close()
+        assert sorted(names) == ["TEST-1.pdf", "TEST-2.pdf", "TEST-3.pdf"]
+
+    pool = invoice_exporter._get_pool()
+    assert pool._mp_context.get_start_method() in ("forkserver", "spawn")
+
+
+def test_exports_beyond_the_limit_get_a_503(export_app):
+    client = export_app.test_client()
+    headers = auth_headers(export_app, ADMIN, role="admin")
+
+    running = client.get(export_path(), headers=headers, buffered=False)
+    assert running.status_code == 200
+
+    busy = client.get(export_path(), headers=headers)
+    assert busy.status_code == 503
+
+    running.close()  # ✅ slot freed once the first response is closed
+    again = client.get(export_path(), headers=headers)
+    assert again.status_code == 200
+    again.close()
+
+
+# ==========================
+# PRE-RENDER QUEUE ACROSS WORKERS
+# ==========================
+def test_invoice_queue_adds_up_every_worker(export_app):
+    # A second gunicorn worker's last metrics flush (any live pid will do)
+    other = {
+        "counters": [["desi_invoice_prerender_jobs_total", [["outcome", "submitted"]], 5]],
+        "gauges": [["desi_invoice_prerender_queue_depth", [], 2]],
+        "histograms": [],
+    }
+    with open(os.path.join(export_app.config["METRICS_DIR"], f"{os.getppid()}-1.json"), "w") as fh:
+        json.dump(other, fh)
+
+    response = export_app.test_client().get("/api/orders/invoice-queue",
+                                            headers=auth_headers(export_app, ADMIN, role="admin"))
+    stats = response.get_json()
+
+    assert stats["queue_depth"] == 2 + stats["this_process"]["queue_depth"]
+    assert stats["submitted"] == 5 + stats["this_process"]["submitted"]
+    assert stats["this_process"]["pid"] == os.getpid()
@@ -0,0 +1,108 @@
+from datetime import datetime, timedelta
+
+import offer_cache as offer_cache_module
+from conftest import auth_headers, close_app, make_app, query_count
+from offer_cache import offer_cache
+
+SHOPPER = 1
+
+
+def seed(app, offers, cart=((1, 2),)):
+    from extensions import db
+    from models import Cart, Offer, Product, User
+
+    with app.app_context():
+        db.session.add(User(id=SHOPPER, name="Shopper", email="shopper@example.com", password="x"))
+        db.session.add(Product(id=1, name="Ghee", price=500, stock=10, category="Dairy"))
+        db.session.add_all([Cart(user_id=SHOPPER, product_id=pid, quantity=qty) for pid, qty in cart])
+        db.session.add_all([
+            Offer(title=code, code=code, discount_type="percentage", discount_value=10,
+                  min_amount=0, expiry_date=expiry_date)
+            for code, expiry_date in offers.items()
+        ])
+        db.session.commit()
+
+
+# ==========================
+# APPLY OFFER: SERVER-SIDE TOTAL
+# ==========================
+def test_apply_offer_ignores_a_client_cart_total(app, client):
+    seed(app, {"SAVE10": datetime.utcnow() + timedelta(days=1)})
+
+    response = client.post("/api/apply-offer", json={"code": "save10", "cart_total": 100000},
+                           headers=auth_headers(app, SHOPPER))
+
+    assert response.status_code == 200
+    assert response.get_json() == {"cart_total": 1000.0, "discount": 100.0, "final_amount": 900.0}
+
+
+def test_apply_offer_needs_a_login(app, client):
+    seed(app, {"SAVE10": datetime.utcnow() + timedelta(days=1)})
+
+    response = client.post("/api/apply-offer", json={"code": "SAVE10", "cart_total": 1000})
+
+    assert response.status_code == 401
+
+
+def test_cart_quote_prices_the_saved_cart(app, client):
+    seed(app, {"SAVE10": datetime.utcnow() + timedelta(days=1)})
+
+    quote = client.get("/api/cart/quote?code=SAVE10", headers=auth_headers(app, SHOPPER)).get_json()
+
+    assert (quote["total"], quote["discount"], quote["payable"]) == (1000.0, 100.0, 900.0)
+    assert quote["item_count"] == 2 and quote["offer_error"] is None
+
+
+# ==========================
+# OFFER CACHE: EXPIRY EVICTION
+# ==========================
+class Clock(datetime):
+    now_value = None
+
+    @classmethod
+    def utcnow(cls):
+        return cls.now_value
+
+
+def test_cached_offer_is_evicted_at_its_expiry_date(app, client, monkeypatch):
+    start = datetime.utcnow()
+    seed(app, {"FLASH": start + timedelta(hours=1)})
+    monkeypatch.setattr(offer_cache_module, "datetime", Clock)
+    headers = auth_headers(app, SHOPPER)
+
+    Clock.now_value = start
+    first = client.get("/api/cart/quote?code=FLASH", headers=headers)
+    assert first.get_json()["payable"] == 900.0
+    assert query_count(first) == 2  # cart + offer lookup
+
+    Clock.now_value = start + timedelta(minutes=59)
+    cached = client.get("/api/cart/quote?code=FLASH", headers=headers)
+    assert cached.get_json()["payable"] == 900.0
+    assert query_count(cached) == 1  # offer served from the cache
+    assert "FLASH" in offer_cache._entries
+
+    Clock.now_value = start + timedelta(hours=1, seconds=1)
+    expired = client.get("/api/cart/quote?code=FLASH", headers=headers)
+    assert expired.get_json()["offer_error"] == "Offer expired"
+    assert expired.get_json()["payable"] == 1000.0
+    assert query_count(expired) == 2  # entry dropped at expiry, reloaded once
+
+    # Reloaded past its expiry: cached without a deadline, still expired
+    again = client.get("/api/cart/quote?code=FLASH", headers=headers)
+    assert again.get_json()["offer_error"] == "Offer expired"
+    assert query_count(again) == 1
+
+
+def test_offer_cache_keeps_only_the_most_recent_codes(tmp_path):
+    app = make_app(str(tmp_path), OFFER_CACHE_SIZE=2)
+    try:
+        tomorrow = datetime.utcnow() + timedelta(days=1)
+        seed(app, {"ONE": tomorrow, "TWO": tomorrow, "THREE": tomorrow})
+        client, headers = app.test_client(), auth_headers(app, SHOPPER)
+
+        for code in ("ONE", "TWO", "ONE", "THREE"):
+            client.get(f"/api/cart/quote?code={code}", headers=headers)
+
+        assert list(offer_cache._entries) == ["ONE", "THREE"]  # TWO was least recently used
+    finally:
+        close_app(app)
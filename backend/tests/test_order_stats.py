@@ -0,0 +1,106 @@
+from conftest import after_load, auth_headers, in_other_thread
+
+ADMIN = 1
+SHOPPERS = (2, 3, 4)
+
+
+def seed(app):
+    from extensions import db
+    from models import Cart, Product, User
+
+    with app.app_context():
+        db.session.add(User(id=ADMIN, name="Admin", email="admin@example.com", password="x", role="admin"))
+        db.session.add_all([
+            User(id=uid, name=f"Shopper {uid}", email=f"shopper{uid}@example.com", password="x")
+            for uid in SHOPPERS
+        ])
+        db.session.add_all([
+            Product(id=pid, name=f"Product {pid}", price=10 * pid, stock=100, category="Dairy")
+            for pid in (1, 2)
+        ])
+        db.session.add_all([
+            Cart(user_id=uid, product_id=pid, quantity=uid)
+            for uid in SHOPPERS for pid in (1, 2)
+        ])
+        db.session.commit()
+
+
+def place_orders(app, client):
+    order_ids = []
+    for uid in SHOPPERS:
+        response = client.post("/api/orders/place", json={}, headers=auth_headers(app, uid))
+        assert response.status_code == 201
+        order_ids.append(response.get_json()["order_id"])
+    return order_ids
+
+
+def set_status(app, client, order_id, status):
+    return client.put(f"/api/orders/{order_id}/status", json={"status": status},
+                      headers=auth_headers(app, ADMIN, "admin"))
+
+
+def rollup(app):
+    from extensions import db
+    from models import OrderDailyStat
+
+    with app.app_context():
+        rows = db.session.query(OrderDailyStat).filter(OrderDailyStat.orders != 0).all()
+        return sorted((r.day, r.status, r.orders, round(r.revenue, 2), r.items) for r in rows)
+
+
+def rebuilt(app):
+    from order_stats import rebuild_order_stats
+
+    with app.app_context():
+        rebuild_order_stats()
+    return rollup(app)
+
+
+# ==========================
+# INCREMENTAL ROLLUP == FULL REBUILD
+# ==========================
+def test_rollup_follows_the_order_lifecycle(app, client):
+    seed(app)
+    first, second, third = place_orders(app, client)
+
+    assert set_status(app, client, first, "Shipped").status_code == 200
+    assert set_status(app, client, first, "Delivered").status_code == 200
+    assert set_status(app, client, second, "Pending").status_code == 200  # no-op change
+    assert client.delete(f"/api/orders/{third}/cancel", headers=auth_headers(app, SHOPPERS[2])).status_code == 200
+
+    incremental = rollup(app)
+    assert {status: orders for _, status, orders, _, _ in incremental} == \
+        {"Delivered": 1, "Pending": 1, "Cancelled": 1}
+    assert incremental == rebuilt(app)
+
+
+def test_conflicting_status_changes_keep_the_rollup_exact(app, client, monkeypatch):
+    seed(app)
+    order_id = place_orders(app, client)[0]
+
+    # Admin B ships the order after admin A has read it as Pending
+    competing = []
+    after_load(monkeypatch, lambda: competing.append(
+        in_other_thread(lambda: set_status(app, app.test_client(), order_id, "Shipped"))))
+
+    response = set_status(app, client, order_id, "Delivered")
+
+    assert competing[0].status_code == 200
+    assert response.status_code == 409
+    assert client.get("/api/orders", headers=auth_headers(app, SHOPPERS[0])).get_json()[0]["status"] == "Shipped"
+    assert rollup(app) == rebuilt(app)
+
+
+def test_cancel_racing_a_status_change_keeps_the_rollup_exact(app, client, monkeypatch):
+    seed(app)
+    order_id = place_orders(app, client)[0]
+
+    competing = []
+    after_load(monkeypatch, lambda: competing.append(
+        in_other_thread(lambda: set_status(app, app.test_client(), order_id, "Confirmed"))))
+
+    response = client.delete(f"/api/orders/{order_id}/cancel", headers=auth_headers(app, SHOPPERS[0]))
+
+    assert competing[0].status_code == 200
+    assert response.status_code == 409
+    assert rollup(app) == rebuilt(app)
@@ -0,0 +1,110 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+
+from conftest import after_load, auth_headers, other_worker
+
+SHOPPER = 1
+
+
+def seed(app, stocks, cart=(), pending=()):
+    from extensions import db
+    from models import Cart, Order, OrderItem, Product, User
+
+    with app.app_context():
+        db.session.add(User(id=SHOPPER, name="Shopper", email="shopper@example.com", password="x"))
+        db.session.add_all([
+            Product(id=pid, name=f"Product {pid}", price=10, stock=stock, category="Dairy")
+            for pid, stock in stocks.items()
+        ])
+        db.session.add_all([Cart(user_id=SHOPPER, product_id=pid, quantity=qty) for pid, qty in cart])
+        if pending:
+            order = Order(id=1, user_id=SHOPPER, total_amount=0, status="Pending", invoice_no="TEST-1",
+                          created_at=datetime.utcnow())
+            order.items = [OrderItem(product_id=pid, quantity=qty, price=10) for pid, qty in pending]
+            db.session.add(order)
+        db.session.commit()
+
+
+def stock(app, product_id):
+    from extensions import db
+    from models import Product
+
+    with app.app_context():
+        return db.session.get(Product, product_id).stock
+
+
+# ==========================
+# PLACE ORDER: ATOMIC RESERVATION
+# ==========================
+def test_failed_reservation_rolls_back_every_line(app, client):
+    from extensions import db
+
+    seed(app, {1: 10, 2: 10}, cart=[(1, 2), (2, 3)])
+
+    # Product 2 sells out between the early stock check and the reservation
+    fired = []
+
+    def sell_out(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("UPDATE products SET stock") and not fired:
+            fired.append(True)
+            other_worker(app, "UPDATE products SET stock = 1 WHERE id = 2")
+
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", sell_out)
+
+    response = client.post("/api/orders/place", json={}, headers=auth_headers(app, SHOPPER))
+
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "Only 1 left for Product 2"
+    assert (stock(app, 1), stock(app, 2)) == (10, 1)
+    assert client.get("/api/orders", headers=auth_headers(app, SHOPPER)).get_json() == []
+    assert len(client.get("/api/cart", headers=auth_headers(app, SHOPPER)).get_json()["items"]) == 2
+
+
+def test_reservation_never_oversells(app, client):
+    seed(app, {1: 3}, cart=[(1, 2)])
+    headers = auth_headers(app, SHOPPER)
+
+    assert client.post("/api/orders/place", json={}, headers=headers).status_code == 201
+    client.post("/api/cart/add", json={"product_id": 1, "quantity": 2}, headers=headers)
+    assert client.post("/api/orders/place", json={}, headers=headers).status_code == 400
+    assert stock(app, 1) == 1
+
+
+# ==========================
+# CANCEL ORDER
+# ==========================
+def test_cancel_keeps_stock_reserved_meanwhile(app, client, monkeypatch):
+    seed(app, {1: 10}, pending=[(1, 2)])
+    after_load(monkeypatch, lambda: other_worker(
+        app, "UPDATE products SET stock = stock - 5 WHERE id = 1 AND stock >= 5"))
+
+    response = client.delete("/api/orders/1/cancel", headers=auth_headers(app, SHOPPER))
+
+    assert response.status_code == 200
+    assert stock(app, 1) == 10 - 5 + 2
+
+
+def test_concurrent_cancel_restocks_once(app, client, monkeypatch):
+    seed(app, {1: 10}, pending=[(1, 2)])
+    # The other cancel wins the race (and restocks) after this one read "Pending"
+    after_load(monkeypatch, lambda: other_worker(
+        app, "UPDATE orders SET status = 'Cancelled' WHERE id = 1"))
+
+    response = client.delete("/api/orders/1/cancel", headers=auth_headers(app, SHOPPER))
+
+    assert response.status_code == 409
+    assert stock(app, 1) == 10
+
+
+@pytest.mark.parametrize("status", ["Confirmed", "Cancelled"])
+def test_only_pending_orders_can_be_cancelled(app, client, status):
+    seed(app, {1: 10}, pending=[(1, 2)])
+    other_worker(app, "UPDATE orders SET status = ? WHERE id = 1", status)
+
+    response = client.delete("/api/orders/1/cancel", headers=auth_headers(app, SHOPPER))
+
+    assert response.status_code == 400
+    assert stock(app, 1) == 10
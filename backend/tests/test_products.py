@@ -0,0 +1,78 @@
+import base64
+import json
+
+import pytest
+
+PRICES = [50, 20, 50, 80, 20, 50, 10]  # ties, so the id tiebreak matters
+
+
+def seed(app):
+    from extensions import db
+    from models import Product
+
+    with app.app_context():
+        db.session.add_all([
+            Product(id=pid, name=f"Product {chr(ord('G') - pid)}", price=price, stock=5, category="Dairy")
+            for pid, price in enumerate(PRICES, start=1)
+        ])
+        db.session.commit()
+
+
+def raw_cursor(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip("=")
+
+
+def all_pages(client, sort, limit=2):
+    ids, cursor = [], None
+    while True:
+        url = f"/api/products?limit={limit}&sort={sort}" + (f"&cursor={cursor}" if cursor else "")
+        page = client.get(url).get_json()
+        ids += [product["id"] for product in page["products"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return ids
+
+
+# ==========================
+# KEYSET PAGINATION
+# ==========================
+@pytest.mark.parametrize("sort, key", [
+    ("id", lambda pid: pid),
+    ("-id", lambda pid: -pid),
+    ("price", lambda pid: (PRICES[pid - 1], pid)),
+    ("-price", lambda pid: (-PRICES[pid - 1], -pid)),
+    ("name", lambda pid: (chr(ord("G") - pid), pid)),
+])
+def test_pages_walk_the_whole_catalog_in_order(app, client, sort, key):
+    seed(app)
+    product_ids = range(1, len(PRICES) + 1)
+
+    assert all_pages(client, sort) == sorted(product_ids, key=key)
+
+
+@pytest.mark.parametrize("cursor", [
+    "not-base64!",
+    raw_cursor({"price": 50}),           # not a [value, id] pair
+    raw_cursor([50, 3, 1]),
+    raw_cursor([None, 3]),                # would compare against NULL
+    raw_cursor(["fifty", 3]),             # text for a numeric column
+    raw_cursor([{"x": 1}, 3]),
+    raw_cursor([50, True]),
+    raw_cursor([50, 2 ** 63]),            # id outside SQLite's integer range
+    raw_cursor([float("inf"), 3]),        # json.loads accepts Infinity
+])
+def test_malformed_cursors_are_rejected(app, client, cursor):
+    seed(app)
+
+    response = client.get(f"/api/products?limit=2&sort=price&cursor={cursor}")
+
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Invalid cursor"}
+
+
+def test_name_cursor_needs_a_text_value(app, client):
+    seed(app)
+
+    response = client.get(f"/api/products?limit=2&sort=name&cursor={raw_cursor([5, 3])}")
+
+    assert response.status_code == 400
@@ -0,0 +1,170 @@
+import importlib.util
+import json
+import os
+
+import pytest
+from sqlalchemy import text
+
+from authz import token_versions
+from conftest import close_app, make_app, query_count
+from extensions import db
+from query_audit import QueryBudgetExceeded, query_budget
+
+BENCH_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bench", "endpoints.py")
+
+
+def load_bench():
+    spec = importlib.util.spec_from_file_location("bench_endpoints", BENCH_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+bench = load_bench()
+CASES = bench.build_cases()
+SCALE = {"products": 30, "users": 10, "orders": 60}
+CALLS = 2
+
+# Query inside the streamed body, after the audit has closed the request
+STREAMED = {"orders.export_invoices", "orders.export_orders"}
+
+
+# ==========================
+# EVERY ROUTE WITHIN BUDGET
+# ==========================
+# Reuses the endpoint benchmark's seed data and cases, so one case per route
+# is kept in one place. QUERY_AUDIT_STRICT turns a broken @query_budget into
+# QueryBudgetExceeded, which the test client re-raises.
+@pytest.fixture(scope="module")
+def bench_context(tmp_path_factory):
+    app = make_app(str(tmp_path_factory.mktemp("budgets")), QUERY_AUDIT_STRICT=True)
+    bench.seed(app, SCALE["products"], SCALE["users"], SCALE["orders"], buyers=CALLS)
+    with app.app_context():
+        token_versions.rebuild()  # ✅ one-off per instance folder, not part of any route's budget
+    yield bench.Context(app, SCALE)
+    close_app(app)
+
+
+def test_every_blueprint_route_has_a_budget_and_a_case(bench_context):
+    app = bench_context.app
+    covered = {case.endpoint for case in CASES}
+    for rule in app.url_map.iter_rules():
+        if "." not in rule.endpoint or rule.endpoint in STREAMED:
+            continue  # app-level routes (home, uploads, metrics) are not in routes/*.py
+        assert getattr(app.view_functions[rule.endpoint], "query_budget", None) is not None, \
+            f"{rule.endpoint} has no @query_budget"
+        assert rule.endpoint in covered, f"{rule.endpoint} has no case in bench/endpoints.py"
+
+
+@pytest.mark.parametrize("case", CASES, ids=[case.name for case in CASES])
+def test_route_stays_within_query_budget(bench_context, case):
+    if case.name == "admin.stock_forecast_run":
+        pytest.importorskip("numpy")
+
+    budget = getattr(bench_context.app.view_functions[case.endpoint], "query_budget", None)
+    for i in range(CALLS):
+        if case.setup:
+            case.setup(bench_context, i)
+        method, path, kwargs = case.request(bench_context, i)
+        response = bench_context.client.open(path, method=method, **kwargs)
+        count = query_count(response)
+        response.close()
+        if budget is not None:
+            assert count <= budget
+
+
+# ==========================
+# THE AUDIT ITSELF
+# ==========================
+def over_budget_app(folder, strict):
+    app = make_app(folder, QUERY_AUDIT_STRICT=strict)
+
+    @app.route("/over-budget")
+    @query_budget(1)
+    def over_budget():
+        for _ in range(3):
+            db.session.execute(text("SELECT 1"))
+        return "ok"
+
+    return app
+
+
+def last_report(app):
+    with open(app.config["QUERY_AUDIT_LOG"]) as fh:
+        return json.loads(fh.readlines()[-1])
+
+
+def test_strict_mode_fails_a_request_over_its_budget(tmp_path):
+    app = over_budget_app(str(tmp_path), strict=True)
+    try:
+        with pytest.raises(QueryBudgetExceeded):
+            app.test_client().get("/over-budget")
+
+        report = last_report(app)
+        assert report["over_budget"] and report["queries"] == 3 and report["budget"] == 1
+        assert [group["count"] for group in report["repeated"]] == [3]
+        assert any(site.startswith("tests/test_query_budgets.py:")
+                   for site in report["repeated"][0]["sites"])
+    finally:
+        close_app(app)
+
+
+def test_report_only_mode_lets_the_request_through(tmp_path):
+    app = over_budget_app(str(tmp_path), strict=False)
+    try:
+        response = app.test_client().get("/over-budget")
+        assert response.status_code == 200 and response.headers["X-Query-Count"] == "3"
+        assert last_report(app)["over_budget"]
+    finally:
+        close_app(app)
+
+
+# ==========================
+# CONDITIONAL QUERIES
+# ==========================
+def test_login_rehashing_a_legacy_hash_stays_within_budget(tmp_path):
+    from werkzeug.security import generate_password_hash
+
+    from models import User
+
+    app = make_app(str(tmp_path), QUERY_AUDIT_STRICT=True)
+    try:
+        with app.app_context():
+            db.session.add(User(name="Old", email="old@example.com", role="user",
+                                password=generate_password_hash("Secret@123", method="pbkdf2:sha256:500")))
+            db.session.commit()
+
+        response = app.test_client().post("/api/login", json={"email": "old@example.com",
+                                                               "password": "Secret@123"})
+        assert query_count(response) == 2  # user lookup + rehash UPDATE
+
+        with app.app_context():
+            stored = db.session.query(User.password).filter_by(email="old@example.com").scalar()
+        assert stored.startswith("pbkdf2:sha256:1000$")
+    finally:
+        close_app(app)
+
+
+def test_admin_token_without_role_claim_counts_its_lookup(tmp_path):
+    from flask_jwt_extended import create_access_token
+
+    from models import User
+
+    app = make_app(str(tmp_path), QUERY_AUDIT_STRICT=True)
+    try:
+        with app.app_context():
+            admin = User(name="Admin", email="admin@example.com", password="x", role="admin")
+            db.session.add(admin)
+            db.session.commit()
+            token_versions.rebuild()
+            legacy = create_access_token(identity=str(admin.id))  # no "role" / "tv" claims
+            current = create_access_token(identity=str(admin.id), additional_claims={"role": "admin", "tv": 0})
+
+        client = app.test_client()
+        response = client.get("/api/orders/status-counts", headers={"Authorization": f"Bearer {legacy}"})
+        assert query_count(response) == 2  # budget 1 + the guard's user lookup
+
+        response = client.get("/api/orders/status-counts", headers={"Authorization": f"Bearer {current}"})
+        assert query_count(response) == 1
+    finally:
+        close_app(app)
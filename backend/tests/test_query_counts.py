@@ -0,0 +1,72 @@
+from datetime import datetime
+
+import pytest
+
+from conftest import auth_headers, close_app, make_app, query_count
+
+SHOPPER, ADMIN = 1, 2
+
+BILLING = {"customer_name": "Shopper", "phone": "9876543210", "address": "12 Mandi Road",
+           "city": "Pune", "pincode": "411001"}
+
+
+def seed(app, lines):
+    from extensions import db
+    from models import Cart, Order, OrderItem, Product, User, Wishlist
+
+    with app.app_context():
+        db.session.add_all([
+            User(id=SHOPPER, name="Shopper", email="shopper@example.com", password="x"),
+            User(id=ADMIN, name="Admin", email="admin@example.com", password="x", role="admin"),
+        ])
+        db.session.add_all([
+            Product(id=i, name=f"Product {i}", price=10 * i, stock=100, category="Dairy")
+            for i in range(1, lines + 1)
+        ])
+        db.session.add_all([Cart(user_id=SHOPPER, product_id=i, quantity=1) for i in range(1, lines + 1)])
+        db.session.add_all([Wishlist(user_id=SHOPPER, product_id=i) for i in range(1, lines + 1)])
+
+        order = Order(id=1, user_id=SHOPPER, total_amount=0, status="Pending", invoice_no="TEST-1",
+                      created_at=datetime.utcnow(), **BILLING)
+        order.items = [OrderItem(product_id=i, quantity=1, price=10 * i) for i in range(1, lines + 1)]
+        db.session.add(order)
+        db.session.commit()
+
+
+# ==========================
+# N+1 GUARD
+# ==========================
+# Each route runs against a 1-line and a 12-line cart / wishlist / order.
+# A per-row lookup shows up as a higher query count for the larger one.
+@pytest.mark.parametrize("method, path, user", [
+    ("GET", "/api/products?limit=24", None),
+    ("GET", "/api/cart", SHOPPER),
+    ("GET", "/api/cart/quote", SHOPPER),
+    ("GET", "/api/wishlist/", SHOPPER),
+    ("GET", "/api/orders", SHOPPER),
+    ("GET", "/api/orders/1", SHOPPER),
+    ("GET", "/api/orders/1/invoice", SHOPPER),
+    ("GET", "/api/orders/all", ADMIN),
+    ("POST", "/api/orders/place", SHOPPER),
+    ("DELETE", "/api/orders/1/cancel", SHOPPER),
+])
+def test_query_count_does_not_grow_with_rows(tmp_path, method, path, user):
+    counts = []
+    for lines in (1, 12):
+        folder = tmp_path / str(lines)
+        folder.mkdir()
+        app = make_app(str(folder))
+        try:
+            seed(app, lines)
+            headers = auth_headers(app, user, "admin" if user == ADMIN else "user") if user else {}
+            body = BILLING if method == "POST" else None
+            counts.append(query_count(app.test_client().open(path, method=method, headers=headers, json=body)))
+        finally:
+            close_app(app)
+
+    assert counts[0] == counts[1], f"{method} {path}: {counts[0]} queries for 1 row, {counts[1]} for 12"
+
+
+def test_cart_is_one_query(app, client):
+    seed(app, 30)
+    assert query_count(client.get("/api/cart", headers=auth_headers(app, SHOPPER))) == 1
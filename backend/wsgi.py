@@ -0,0 +1,7 @@
+from app import create_app
+
+# ==========================
+# WSGI ENTRY POINT
+# ==========================
+#   gunicorn wsgi:app
+app = create_app()
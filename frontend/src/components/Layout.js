@@ -31,12 +31,15 @@ export default function Layout({ children }) {
     }
   }, []);
 
+  const countCart = (cart) => {
+    const items = cart?.items || [];
+    setCartCount(items.reduce((sum, it) => sum + Number(it.quantity || 1), 0));
+  };
+
   const fetchCart = async () => {
     try {
       const res = await API.get("/cart");
-      const items = res.data?.items || [];
-      const count = items.reduce((sum, it) => sum + Number(it.quantity || 1), 0);
-      setCartCount(count);
+      countCart(res.data);
     } catch {
       setCartCount(0);
     }
@@ -74,7 +77,8 @@ const fetchWishlist = async () => {
     fetchCart();
     fetchWishlist();
 
-    const onCartUpdated = () => fetchCart();
+    // ✅ Cart mutations send the new cart along; only refetch when they don't
+    const onCartUpdated = (e) => (e.detail ? countCart(e.detail) : fetchCart());
     const onWishlistUpdated = () => fetchWishlist();
 
     window.addEventListener("cart-updated", onCartUpdated);
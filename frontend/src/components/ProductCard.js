@@ -1,7 +1,7 @@
 import { useState } from "react";
 import API from "../services/api";
 
-export default function ProductCard({ product, onAddToCart, onAddToWishlist }) {
+export default function ProductCard({ product, wishlisted, onAddToCart, onAddToWishlist }) {
   const [cartLoading, setCartLoading] = useState(false);
   const [wishlistLoading, setWishlistLoading] = useState(false);
   const [quantity, setQuantity] = useState(1);
@@ -90,12 +90,26 @@ export default function ProductCard({ product, onAddToCart, onAddToWishlist }) {
             opacity: wishlistLoading ? 0.6 : 1,
             cursor: wishlistLoading ? "not-allowed" : "pointer",
           }}
-          title="Add to wishlist"
+          title={wishlisted ? "In your wishlist" : "Add to wishlist"}
         >
-          {wishlistLoading ? "…" : "❤️"}
+          {/* wishlisted is only known on grids that looked it up */}
+          {wishlistLoading ? "…" : wishlisted === false ? "🤍" : "❤️"}
         </button>
 
-        {product.image ? (
+        {product.images ? (
+  <picture>
+    <source
+      type="image/webp"
+      srcSet={`${process.env.REACT_APP_API_URL}${product.images.card.webp}`}
+    />
+    <img
+      src={`${process.env.REACT_APP_API_URL}${product.images.card.jpeg}`}
+      alt={product.name}
+      loading="lazy"
+      style={styles.image}
+    />
+  </picture>
+        ) : product.image ? (
   <img
     src={`${process.env.REACT_APP_API_URL}${product.image}`}
     alt={product.name}
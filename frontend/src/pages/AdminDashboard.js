@@ -2,12 +2,15 @@ import { useEffect, useMemo, useRef, useState } from "react";
 import API from "../services/api";
 
 const API_URL = process.env.REACT_APP_API_URL;
+const ORDERS_PAGE_SIZE = 50;
 
 export default function AdminDashboard() {
   const [activeTab, setActiveTab] = useState("products"); // "products" | "orders"
 
   const [products, setProducts] = useState([]);
   const [orders, setOrders] = useState([]);
+  const [ordersCursor, setOrdersCursor] = useState(null);
+  const [orderCounts, setOrderCounts] = useState({ counts: {}, revenue: {}, total: 0 });
   const [editingId, setEditingId] = useState(null);
 
   const [loadingProducts, setLoadingProducts] = useState(true);
@@ -34,10 +37,16 @@ export default function AdminDashboard() {
 
   useEffect(() => {
     fetchProducts();
-    fetchOrders();
+    fetchOrderCounts();
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, []);
 
+  // ✅ Status filter runs on the server
+  useEffect(() => {
+    fetchOrders();
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [orderStatusFilter]);
+
   /* ---------------- FETCH ---------------- */
 
   const normalizeProducts = (data) => {
@@ -60,12 +69,20 @@ export default function AdminDashboard() {
     }
   };
 
-  const fetchOrders = async () => {
+  const fetchOrders = async (cursor = null) => {
     try {
       setErr("");
       setLoadingOrders(true);
-      const res = await API.get("/orders/all");
-      setOrders(Array.isArray(res.data) ? res.data : []);
+      const res = await API.get("/orders/all", {
+        params: {
+          limit: ORDERS_PAGE_SIZE,
+          ...(orderStatusFilter && { status: orderStatusFilter }),
+          ...(cursor && { cursor }),
+        },
+      });
+      const page = Array.isArray(res.data?.orders) ? res.data.orders : [];
+      setOrders((prev) => (cursor ? [...prev, ...page] : page));
+      setOrdersCursor(res.data?.next_cursor || null);
     } catch (e) {
       console.error(e);
       setErr(e.response?.data?.message || e.response?.data?.error || "Failed to load orders");
@@ -74,6 +91,25 @@ export default function AdminDashboard() {
     }
   };
 
+  const fetchOrderCounts = async () => {
+    try {
+      // ✅ Daily rollup on the server: cost grows with days, not orders
+      const res = await API.get("/admin/stats");
+      setOrderCounts({
+        counts: res.data?.counts || {},
+        revenue: res.data?.revenue || {},
+        total: res.data?.total || 0,
+      });
+    } catch (e) {
+      console.error(e);
+    }
+  };
+
+  const refreshOrders = () => {
+    fetchOrders();
+    fetchOrderCounts();
+  };
+
   /* ---------------- FORM ---------------- */
 
   const calculateFinalPrice = (originalPrice, discountPercent) => {
@@ -209,6 +245,7 @@ export default function AdminDashboard() {
     try {
       await API.put(`/orders/${id}/status`, { status });
       setOrders((prev) => prev.map((o) => (o.id === id ? { ...o, status } : o)));
+      fetchOrderCounts();
     } catch (e) {
       console.error(e);
       alert(e.response?.data?.message || e.response?.data?.error || "Failed to update order status");
@@ -240,18 +277,14 @@ export default function AdminDashboard() {
     return products.filter((p) => (p.name || "").toLowerCase().includes(q));
   }, [products, productQuery]);
 
-  const filteredOrders = useMemo(() => {
-    if (!orderStatusFilter) return orders;
-    return orders.filter((o) => o.status === orderStatusFilter);
-  }, [orders, orderStatusFilter]);
-
+  // ✅ KPIs come from the /admin/stats rollup, not from loaded pages
   const stats = useMemo(() => {
-    const totalOrders = orders.length;
-    const pending = orders.filter((o) => o.status === "Pending").length;
-    const delivered = orders.filter((o) => o.status === "Delivered").length;
-    const revenue = orders.reduce((sum, o) => sum + Number(o.total || 0), 0);
-    return { products: products.length, totalOrders, pending, delivered, revenue };
-  }, [products.length, orders]);
+    const { counts, revenue: revenueByStatus, total } = orderCounts;
+    const pending = counts.Pending || 0;
+    const delivered = counts.Delivered || 0;
+    const revenue = Object.values(revenueByStatus).reduce((sum, r) => sum + Number(r || 0), 0);
+    return { products: products.length, totalOrders: total, pending, delivered, revenue };
+  }, [products.length, orderCounts]);
 
   const imagePreview = useMemo(() => {
     if (!formData.image) return null;
@@ -273,7 +306,7 @@ export default function AdminDashboard() {
   /* ---------------- UI ---------------- */
 
   
-  const ordersBusy = loadingOrders;
+  const ordersBusy = loadingOrders && orders.length === 0;
 
   return (
     <div style={ui.app}>
@@ -306,7 +339,7 @@ export default function AdminDashboard() {
           <button style={ui.secondaryBtn} onClick={fetchProducts} disabled={loadingProducts}>
             {loadingProducts ? "Loading…" : "Refresh Products"}
           </button>
-          <button style={ui.secondaryBtn} onClick={fetchOrders} disabled={loadingOrders}>
+          <button style={ui.secondaryBtn} onClick={refreshOrders} disabled={loadingOrders}>
             {loadingOrders ? "Loading…" : "Refresh Orders"}
           </button>
         </div>
@@ -447,7 +480,7 @@ export default function AdminDashboard() {
               <div style={{ display: "flex", flexDirection: "column", gap: 2 }}>
                 <div style={ui.cardTitle}>Orders</div>
                 <div style={ui.cardSub}>
-                  {loadingOrders ? "Loading…" : `${orders.length} total orders`}
+                  {loadingOrders ? "Loading…" : `${orders.length} of ${stats.totalOrders} orders`}
                 </div>
               </div>
 
@@ -469,7 +502,7 @@ export default function AdminDashboard() {
 
             {ordersBusy ? (
               <div style={ui.empty}>Loading orders…</div>
-            ) : filteredOrders.length === 0 ? (
+            ) : orders.length === 0 ? (
               <div style={ui.empty}>No orders found.</div>
             ) : (
               <div style={ui.table}>
@@ -481,7 +514,7 @@ export default function AdminDashboard() {
                   <div style={ui.th}>Change</div>
                 </div>
 
-                {filteredOrders.map((o) => {
+                {orders.map((o) => {
                   const meta = statusMeta(o.status);
                   return (
                     <div key={o.id} style={ui.tableRowOrders}>
@@ -519,6 +552,16 @@ export default function AdminDashboard() {
                     </div>
                   );
                 })}
+
+                {ordersCursor && (
+                  <button
+                    style={ui.secondaryBtn}
+                    onClick={() => fetchOrders(ordersCursor)}
+                    disabled={loadingOrders}
+                  >
+                    {loadingOrders ? "Loading…" : "Load more"}
+                  </button>
+                )}
               </div>
             )}
           </section>
@@ -1,4 +1,4 @@
-import React, { useEffect, useMemo, useState } from "react";
+import React, { useEffect, useMemo, useRef, useState } from "react";
 import API from "../services/api";
 import upiQr from "../assets/upi_qr.png";
 
@@ -15,6 +15,9 @@ export default function Cart() {
   const [discount, setDiscount] = useState(0);
   const [finalTotal, setFinalTotal] = useState(0);
   const [couponError, setCouponError] = useState("");
+  const [warnings, setWarnings] = useState([]);
+  // ✅ Code of the applied coupon, re-quoted whenever the cart changes
+  const appliedCode = useRef("");
 
   const [billing, setBilling] = useState({
     billing_name: "",
@@ -49,15 +52,32 @@ export default function Cart() {
   const wishlistCount = useMemo(() => wishlistItems.length, [wishlistItems]);
 
   /* ================= FETCH CART ================= */
+  // GET /cart/quote: lines, totals, stock warnings and the coupon in one call
+  const applyQuote = (data) => {
+    setCart({ items: data.items || [], total: data.total || 0 });
+    setWarnings(data.warnings || []);
+
+    if (data.offer_error) {
+      appliedCode.current = "";
+      setCouponError(data.offer_error);
+    }
+    setDiscount(data.discount || 0);
+    setFinalTotal(data.payable ?? data.total ?? 0);
+  };
+
+  // ✅ Cart mutations return the updated cart; share it instead of re-fetching
+  const announceCart = (snapshot) =>
+    window.dispatchEvent(new CustomEvent("cart-updated", { detail: snapshot }));
+
   const fetchCart = async () => {
     try {
-      const res = await API.get("/cart");
-      const data = res.data || { items: [], total: 0 };
-      setCart(data);
-      if (!coupon || discount === 0) setFinalTotal(data.total);
+      const code = appliedCode.current;
+      const res = await API.get("/cart/quote", { params: code ? { code } : {} });
+      applyQuote(res.data || { items: [], total: 0 });
     } catch (err) {
       console.error("Cart fetch error:", err);
       setCart({ items: [], total: 0 });
+      setWarnings([]);
     } finally {
       setLoading(false);
     }
@@ -81,6 +101,7 @@ export default function Cart() {
     fetchCart();
     fetchWishlist();
 
+    // Snapshots from other pages carry no warnings / coupon: re-quote
     const onCartUpdated = () => fetchCart();
     const onWishlistUpdated = () => fetchWishlist();
 
@@ -97,9 +118,8 @@ export default function Cart() {
   /* ================= REMOVE ITEM FROM CART ================= */
   const removeItem = async (id) => {
     try {
-      await API.delete(`/cart/remove/${id}`);
-      await fetchCart();
-      window.dispatchEvent(new Event("cart-updated"));
+      const res = await API.delete(`/cart/remove/${id}`);
+      announceCart(res.data.cart);
     } catch (err) {
       console.error("Remove error:", err);
       alert("Failed to remove item");
@@ -112,25 +132,8 @@ export default function Cart() {
 
     try {
       setQtyLoadingId(itemId);
-      await API.put(`/cart/item/${itemId}`, { quantity: newQty });
-
-      setCart((prev) => {
-        const items = prev.items.map((it) => {
-          if (it.id !== itemId) return it;
-          return { ...it, quantity: newQty, subtotal: Number(it.price) * newQty };
-        });
-
-        const total = items.reduce((sum, it) => sum + Number(it.subtotal || 0), 0);
-
-        setDiscount(0);
-        setCoupon("");
-        setCouponError("");
-        setFinalTotal(total);
-
-        return { items, total };
-      });
-
-      window.dispatchEvent(new Event("cart-updated"));
+      const res = await API.put(`/cart/item/${itemId}`, { quantity: newQty });
+      announceCart(res.data.cart);
     } catch (err) {
       console.error("Qty update error:", err);
       alert(err.response?.data?.error || "Failed to update quantity");
@@ -175,16 +178,17 @@ export default function Cart() {
 
   /* ================= APPLY COUPON ================= */
   const applyCoupon = async () => {
+    const code = coupon.trim();
+    if (!code) return;
+
     try {
       setCouponError("");
-      const res = await API.post("/apply-offer", {
-        code: coupon,
-        cart_total: cart.total,
-      });
-
-      setDiscount(res.data.discount || 0);
-      setFinalTotal(res.data.final_amount || cart.total);
+      // Total is computed server-side from the saved cart
+      appliedCode.current = code;
+      const res = await API.get("/cart/quote", { params: { code } });
+      applyQuote(res.data);
     } catch (err) {
+      appliedCode.current = "";
       setCouponError(err.response?.data?.error || "Invalid coupon");
       setDiscount(0);
       setFinalTotal(cart.total);
@@ -203,19 +207,19 @@ export default function Cart() {
         ...billing,
         total_amount: payableAmount,
         discount_applied: discount,
-        coupon_code: coupon || null,
+        coupon_code: appliedCode.current || null,
       });
 
       setOrderId(res.data.order_id);
       alert("🎉 Order placed successfully!");
 
+      appliedCode.current = "";
       setCoupon("");
       setDiscount(0);
       setCouponError("");
       setCheckoutStep(billing.payment_method === "Online" ? "upi" : "cart");
 
-      await fetchCart();
-      window.dispatchEvent(new Event("cart-updated"));
+      announceCart({ items: [], total: 0 }); // order placement empties the cart
     } catch (err) {
       console.error(err);
       alert(err.response?.data?.error || "❌ Failed to place order");
@@ -246,9 +250,8 @@ export default function Cart() {
   const addWishlistToCart = async (product_id) => {
     try {
       setWishBusyId(product_id);
-      await API.post("/cart/add", { product_id, quantity: 1 }); // ✅ same as Wishlist page
-      window.dispatchEvent(new Event("cart-updated"));
-      await fetchCart();
+      const res = await API.post("/cart/add", { product_id, quantity: 1 }); // ✅ same as Wishlist page
+      announceCart(res.data.cart);
       alert("Added to cart 🛒");
     } catch (err) {
       console.error("Add to cart error:", err);
@@ -301,6 +304,15 @@ export default function Cart() {
           </div>
         ) : (
           <>
+            {/* STOCK WARNINGS (from /cart/quote) */}
+            {warnings.length > 0 && (
+              <div style={{ ...styles.couponError, marginBottom: 14 }}>
+                {warnings.map((w) => (
+                  <div key={w.item_id}>⚠️ {w.message}</div>
+                ))}
+              </div>
+            )}
+
             {/* CART ITEMS */}
             <div style={styles.itemsGrid}>
               {cart.items.map((item) => (
@@ -1,8 +1,10 @@
 import { useEffect, useMemo, useState } from "react";
 import { useLocation, useNavigate } from "react-router-dom";
-import API from "../services/api";
+import API, { getToken } from "../services/api";
 import ProductCard from "../components/ProductCard";
 
+const PAGE_SIZE = 24;
+
 export default function Products() {
   const [products, setProducts] = useState([]);
   const [loading, setLoading] = useState(true);
@@ -13,47 +15,64 @@ export default function Products() {
 
   // ✅ read query params from navbar search/category
   const params = useMemo(() => new URLSearchParams(location.search), [location.search]);
-  const q = (params.get("q") || "").trim().toLowerCase();
-  const cat = (params.get("cat") || "").trim().toLowerCase();
+  const q = (params.get("q") || "").trim();
+  const cat = (params.get("cat") || "").trim();
+
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [wishlisted, setWishlisted] = useState(() => new Set());
 
   useEffect(() => {
     fetchProducts();
     // eslint-disable-next-line react-hooks/exhaustive-deps
-  }, []);
+  }, [q, cat]);
 
-  const fetchProducts = async () => {
+  // ✅ Search + category run on the server, one page at a time
+  const fetchProducts = async (cursor = null) => {
     try {
-      setLoading(true);
-      const res = await API.get("/products");
+      if (cursor) setLoadingMore(true);
+      else setLoading(true);
+
+      const res = await API.get("/products", {
+        params: {
+          limit: PAGE_SIZE,
+          ...(q && { q }),
+          ...(cat && { category: cat }),
+          ...(cursor && { cursor }),
+        },
+      });
 
       const productData = res.data?.products || (Array.isArray(res.data) ? res.data : []);
-      setProducts(productData);
+      setProducts((prev) => (cursor ? [...prev, ...productData] : productData));
+      setNextCursor(res.data?.next_cursor || null);
       setError("");
+      fetchWishlisted(productData.map((p) => p.id), Boolean(cursor));
     } catch (err) {
       console.error("Error fetching products:", err);
       setError("Failed to load products.");
     } finally {
       setLoading(false);
+      setLoadingMore(false);
     }
   };
 
-  // ✅ Filtered view (search + category)
-  const filteredProducts = useMemo(() => {
-    return products.filter((p) => {
-      const name = (p.name || "").toLowerCase();
-      const category = (p.category || "Dairy").toLowerCase();
-
-      const matchesSearch = !q || name.includes(q);
-      const matchesCategory = !cat || category === cat;
-
-      return matchesSearch && matchesCategory;
-    });
-  }, [products, q, cat]);
+  // ✅ Hearted state for just this page of products (one indexed query)
+  const fetchWishlisted = async (ids, append) => {
+    if (!getToken() || ids.length === 0) return;
+    try {
+      const res = await API.get("/wishlist/contains", { params: { ids: ids.join(",") } });
+      const found = res.data?.product_ids || [];
+      setWishlisted((prev) => new Set([...(append ? prev : []), ...found]));
+    } catch (err) {
+      console.error("Wishlist lookup error:", err);
+    }
+  };
 
   // ✅ Add to Wishlist (backend: POST /api/wishlist/<product_id>)
   const addToWishlist = async (productId) => {
     try {
       await API.post(`/wishlist/${productId}`);
+      setWishlisted((prev) => new Set(prev).add(productId));
       alert("Added to wishlist ❤️");
       window.dispatchEvent(new Event("wishlist-updated"));
     } catch (err) {
@@ -65,15 +84,15 @@ export default function Products() {
   // ✅ Add to Cart (backend expects JSON body)
   const addToCart = async (productId, quantity = 1) => {
     try {
-      await API.post("/cart/add", {
+      const res = await API.post("/cart/add", {
         product_id: productId,
         quantity,
       });
 
       alert("Added to cart 🛒");
 
-      // ✅ Tell Layout to refresh cart count immediately
-      window.dispatchEvent(new Event("cart-updated"));
+      // ✅ Tell Layout the new cart (no extra GET needed)
+      window.dispatchEvent(new CustomEvent("cart-updated", { detail: res.data.cart }));
     } catch (err) {
       console.error("Cart error:", err);
       alert(err.response?.data?.error || err.response?.data?.message || "Failed to add to cart");
@@ -129,7 +148,7 @@ export default function Products() {
         )}
 
         {/* Empty */}
-        {!loading && !error && filteredProducts.length === 0 && (
+        {!loading && !error && products.length === 0 && (
           <div style={styles.emptyBox}>
             <h3>No products found</h3>
             <p>Try searching different keywords or category.</p>
@@ -142,18 +161,32 @@ export default function Products() {
         )}
 
         {/* Products Grid */}
-        {!loading && !error && filteredProducts.length > 0 && (
+        {!loading && !error && products.length > 0 && (
           <div style={styles.grid}>
-            {filteredProducts.map((product) => (
+            {products.map((product) => (
               <ProductCard
                 key={product.id}
                 product={product}
+                wishlisted={wishlisted.has(product.id)}
                 onAddToWishlist={addToWishlist}
                 onAddToCart={addToCart}
               />
             ))}
           </div>
         )}
+
+        {/* Load more */}
+        {!loading && !error && nextCursor && (
+          <div style={styles.centerBox}>
+            <button
+              style={styles.secondaryBtn}
+              onClick={() => fetchProducts(nextCursor)}
+              disabled={loadingMore}
+            >
+              {loadingMore ? "Loading..." : "Load more"}
+            </button>
+          </div>
+        )}
       </div>
     </div>
   );
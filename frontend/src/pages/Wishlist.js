@@ -51,10 +51,10 @@ export default function Wishlist() {
   // Add to cart
   const addToCart = async (product_id) => {
     try {
-      await API.post("/cart/add", { product_id, quantity: 1 });
+      const res = await API.post("/cart/add", { product_id, quantity: 1 });
 
-      // ✅ update navbar cart count instantly
-      window.dispatchEvent(new Event("cart-updated"));
+      // ✅ update navbar cart count instantly (response carries the new cart)
+      window.dispatchEvent(new CustomEvent("cart-updated", { detail: res.data.cart }));
 
       alert("Added to cart 🛒");
     } catch (err) {